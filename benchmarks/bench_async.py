@@ -0,0 +1,101 @@
+'''
+This script measures bookings per second through the asyncio
+AsyncReservationService at 1, 10 and 100 concurrent clients, next
+to write-through sessions called straight from the event loop, the
+way Reservation.create_reservation() behaves.
+Every client books one room at a time and awaits each booking.
+
+Run it from the repository root:
+    python -m benchmarks.bench_async --bookings 2000
+'''
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from src.service import AsyncReservationService
+from src.store import Store, session
+
+
+def setup_data(directory, hotels, customers, rooms):
+    """Writes the initial hotels and customers into directory."""
+    with Store(directory) as store:
+        for i in range(hotels):
+            store.create_hotel(f"Hotel {i}", f"{i} Bench St", rooms)
+        for i in range(customers):
+            store.create_customer(f"Customer {i}", f"c{i}@bench.com",
+                                  "000-000-0000")
+
+
+async def _client(book, client, count, hotels):
+    """Books count rooms one after another, returning the successes."""
+    booked = 0
+    for i in range(count):
+        if await book(f"Hotel {(client + i) % hotels}",
+                      f"Customer {client}", 1):
+            booked += 1
+    return booked
+
+
+async def run_service(directory, clients, bookings, hotels, window):
+    """Books through the group-committing service."""
+    async with AsyncReservationService(directory=directory,
+                                       window=window) as service:
+        results = await asyncio.gather(*(
+            _client(service.create_reservation, client,
+                    bookings // clients, hotels)
+            for client in range(clients)))
+    return sum(results)
+
+
+async def run_blocking(directory, clients, bookings, hotels):
+    """
+    Books the way the static API does, with a write-through session
+    per call that blocks the loop.
+    """
+    async def book(hotel_name, customer_name, num_rooms):
+        with session(directory) as store:
+            return store.create_reservation(hotel_name, customer_name,
+                                            num_rooms)
+
+    results = await asyncio.gather(*(
+        _client(book, client, bookings // clients, hotels)
+        for client in range(clients)))
+    return sum(results)
+
+
+def measure(mode, clients, args):
+    """Runs one mode on fresh data and returns its throughput."""
+    with tempfile.TemporaryDirectory() as directory:
+        setup_data(directory, args.hotels, max(clients, 1), args.rooms)
+        start = time.perf_counter()
+        if mode == 'service':
+            booked = asyncio.run(run_service(directory, clients,
+                                             args.bookings, args.hotels,
+                                             args.window))
+        else:
+            booked = asyncio.run(run_blocking(directory, clients,
+                                              args.bookings, args.hotels))
+        seconds = time.perf_counter() - start
+    return {"mode": mode, "clients": clients, "booked": booked,
+            "seconds": round(seconds, 3),
+            "bookings_per_second": round(booked / seconds, 1)}
+
+
+def main():
+    """Measures every mode at 1, 10 and 100 clients."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--bookings', type=int, default=2000)
+    parser.add_argument('--hotels', type=int, default=50)
+    parser.add_argument('--rooms', type=int, default=1_000_000)
+    parser.add_argument('--window', type=float, default=0.002)
+    args = parser.parse_args()
+    results = [measure(mode, clients, args)
+               for clients in (1, 10, 100)
+               for mode in ('service', 'blocking')]
+    print(json.dumps({"bookings": args.bookings, "results": results},
+                     indent=4))
+
+
+if __name__ == '__main__':
+    main()
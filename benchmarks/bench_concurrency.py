@@ -0,0 +1,125 @@
+'''
+This script benchmarks concurrent bookings against a shared store.
+Workers (threads or processes) book one room at a time at random
+hotels and the script checks that exactly the available inventory
+was accepted, then reports the throughput reached.
+
+Run it from the repository root:
+    python -m benchmarks.bench_concurrency --mode processes --workers 8
+'''
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from multiprocessing import Pool
+from src.reservation import Reservation
+from src.store import Store, session
+
+
+def setup_data(directory, hotels, rooms, customers):
+    """Writes the initial hotels and customers into directory."""
+    with Store(directory) as store:
+        for i in range(hotels):
+            store.create_hotel(f"Hotel {i}", f"{i} Bench St", rooms)
+        for i in range(customers):
+            store.create_customer(f"Customer {i}", f"c{i}@bench.com",
+                                  "000-000-0000")
+
+
+def _bookings(worker, attempts, hotels, customers):
+    """Returns the (hotel, customer) pairs a worker will try to book."""
+    rng = random.Random(worker)
+    return [(f"Hotel {rng.randrange(hotels)}",
+             f"Customer {rng.randrange(customers)}")
+            for _ in range(attempts)]
+
+
+def process_worker(args):
+    """Books through short-lived sessions, as the static API does."""
+    directory, worker, attempts, hotels, customers = args
+    accepted = 0
+    for hotel_name, customer_name in _bookings(worker, attempts, hotels,
+                                               customers):
+        with session(directory) as store:
+            if store.create_reservation(hotel_name, customer_name, 1):
+                accepted += 1
+    return accepted
+
+
+def run_threads(directory, workers, attempts, hotels, customers):
+    """Books from threads sharing one long-lived store."""
+    results = [0] * workers
+
+    def work(worker):
+        for hotel_name, customer_name in _bookings(worker, attempts,
+                                                   hotels, customers):
+            if Reservation.create_reservation(hotel_name, customer_name, 1):
+                results[worker] += 1
+
+    with Store(directory):
+        threads = [threading.Thread(target=work, args=(i,))
+                   for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return sum(results)
+
+
+def run_processes(directory, workers, attempts, hotels, customers):
+    """Books from separate processes using the file lock."""
+    with Pool(workers) as pool:
+        return sum(pool.map(process_worker,
+                            [(directory, i, attempts, hotels, customers)
+                             for i in range(workers)]))
+
+
+def main():
+    """Runs the benchmark and prints a JSON summary."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mode', choices=('threads', 'processes'),
+                        default='threads')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=500,
+                        help='bookings attempted by each worker')
+    parser.add_argument('--hotels', type=int, default=10)
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--customers', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_data(directory, args.hotels, args.rooms, args.customers)
+        runner = run_threads if args.mode == 'threads' else run_processes
+        start = time.perf_counter()
+        accepted = runner(directory, args.workers, args.attempts,
+                          args.hotels, args.customers)
+        elapsed = time.perf_counter() - start
+
+        store = Store(directory)
+        inventory = args.hotels * args.rooms
+        remaining = sum(h["rooms"] for h in store.hotels)
+        attempts = args.workers * args.attempts
+        summary = {
+            "mode": args.mode,
+            "workers": args.workers,
+            "attempts": attempts,
+            "inventory": inventory,
+            "accepted": accepted,
+            "reservations_on_disk": len(store.reservations),
+            "rooms_left": remaining,
+            "consistent": (accepted == min(attempts, inventory) and
+                           accepted == len(store.reservations) and
+                           remaining == inventory - accepted and
+                           all(h["rooms"] >= 0 for h in store.hotels)),
+            "seconds": round(elapsed, 3),
+            "attempts_per_second": round(attempts / elapsed, 1)
+        }
+    print(json.dumps(summary, indent=4))
+    if not summary["consistent"]:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
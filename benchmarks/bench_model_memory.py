@@ -0,0 +1,92 @@
+'''
+This script compares the per-record memory of the reservation layouts:
+the original dicts embedding the customer, dicts referencing it by id,
+__slots__ Reservation objects and the columnar ReservationIndex.
+Allocations are measured with tracemalloc so the figures are bytes
+actually held by the records, not process RSS.
+
+Run it from the repository root:
+    python -m benchmarks.bench_model_memory --count 1000000
+'''
+import argparse
+import gc
+import json
+import tracemalloc
+from src.customer import Customer
+from src.index import ReservationIndex, legacy_customer_id
+from src.reservation import Reservation
+
+
+def legacy_dicts(count, hotels, customers):
+    """Builds reservations as the dicts embedding a customer copy."""
+    return [{"hotel_name": f"Hotel {i % hotels}",
+             "customer": {"name": f"Customer {i % customers}",
+                          "email": f"c{i % customers}@bench.com",
+                          "phone_number": "000-000-0000"},
+             "num_rooms": 1 + i % 3}
+            for i in range(count)]
+
+
+def id_dicts(count, hotels, customers):
+    """Builds reservations as dicts referencing the customer by id."""
+    ids = [legacy_customer_id(f"Customer {i}") for i in range(customers)]
+    return [{"hotel_name": f"Hotel {i % hotels}",
+             "customer_id": ids[i % customers],
+             "num_rooms": 1 + i % 3}
+            for i in range(count)]
+
+
+def slotted_objects(count, hotels, customers):
+    """Builds __slots__ Reservation objects sharing Customer objects."""
+    people = [Customer(f"Customer {i}", f"c{i}@bench.com", "000-000-0000",
+                       legacy_customer_id(f"Customer {i}"))
+              for i in range(customers)]
+    names = [f"Hotel {i}" for i in range(hotels)]
+    return [Reservation(names[i % hotels], people[i % customers],
+                        1 + i % 3)
+            for i in range(count)]
+
+
+def columnar(count, hotels, customers):
+    """Builds the columnar ReservationIndex."""
+    return ReservationIndex(id_dicts(count, hotels, customers))
+
+
+LAYOUTS = {
+    "legacy dicts": legacy_dicts,
+    "customer_id dicts": id_dicts,
+    "__slots__ objects": slotted_objects,
+    "ReservationIndex": columnar
+}
+
+
+def measure(build, count, hotels, customers):
+    """Returns the bytes still allocated by a built layout."""
+    gc.collect()
+    tracemalloc.start()
+    layout = build(count, hotels, customers)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del layout
+    return held, peak
+
+
+def main():
+    """Builds every layout and prints the bytes per record."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--hotels', type=int, default=1000)
+    parser.add_argument('--customers', type=int, default=10000)
+    args = parser.parse_args()
+    results = []
+    for name, build in LAYOUTS.items():
+        held, peak = measure(build, args.count, args.hotels, args.customers)
+        results.append({"layout": name,
+                        "held_mb": round(held / 2 ** 20, 1),
+                        "peak_mb": round(peak / 2 ** 20, 1),
+                        "bytes_per_record": round(held / args.count, 1)})
+    print(json.dumps({"count": args.count, "results": results}, indent=4))
+
+
+if __name__ == '__main__':
+    main()
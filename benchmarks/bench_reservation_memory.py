@@ -0,0 +1,92 @@
+'''
+This script compares the peak memory of reading reservations with
+the original whole-file json.load against the streaming
+iter_reservations() reader. Each reader runs in its own process so
+peak RSS figures do not leak between them.
+
+Run it from the repository root:
+    python -m benchmarks.bench_reservation_memory --count 1000000
+'''
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+
+def write_snapshot(path, count, hotels=1000, customers=10000):
+    """Writes count reservations in the legacy indent=4 layout."""
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[\n')
+        for i in range(count):
+            customer = i % customers
+            reservation = {
+                "hotel_name": f"Hotel {i % hotels}",
+                "customer": {"name": f"Customer {customer}",
+                             "email": f"c{customer}@bench.com",
+                             "phone_number": "000-000-0000"},
+                "num_rooms": 1 + i % 3
+            }
+            separator = ',\n' if i < count - 1 else '\n'
+            file.write(json.dumps(reservation, indent=4) + separator)
+        file.write(']\n')
+
+
+def _peak_rss_mb():
+    """Returns this process's peak resident set size in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _measure(mode, directory, queue):
+    """Reads every reservation in one mode and reports time and RSS."""
+    # Imported here so the baseline RSS covers the same modules
+    from src.reservation import Reservation  # pylint: disable=C0415
+    from src.store import Store  # pylint: disable=C0415
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    rooms = 0
+    if mode == 'json.load':
+        path = os.path.join(directory, 'reservations.json')
+        with open(path, 'r', encoding='utf-8') as file:
+            rooms = sum(r["num_rooms"] for r in json.load(file))
+    elif mode == 'load_reservations':
+        with Store(directory):
+            rooms = sum(r["num_rooms"]
+                        for r in Reservation.load_reservations())
+    else:
+        with Store(directory):
+            rooms = sum(r["num_rooms"]
+                        for r in Reservation.iter_reservations())
+    queue.put({"mode": mode, "rooms": rooms,
+               "seconds": round(time.perf_counter() - start, 2),
+               "baseline_rss_mb": round(baseline, 1),
+               "peak_rss_mb": round(_peak_rss_mb(), 1)})
+
+
+def main():
+    """Generates the dataset and measures every reader."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    args = parser.parse_args()
+    context = get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        write_snapshot(os.path.join(directory, 'reservations.json'),
+                       args.count)
+        for mode in ('json.load', 'load_reservations', 'iter_reservations'):
+            queue = context.Queue()
+            process = context.Process(target=_measure,
+                                      args=(mode, directory, queue))
+            process.start()
+            results.append(queue.get())
+            process.join()
+    print(json.dumps({"count": args.count, "results": results}, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+'''
+This script measures save time, load time and on-disk size of a
+reservations file in every serialization format: the pretty-printed
+JSON written before serialization.py existed, compact JSON through
+the json module, compact JSON through orjson (when installed) and
+the length-prefixed binary format.
+
+Run it from the repository root:
+    python -m benchmarks.bench_serialization --count 1000000
+'''
+import argparse
+import json
+import os
+import tempfile
+import time
+from contextlib import nullcontext
+from unittest import mock
+from src import serialization
+from src.durability import atomic_write
+from src.index import legacy_customer_id
+from src.serialization import BINARY, JSON, dumps, loads
+
+
+def generate(count, hotels=1000, customers=100_000):
+    """Builds count reservations shaped like the stored ones."""
+    ids = [legacy_customer_id(f"Customer {j}") for j in range(customers)]
+    return [{"hotel_name": f"Hotel {k % hotels}",
+             "customer_id": ids[k % customers], "num_rooms": 1 + k % 4}
+            for k in range(count)]
+
+
+def _pretty(records):
+    """Encodes records the way the files used to be written."""
+    return json.dumps(records, indent=4).encode('utf-8')
+
+
+def variants():
+    """Returns name -> (encode, decode, context) for every format."""
+    stdlib = mock.patch.object(serialization, 'orjson', None)
+    found = [('json-pretty', _pretty, json.loads, nullcontext()),
+             ('json-stdlib', lambda r: dumps(r, JSON), loads, stdlib)]
+    if serialization.accelerated():
+        found.append(('json-orjson', lambda r: dumps(r, JSON), loads,
+                      nullcontext()))
+    found.append(('binary', lambda r: dumps(r, BINARY), loads,
+                  nullcontext()))
+    return found
+
+
+def measure(records, directory, repeat):
+    """
+    Times every format, keeping the best of repeat runs. Save time
+    includes encoding and the atomic write to disk.
+    """
+    path = os.path.join(directory, 'reservations.json')
+    results = []
+    for name, encode, decode, context in variants():
+        encodes = []
+        saves = []
+        reads = []
+        with context:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                data = encode(records)
+                encodes.append(time.perf_counter() - start)
+                atomic_write(path, data)
+                saves.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                with open(path, 'rb') as file:
+                    loaded = decode(file.read())
+                reads.append(time.perf_counter() - start)
+        assert len(loaded) == len(records)
+        results.append({"format": name,
+                        "encode_seconds": round(min(encodes), 3),
+                        "save_seconds": round(min(saves), 3),
+                        "load_seconds": round(min(reads), 3),
+                        "size_mb": round(os.path.getsize(path) / 2 ** 20,
+                                         1)})
+    return results
+
+
+def main():
+    """Measures every format on a generated reservations file."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    records = generate(args.count)
+    with tempfile.TemporaryDirectory() as directory:
+        results = measure(records, directory, args.repeat)
+    print(json.dumps({"count": args.count, "results": results}, indent=4))
+
+
+if __name__ == '__main__':
+    main()
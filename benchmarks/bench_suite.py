@@ -0,0 +1,318 @@
+'''
+This script times every public operation of Hotel, Customer and
+Reservation against a synthetic dataset of configurable scale and
+writes ops/sec, p50/p99 latency and peak memory to a JSON report.
+Each operation runs in its own process over a fresh copy of the
+dataset, so neither memory nor mutations leak between operations.
+Reports from two commits can be compared with --compare.
+
+Run it from the repository root:
+    python -m benchmarks.bench_suite --hotels 10000 --customers 100000 \
+        --reservations 1000000 --output results.json
+    python -m benchmarks.bench_suite --compare old.json new.json
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import queue as queues
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from src.customer import Customer
+from src.hotel import Hotel
+from src.index import legacy_customer_id
+from src.reservation import Reservation
+from src.store import Store
+
+# Operations whose every call reads whole collections from disk
+LOAD_OPERATIONS = ('Hotel.load_hotels', 'Hotel.get_hotels',
+                   'Customer.load_customers', 'Customer.get_customers',
+                   'Reservation.load_reservations')
+
+# Bookings or cancellations per call of the batch operations
+BATCH_SIZE = 10
+
+
+def write_dataset(directory, hotels, customers, reservations):
+    """
+    Writes hotels.json, customers.json and reservations.json. Hotel i
+    and customer j are named "Hotel i" and "Customer j"; reservation k
+    books hotel k % hotels for customer k % customers.
+    """
+    def dump(name, count, record):
+        """Streams count records into a JSON array file."""
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('[')
+            for i in range(count):
+                file.write((',\n' if i else '\n') + json.dumps(record(i)))
+            file.write('\n]\n')
+
+    ids = [legacy_customer_id(f"Customer {j}") for j in range(customers)]
+    dump('hotels.json', hotels, lambda i: {
+        "name": f"Hotel {i}", "address": f"{i} Synthetic Ave",
+        "rooms": 1_000_000})
+    dump('customers.json', customers, lambda j: {
+        "id": ids[j], "name": f"Customer {j}",
+        "email": f"c{j}@bench.com", "phone_number": "000-000-0000"})
+    dump('reservations.json', reservations, lambda k: {
+        "hotel_name": f"Hotel {k % hotels}",
+        "customer_id": ids[k % customers], "num_rooms": 1})
+
+
+def operations(scale):
+    """
+    Returns operation name -> callable(i) for every public operation.
+    Call i touches hotel/customer i, which exist in every dataset.
+    """
+    hotels = scale["hotels"]
+    customers = scale["customers"]
+
+    def hotel(i):
+        """Returns the name of an existing hotel."""
+        return f"Hotel {i % hotels}"
+
+    def customer(i):
+        """Returns the name of an existing customer."""
+        return f"Customer {i % customers}"
+
+    def night(i):
+        """Returns a check-in date spread over a year."""
+        return f"2030-{1 + i % 12:02d}-{1 + i % 27:02d}"
+
+    def stay(i):
+        """Returns the check-out night after night(i)."""
+        return f"2030-{1 + i % 12:02d}-{2 + i % 27:02d}"
+
+    def batch(i):
+        """Returns the call numbers of the i-th batch."""
+        return range(i * BATCH_SIZE, (i + 1) * BATCH_SIZE)
+
+    return {
+        'Hotel.create_hotel': lambda i: Hotel.create_hotel(
+            f"New Hotel {i}", f"{i} New St", 100),
+        'Hotel.modify_hotel_info': lambda i: Hotel.modify_hotel_info(
+            hotel(i), new_address=f"{i} Renovated Ave"),
+        'Hotel.delete_hotel': lambda i: Hotel.delete_hotel(hotel(i)),
+        'Hotel.display_hotel_info': lambda i: Hotel.display_hotel_info(
+            hotel(i)),
+        'Hotel.reserve_room': lambda i: Hotel(
+            hotel(i), "", 1_000_000 - i).reserve_room(1),
+        'Hotel.cancel_reservation': lambda i: Hotel(
+            hotel(i), "", 1_000_000).cancel_reservation(1),
+        'Hotel.search_hotels': lambda i: Hotel.search_hotels(
+            1 + i % 100, limit=10),
+        'Hotel.available_rooms': lambda i: Hotel.available_rooms(
+            hotel(i), night(i), stay(i)),
+        'Hotel.load_hotels': lambda i: Hotel.load_hotels(),
+        'Hotel.get_hotels': lambda i: Hotel.get_hotels(),
+        'Customer.create_customer': lambda i: Customer.create_customer(
+            f"New Customer {i}", f"n{i}@bench.com", "000"),
+        'Customer.modify_customer_info':
+            lambda i: Customer.modify_customer_info(
+                customer(i), new_email=f"m{i}@bench.com"),
+        'Customer.delete_customer': lambda i: Customer.delete_customer(
+            customer(i)),
+        'Customer.display_customer_info':
+            lambda i: Customer.display_customer_info(customer(i)),
+        'Customer.load_customers': lambda i: Customer.load_customers(),
+        'Customer.get_customers': lambda i: Customer.get_customers(),
+        'Reservation.create_reservation':
+            lambda i: Reservation.create_reservation(hotel(i),
+                                                     customer(i), 1),
+        'Reservation.create_dated_reservation':
+            lambda i: Reservation.create_reservation(
+                hotel(i), customer(i), 1, night(i), stay(i)),
+        'Reservation.create_reservations':
+            lambda i: Reservation.create_reservations(
+                [(hotel(j), customer(j), 1) for j in batch(i)]),
+        'Reservation.cancel_reservation':
+            lambda i: Reservation.cancel_reservation(hotel(i), customer(i)),
+        'Reservation.cancel_reservations':
+            lambda i: Reservation.cancel_reservations(
+                [(hotel(j), customer(j)) for j in batch(i)]),
+        'Reservation.iter_hotel_reservations': lambda i: sum(
+            1 for _ in Reservation.iter_hotel_reservations(hotel(i))),
+        'Reservation.iter_customer_reservations': lambda i: sum(
+            1 for _ in Reservation.iter_customer_reservations(customer(i))),
+        'Reservation.load_reservations':
+            lambda i: Reservation.load_reservations(),
+    }
+
+
+def _peak_rss_mb():
+    """Returns this process's peak resident set size in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentile(ordered, fraction):
+    """Returns the nearest-rank percentile of sorted latencies."""
+    rank = max(0, min(len(ordered) - 1,
+                      round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def _run(name, directory, scale, calls, mode, queue):
+    """
+    Times one operation in a worker process and reports it. In session
+    mode the store is flushed once at the end, inside the timed region,
+    so the report includes the cost of writing the changes.
+    """
+    os.chdir(directory)
+    operation = operations(scale)[name]
+    store = None
+    if mode == 'session':
+        # Left active until the worker exits
+        store = Store(directory).__enter__()
+        # Warm the collections so the first call is not a cold load
+        store.collection('hotels')
+        store.collection('customers')
+        store.collection('reservations')
+    baseline = _peak_rss_mb()
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for i in range(calls):
+            begin = time.perf_counter_ns()
+            operation(i)
+            latencies.append(time.perf_counter_ns() - begin)
+        flushed = time.perf_counter()
+        if store is not None:
+            store.flush()
+        end = time.perf_counter()
+    seconds = end - start
+    latencies.sort()
+    queue.put({"operation": name, "calls": calls,
+               "ops_per_second": round(calls / seconds, 1),
+               "p50_ms": round(_percentile(latencies, 0.50) / 1e6, 4),
+               "p99_ms": round(_percentile(latencies, 0.99) / 1e6, 4),
+               "flush_ms": round((end - flushed) * 1000, 3),
+               "baseline_rss_mb": round(baseline, 1),
+               "peak_rss_mb": round(_peak_rss_mb(), 1)})
+
+
+def _commit():
+    """Returns the current git commit, or None outside a checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], check=True,
+                              capture_output=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    """Generates the dataset, times every operation, returns a report."""
+    scale = {"hotels": args.hotels, "customers": args.customers,
+             "reservations": args.reservations}
+    names = list(operations(scale))
+    if args.only:
+        names = [name for name in names
+                 if any(part in name for part in args.only)]
+    context = get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        dataset = os.path.join(root, 'dataset')
+        os.mkdir(dataset)
+        write_dataset(dataset, **scale)
+        for name in names:
+            calls = args.load_calls if name in LOAD_OPERATIONS \
+                else args.calls
+            directory = os.path.join(root, 'run')
+            shutil.copytree(dataset, directory)
+            queue = context.Queue()
+            process = context.Process(target=_run, args=(
+                name, directory, scale, calls, args.mode, queue))
+            process.start()
+            try:
+                results.append(queue.get(timeout=args.timeout))
+            except queues.Empty:
+                # The worker crashed or hung; report it and move on
+                process.terminate()
+                process.join()
+                results.append({"operation": name, "calls": calls,
+                                "error": f"no result within {args.timeout}s"
+                                         f" (exit code {process.exitcode})"})
+            process.join()
+            shutil.rmtree(directory)
+            print(json.dumps(results[-1]), file=sys.stderr)
+    return {"commit": _commit(), "python": platform.python_version(),
+            "platform": platform.platform(), "mode": args.mode,
+            "scale": scale, "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "results": results}
+
+
+def compare(old_path, new_path, threshold):
+    """
+    Prints the ops/sec ratio of every operation in two reports and
+    returns the operations slower than threshold (0.1 is 10%).
+    """
+    reports = []
+    for path in (old_path, new_path):
+        with open(path, 'r', encoding='utf-8') as file:
+            reports.append({r["operation"]: r
+                            for r in json.load(file)["results"]})
+    old, new = reports
+    regressions = []
+    for name in old:
+        if name not in new:
+            continue
+        if "error" in new[name]:
+            regressions.append(name)
+            print(f"{name:45} FAILED: {new[name]['error']}")
+            continue
+        if "error" in old[name]:
+            continue
+        ratio = new[name]["ops_per_second"] / old[name]["ops_per_second"]
+        flag = ''
+        if ratio < 1 - threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:45} {old[name]['ops_per_second']:>12} -> "
+              f"{new[name]['ops_per_second']:>12} ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main():
+    """Runs the suite, or compares two reports."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hotels', type=int, default=1000)
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--reservations', type=int, default=100000)
+    parser.add_argument('--calls', type=int, default=1000,
+                        help='calls timed per operation')
+    parser.add_argument('--load-calls', type=int, default=3,
+                        help='calls timed per whole-collection load')
+    parser.add_argument('--mode', choices=('session', 'write-through'),
+                        default='session',
+                        help='one long-lived Store, or a flushed session '
+                             'per call as without an active Store')
+    parser.add_argument('--timeout', type=float, default=3600,
+                        help='seconds to wait for each operation')
+    parser.add_argument('--only', nargs='*',
+                        help='run the operations containing these names')
+    parser.add_argument('--output', help='file to write the report to')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    report = json.dumps(run_suite(args), indent=4)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
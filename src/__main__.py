@@ -0,0 +1,8 @@
+'''
+Runs the command processor (see commands.py):
+    python -m src commands.jsonl > results.jsonl
+'''
+import sys
+from src.commands import main
+
+sys.exit(main())
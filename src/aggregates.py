@@ -0,0 +1,222 @@
+'''
+This script is focused on generating the Occupancy class and its
+journal. Occupancy holds the rooms and bookings each hotel and each
+customer has, kept up to date on every create and cancel so they are
+read without going through the reservations.
+The classes pertaining to this script are
+a. Occupancy, the per-hotel and per-customer totals
+b. OccupancyJournal, a snapshot of the totals plus a log of deltas
+'''
+import logging
+import os
+import threading
+from src.durability import atomic_write
+from src.serialization import dumps_json, loads_json
+
+# Totals kept per hotel and per customer
+HOTEL_FIELDS = ('rooms', 'open_rooms', 'bookings')
+CUSTOMER_FIELDS = ('rooms', 'bookings')
+
+
+def delta(reservation, sign=1):
+    """
+    Returns the change a reservation makes to the totals when it is
+    created (sign 1) or cancelled (sign -1).
+    """
+    rooms = reservation.get("num_rooms")
+    # pylint: disable-next=unidiomatic-typecheck
+    rooms = rooms * sign if type(rooms) is int else 0
+    return {"hotel_name": reservation["hotel_name"],
+            "customer_id": reservation["customer_id"], "rooms": rooms,
+            # Open-ended bookings are the ones taken out of hotel rooms
+            "open_rooms": 0 if "check_in" in reservation else rooms,
+            "bookings": sign}
+
+
+def merge(deltas):
+    """Sums deltas of the same hotel and customer into one each."""
+    merged = {}
+    for change in deltas:
+        key = (change["hotel_name"], change["customer_id"])
+        total = merged.get(key)
+        if total is None:
+            merged[key] = dict(change)
+        else:
+            for field in HOTEL_FIELDS:
+                total[field] += change[field]
+    return [change for change in merged.values()
+            if any(change[field] for field in HOTEL_FIELDS)]
+
+
+class Occupancy:
+    """
+    The rooms held and the bookings made per hotel and per customer
+    id. open_rooms counts only the open-ended bookings, whose rooms
+    are taken out of the hotel's room count.
+    """
+    def __init__(self, hotels=None, customers=None):
+        """Initializes the totals, by default all zero."""
+        self.hotels = hotels if hotels is not None else {}
+        self.customers = customers if customers is not None else {}
+
+    @classmethod
+    def compute(cls, reservations):
+        """Returns the totals of an iterable of reservations."""
+        occupancy = cls()
+        for reservation in reservations:
+            occupancy.apply(delta(reservation))
+        return occupancy
+
+    def apply(self, change):
+        """Adds a delta to the totals of its hotel and customer."""
+        for table, key, fields in (
+                (self.hotels, change["hotel_name"], HOTEL_FIELDS),
+                (self.customers, change["customer_id"], CUSTOMER_FIELDS)):
+            totals = table.get(key)
+            if totals is None:
+                totals = table[key] = dict.fromkeys(fields, 0)
+            for field in fields:
+                totals[field] += change[field]
+            if not any(totals.values()):
+                del table[key]
+
+    def rename_hotel(self, hotel_name, new_name):
+        """
+        Moves a hotel's totals to its new name, adding them to any
+        totals already kept there. Returns False when it has none.
+        """
+        totals = self.hotels.pop(hotel_name, None)
+        if totals is None:
+            return False
+        kept = self.hotels.setdefault(new_name,
+                                      dict.fromkeys(HOTEL_FIELDS, 0))
+        for field in HOTEL_FIELDS:
+            kept[field] += totals[field]
+        return True
+
+    def hotel(self, hotel_name):
+        """Returns the totals of a hotel."""
+        return dict(self.hotels.get(hotel_name) or
+                    dict.fromkeys(HOTEL_FIELDS, 0))
+
+    def customer(self, customer_id):
+        """Returns the totals of a customer."""
+        return dict(self.customers.get(customer_id) or
+                    dict.fromkeys(CUSTOMER_FIELDS, 0))
+
+    def to_dict(self):
+        """Returns the totals as a JSON-ready dictionary."""
+        return {"hotels": self.hotels, "customers": self.customers}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds totals from the output of to_dict()."""
+        return cls(data.get("hotels", {}), data.get("customers", {}))
+
+    def drift(self, actual):
+        """
+        Returns every total differing from actual, as dictionaries
+        naming the kind, key and field with the stored and actual value.
+        """
+        found = []
+        for kind, stored, expected, fields in (
+                ("hotel", self.hotels, actual.hotels, HOTEL_FIELDS),
+                ("customer", self.customers, actual.customers,
+                 CUSTOMER_FIELDS)):
+            for key in sorted(stored.keys() | expected.keys()):
+                mine = stored.get(key, {})
+                theirs = expected.get(key, {})
+                found.extend(
+                    {"kind": kind, "key": key, "field": field,
+                     "stored": mine.get(field, 0),
+                     "actual": theirs.get(field, 0)}
+                    for field in fields
+                    if mine.get(field, 0) != theirs.get(field, 0))
+        return found
+
+
+class OccupancyJournal:
+    """
+    Occupancy persisted as a JSON snapshot and a log of deltas, so a
+    booking appends one line instead of rewriting every total. The
+    log is folded into the snapshot once it grows past compact_bytes.
+    """
+    def __init__(self, snapshot_path, compact_bytes=256 * 1024):
+        """Initializes the journal over snapshot_path and its log."""
+        self.snapshot_path = snapshot_path
+        self.log_path = os.path.splitext(snapshot_path)[0] + '.jsonl'
+        self.compact_bytes = compact_bytes
+        self.fsync = False
+        self._lock = threading.RLock()
+
+    @property
+    def _staged_path(self):
+        """The snapshot written by an in-progress compaction."""
+        return self.snapshot_path + '.new'
+
+    def exists(self):
+        """Tells whether totals were ever saved."""
+        return any(os.path.exists(path) for path in (
+            self.snapshot_path, self.log_path, self._staged_path))
+
+    def load(self):
+        """Returns the saved Occupancy, or None when none was saved."""
+        with self._lock:
+            self._recover()
+            if not self.exists():
+                return None
+            try:
+                with open(self.snapshot_path, 'rb') as file:
+                    occupancy = Occupancy.from_dict(loads_json(file.read()))
+            except FileNotFoundError:
+                occupancy = Occupancy()
+            except ValueError:
+                logging.error("Error decoding occupancy file.")
+                return None
+            try:
+                with open(self.log_path, 'rb') as file:
+                    for line in file:
+                        try:
+                            occupancy.apply(loads_json(line))
+                        except ValueError:
+                            logging.error("Skipping corrupt occupancy line.")
+            except FileNotFoundError:
+                pass
+            return occupancy
+
+    def append(self, deltas):
+        """Appends deltas to the log, compacting it when it is large."""
+        if not deltas:
+            return
+        lines = b''.join(dumps_json(change) + b'\n' for change in deltas)
+        with self._lock:
+            with open(self.log_path, 'ab') as file:
+                file.write(lines)
+                if self.fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            if (self.compact_bytes is not None and
+                    os.path.getsize(self.log_path) >= self.compact_bytes):
+                self.rewrite(self.load())
+
+    def rewrite(self, occupancy):
+        """Replaces the snapshot with occupancy and clears the log."""
+        with self._lock:
+            self._recover()
+            atomic_write(self._staged_path, dumps_json(occupancy.to_dict()),
+                         self.fsync)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            os.replace(self._staged_path, self.snapshot_path)
+
+    def _recover(self):
+        """
+        Finishes or rolls back a rewrite interrupted by a crash. A
+        staged snapshot is complete only once the log is gone.
+        """
+        if not os.path.exists(self._staged_path):
+            return
+        if os.path.exists(self.log_path):
+            os.remove(self._staged_path)
+        else:
+            os.replace(self._staged_path, self.snapshot_path)
@@ -0,0 +1,696 @@
+'''
+This script is focused on generating the storage backends
+the Store reads and persists its collections through.
+The classes pertaining to this script are
+a. StorageBackend, the interface every backend implements
+b. JsonBackend, the hotels/customers/reservations JSON files
+c. SqliteBackend, a single sqlite3 database in WAL mode
+Every backend also keeps the hotels' waitlists (see waitlist.py).
+'''
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from src.aggregates import Occupancy, OccupancyJournal
+from src.cache import default_cache
+from src.durability import atomic_write
+from src.index import ReservationIndex, normalize
+from src.instrumentation import count_bytes, enabled, instrumented
+from src.journal import CANCEL, CREATE, ReservationJournal, event_customer
+from src.locking import LOCK_FILE, LockChain, file_lock
+from src.serialization import (check_format, default_format, dumps, loads,
+                               loads_json)
+from src.shards import ShardedJournal, read_manifest
+
+HOTELS = 'hotels'
+CUSTOMERS = 'customers'
+RESERVATIONS = 'reservations'
+# Per-hotel and per-customer totals (see aggregates.py)
+OCCUPANCY = 'occupancy'
+# Booking requests waiting for rooms (see waitlist.py)
+WAITLIST = 'waitlist'
+
+FILES = {
+    HOTELS: 'hotels.json',
+    CUSTOMERS: 'customers.json',
+    RESERVATIONS: 'reservations.json',
+    OCCUPANCY: 'occupancy.json',
+    WAITLIST: 'waitlist.json'
+}
+
+
+class StorageBackend:
+    """
+    The interface between the Store and where its data lives.
+    Hotels and customers are lists of dictionaries keyed by "name";
+    reservations are persisted as create/cancel journal events.
+    """
+    # True when get() answers single-name lookups without a full load
+    indexed = False
+    # True when save_rooms() moves the rooms of saved hotels, which
+    # save() then leaves alone
+    guards_rooms = False
+
+    def load(self, kind):
+        """Returns every record of the hotels or customers collection."""
+        raise NotImplementedError
+
+    def get(self, kind, name):
+        """Returns one hotel or customer record by name, or None."""
+        return next((r for r in self.load(kind) if r["name"] == name), None)
+
+    def save(self, kind, records=None, changes=None):
+        """
+        Persists hotels or customers. records is the full collection;
+        changes maps each changed name to its record, or to None for a
+        removed one. Backends use whichever they were given.
+        """
+        raise NotImplementedError
+
+    def save_rooms(self, taken):
+        """
+        Takes rooms from hotels, mapping each name to the rooms taken,
+        negative when given back. Raises ValueError, taking none, when
+        a hotel has fewer rooms left than are taken from it.
+        """
+        raise NotImplementedError
+
+    def load_index(self):
+        """Returns every reservation in a ReservationIndex."""
+        raise NotImplementedError
+
+    def iter_reservations(self, hotel_name=None, customer_id=None):
+        """Yields reservations one at a time, optionally filtered."""
+        yield from self.load_index().find(hotel_name, customer_id)
+
+    def save_reservations(self, events=(), records=None):
+        """Persists reservation events, or replaces them with records."""
+        raise NotImplementedError
+
+    def load_occupancy(self):
+        """
+        Returns the saved per-hotel and per-customer Occupancy, or None
+        when the backend has none yet and it must be computed.
+        """
+        return None
+
+    def has_occupancy(self):
+        """Tells whether deltas can be saved without a full count first."""
+        return True
+
+    def save_occupancy(self, deltas=(), occupancy=None):
+        """Persists occupancy deltas, or replaces them with occupancy."""
+
+    def load_waitlist(self):
+        """Returns every waitlist entry."""
+        raise NotImplementedError
+
+    def save_waitlist(self, entries):
+        """Replaces the waitlist with entries."""
+        raise NotImplementedError
+
+    def transaction(self):
+        """Returns a context manager grouping the saves of one flush."""
+        return nullcontext()
+
+    def set_durability(self, fsync):
+        """Sets whether every save must reach the disk before returning."""
+
+    def lock(self):
+        """Returns the lock excluding other processes while writing."""
+        raise NotImplementedError
+
+    def hotel_lock(self, hotel_name):
+        """
+        Returns the lock excluding other writers of one hotel's
+        bookings, by default the lock of the whole store.
+        """
+        return self.lock()
+
+    def save_lock(self):
+        """Returns the lock a hotel's writer takes last, to save."""
+        return self.lock()
+
+    def stale(self):
+        """Tells whether the data moved to another layout since opening."""
+        return False
+
+    def close(self):
+        """Releases any resource held by the backend."""
+
+
+class JsonBackend(StorageBackend):
+    """
+    The hotels, customers and reservations files, with reservations
+    journaled. Files are read in whichever format they were written
+    in and written in fmt (see serialization.py). Reservations are
+    split into shard journals when the directory has a shard manifest
+    (see shards.py and reshard.py). Parsed files are kept in a
+    FileCache shared by the process (see cache.py), so reading an
+    unchanged file again only costs an os.stat.
+    """
+    def __init__(self, directory='.', fmt=None, cache=None):
+        """
+        Initializes the backend over the files in directory, writing
+        them in fmt, by default the deployment-wide format, and reading
+        them through cache, by default the shared one.
+        """
+        self.directory = directory
+        self.format = default_format() if fmt is None else check_format(fmt)
+        self.cache = default_cache() if cache is None else cache
+        self.fsync = False
+        self.occupancy = OccupancyJournal(self.path(OCCUPANCY))
+        self.manifest = manifest = read_manifest(directory)
+        if manifest is None:
+            self.journal = ReservationJournal(self.path(RESERVATIONS),
+                                              fmt=self.format)
+        else:
+            self.journal = ShardedJournal(directory, manifest["shards"],
+                                          manifest["generation"],
+                                          fmt=self.format)
+
+    @property
+    def indexed(self):
+        """Single-name lookups are answered from the cache."""
+        return self.cache is not None
+
+    def path(self, kind):
+        """Returns the file path backing a collection."""
+        return os.path.join(self.directory, FILES[kind])
+
+    def load(self, kind):
+        """Reads a collection file, returning an empty list on errors."""
+        if self.cache is None:
+            return self._read(kind)
+        # The cached records are shared; the store mutates its own
+        return [dict(record) for record in self._table(kind)[0]]
+
+    def get(self, kind, name):
+        """Returns one record by name through the cache."""
+        if self.cache is None:
+            return super().get(kind, name)
+        path = self.path(kind)
+        record = self.cache.get(
+            ('record', os.path.abspath(path), name), (path,),
+            lambda: self._table(kind)[1].get(name))
+        return None if record is None else dict(record)
+
+    def _table(self, kind):
+        """Returns the cached records of a collection and their index."""
+        path = self.path(kind)
+
+        def parse():
+            records = self._read(kind)
+            by_name = {}
+            for record in records:
+                by_name.setdefault(record["name"], record)
+            return records, by_name
+
+        return self.cache.get(('table', os.path.abspath(path)), (path,),
+                              parse)
+
+    @instrumented('json.load')
+    def _read(self, kind):
+        """Parses a collection file, returning an empty list on errors."""
+        try:
+            with open(self.path(kind), 'rb') as file:
+                data = file.read()
+            if enabled():
+                count_bytes('json.load', read=len(data))
+            return loads(data)
+        except FileNotFoundError:
+            return []
+        except ValueError:
+            logging.error("Error decoding %s file.", kind)
+            return []
+
+    @instrumented('json.save')
+    def save(self, kind, records=None, changes=None):
+        """
+        Atomically replaces a collection file with the records, or
+        with the saved records updated by changes.
+        """
+        if records is None:
+            records = self.load(kind)
+            position = {}
+            for row, record in enumerate(records):
+                position.setdefault(record["name"], row)
+            for name, record in changes.items():
+                if name in position:
+                    records[position[name]] = record
+                elif record is not None:
+                    position[name] = len(records)
+                    records.append(record)
+            records = [record for record in records if record is not None]
+        data = dumps(records, self.format)
+        atomic_write(self.path(kind), data, self.fsync)
+        self._invalidate(self.path(kind))
+        if enabled():
+            count_bytes('json.save', written=len(data))
+
+    def _invalidate(self, *paths):
+        """Drops the cached entries of files this process rewrote."""
+        if self.cache is not None:
+            for path in paths:
+                self.cache.invalidate(path)
+
+    def set_durability(self, fsync):
+        """Fsyncs collection files and journal appends when set."""
+        self.fsync = fsync
+        self.journal.fsync = fsync
+        self.occupancy.fsync = fsync
+
+    def load_occupancy(self):
+        """Reads the occupancy snapshot and replays its log."""
+        return self.occupancy.load()
+
+    def has_occupancy(self):
+        """Tells whether occupancy was saved in this directory."""
+        return self.occupancy.exists()
+
+    def save_occupancy(self, deltas=(), occupancy=None):
+        """Appends deltas to the occupancy log, or rewrites it."""
+        if occupancy is not None:
+            self.occupancy.rewrite(occupancy)
+        else:
+            self.occupancy.append(deltas)
+
+    def load_waitlist(self):
+        """Reads the waitlist file; it is small, so it is not cached."""
+        return self._read(WAITLIST)
+
+    def save_waitlist(self, entries):
+        """Atomically replaces the waitlist file."""
+        self.save(WAITLIST, records=entries)
+
+    def load_index(self):
+        """Replays the reservation snapshot and journal."""
+        if self.cache is None:
+            return self.journal.load_index()
+        return self._index().copy()
+
+    def _index_key(self):
+        """Returns the cache key of the ReservationIndex."""
+        return ('index',) + tuple(map(os.path.abspath, self.journal.paths))
+
+    def _index(self):
+        """Returns the cached ReservationIndex; do not mutate it."""
+        return self.cache.get(self._index_key(), self.journal.paths,
+                              self.journal.load_index)
+
+    def iter_reservations(self, hotel_name=None, customer_id=None):
+        """
+        Yields from the cached reservations when they are already
+        cached, otherwise streams the snapshot and journal from disk
+        without building the index.
+        """
+        index = (None if self.cache is None else
+                 self.cache.peek(self._index_key(), self.journal.paths))
+        if index is None:
+            return self.journal.iter_reservations(hotel_name, customer_id)
+        return index.find(hotel_name, customer_id)
+
+    def save_rooms(self, taken):
+        """Takes rooms from the saved hotels, rewriting the hotels file."""
+        saved = {hotel["name"]: hotel for hotel in self.load(HOTELS)}
+        changes = {}
+        for name, rooms in taken.items():
+            hotel = saved.get(name)
+            if hotel is None or hotel["rooms"] < rooms:
+                raise ValueError(
+                    f"Hotel {name!r} has fewer than {rooms} rooms left.")
+            hotel["rooms"] -= rooms
+            changes[name] = hotel
+        if changes:
+            self.save(HOTELS, changes=changes)
+
+    def save_reservations(self, events=(), records=None):
+        """Appends events to the journal, or rewrites the snapshot."""
+        if records is not None:
+            self.journal.rewrite(records)
+        else:
+            self.journal.append(events)
+        self._invalidate(*self.journal.paths)
+
+    def lock(self):
+        """
+        Returns the advisory lock of the data directory, taken after
+        the lock of every shard when the reservations are sharded.
+        """
+        if isinstance(self.journal, ShardedJournal):
+            return LockChain(self.journal.locks() + [self.save_lock()])
+        return self.save_lock()
+
+    def hotel_lock(self, hotel_name):
+        """Returns the lock of a hotel's shard, or of the directory."""
+        if isinstance(self.journal, ShardedJournal):
+            return self.journal.lock(hotel_name)
+        return self.save_lock()
+
+    def save_lock(self):
+        """Returns the advisory lock of the data directory alone."""
+        return file_lock(os.path.join(self.directory, LOCK_FILE))
+
+    def stale(self):
+        """Tells whether the directory was resharded since opening."""
+        return read_manifest(self.directory) != self.manifest
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS hotels (
+    name TEXT PRIMARY KEY,
+    rooms INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS customers (
+    name TEXT PRIMARY KEY,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reservations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hotel_name TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    num_rooms INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_by_hotel
+    ON reservations (hotel_name, customer_id);
+CREATE INDEX IF NOT EXISTS reservations_by_customer
+    ON reservations (customer_id);
+CREATE TABLE IF NOT EXISTS waitlist (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS occupancy (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    rooms INTEGER NOT NULL,
+    open_rooms INTEGER NOT NULL,
+    bookings INTEGER NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+'''
+
+
+# Columns read back per collection; a hotel's rooms column is the truth
+_FIELDS = {HOTELS: 'record, rooms', CUSTOMERS: 'record'}
+
+
+def _decode(kind, row):
+    """Returns the record of a hotels or customers row."""
+    record = loads_json(row[0])
+    if kind == HOTELS:
+        record["rooms"] = row[1]
+    return record
+
+
+# Reservation rows fetched at a time while streaming
+FETCH_ROWS = 1000
+
+
+class SqliteBackend(StorageBackend):
+    """
+    A stdlib sqlite3 database holding all three collections.
+    Names are primary keys, so lookups and single-record updates
+    touch one row, and every flush commits in one transaction.
+    A hotel's rooms column is only moved by guarded updates, so two
+    stores cannot both book its last room.
+    """
+    indexed = True
+    guards_rooms = True
+
+    def __init__(self, path):
+        """Opens (and creates when needed) the database at path."""
+        # Imported here so JSON-only processes start without it
+        import sqlite3  # pylint: disable=C0415
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._guard = threading.RLock()
+        self._depth = 0
+
+    @instrumented('sqlite.load')
+    def load(self, kind):
+        """Returns every record of hotels or customers."""
+        with self._guard:
+            rows = self._conn.execute(
+                f'SELECT {_FIELDS[kind]} FROM {kind} ORDER BY rowid'
+            ).fetchall()
+        if enabled():
+            count_bytes('sqlite.load', read=sum(len(row[0]) for row in rows))
+        return [_decode(kind, row) for row in rows]
+
+    @instrumented('sqlite.get')
+    def get(self, kind, name):
+        """Returns one record through the name primary key."""
+        with self._guard:
+            row = self._conn.execute(
+                f'SELECT {_FIELDS[kind]} FROM {kind} WHERE name = ?',
+                (name,)).fetchone()
+        if row and enabled():
+            count_bytes('sqlite.get', read=len(row[0]))
+        return _decode(kind, row) if row else None
+
+    @instrumented('sqlite.save')
+    def save(self, kind, records=None, changes=None):
+        """
+        Upserts and deletes the changed rows, or replaces them all.
+        Rooms are only written with new rows; see save_rooms().
+        """
+        with self.transaction():
+            if changes is None:
+                self._conn.execute(f'DELETE FROM {kind}')
+                changes = {record["name"]: record for record in records}
+            for name, record in changes.items():
+                if record is None:
+                    self._conn.execute(f'DELETE FROM {kind} WHERE name = ?',
+                                       (name,))
+                elif kind == HOTELS:
+                    self._conn.execute(
+                        'INSERT INTO hotels (name, rooms, record) '
+                        'VALUES (?, ?, ?) ON CONFLICT (name) DO UPDATE '
+                        'SET record = excluded.record',
+                        (name, record["rooms"], json.dumps(record)))
+                else:
+                    self._conn.execute(
+                        'INSERT INTO customers (name, record) VALUES (?, ?) '
+                        'ON CONFLICT (name) DO UPDATE '
+                        'SET record = excluded.record',
+                        (name, json.dumps(record)))
+
+    @instrumented('sqlite.save_rooms')
+    def save_rooms(self, taken):
+        """
+        Takes rooms with one guarded UPDATE per hotel, so the rooms a
+        store booked are refused when another store took them first.
+        """
+        with self.transaction():
+            for name, rooms in taken.items():
+                cursor = self._conn.execute(
+                    'UPDATE hotels SET rooms = rooms - ? '
+                    'WHERE name = ? AND rooms >= ?', (rooms, name, rooms))
+                if cursor.rowcount == 0:
+                    raise ValueError(
+                        f"Hotel {name!r} has fewer than {rooms} rooms left.")
+
+    @instrumented('sqlite.load_index')
+    def load_index(self):
+        """Returns every reservation row in a ReservationIndex."""
+        with self._guard:
+            rows = self._conn.execute(
+                'SELECT record FROM reservations ORDER BY id').fetchall()
+        if enabled():
+            count_bytes('sqlite.load_index',
+                        read=sum(len(row[0]) for row in rows))
+        return ReservationIndex(loads_json(row[0]) for row in rows)
+
+    def iter_reservations(self, hotel_name=None, customer_id=None):
+        """Yields reservation rows from a cursor, using the indexes."""
+        clauses, params = self._where(hotel_name, customer_id)
+        query = 'SELECT record FROM reservations'
+        if clauses:
+            query += ' WHERE ' + clauses
+        # A separate cursor streams rows without fetching them all; the
+        # guard is only held while fetching, never across a yield
+        with self._guard:
+            cursor = self._conn.cursor()
+            cursor.execute(query + ' ORDER BY id', params)
+        try:
+            while True:
+                with self._guard:
+                    rows = cursor.fetchmany(FETCH_ROWS)
+                if not rows:
+                    return
+                for row in rows:
+                    yield loads_json(row[0])
+        finally:
+            with self._guard:
+                cursor.close()
+
+    @instrumented('sqlite.save_reservations')
+    def save_reservations(self, events=(), records=None):
+        """Inserts and deletes reservation rows for each event."""
+        with self.transaction():
+            if records is not None:
+                self._conn.execute('DELETE FROM reservations')
+                events = [{"op": CREATE, "reservation": r} for r in records]
+            for event in events:
+                if event["op"] == CREATE:
+                    self._insert_reservation(event["reservation"])
+                elif event["op"] == CANCEL:
+                    self._delete_reservations(event["hotel_name"],
+                                              event_customer(event))
+
+    def _insert_reservation(self, reservation):
+        """Inserts one reservation row."""
+        reservation = normalize(reservation)
+        record = json.dumps(reservation)
+        if enabled():
+            count_bytes('sqlite.save_reservations', written=len(record))
+        self._conn.execute(
+            'INSERT INTO reservations '
+            '(hotel_name, customer_id, num_rooms, record) '
+            'VALUES (?, ?, ?, ?)',
+            (reservation["hotel_name"], reservation["customer_id"],
+             reservation["num_rooms"], record))
+
+    @staticmethod
+    def _where(hotel_name, customer_id):
+        """Builds the WHERE clause selecting a hotel and/or customer."""
+        clauses = []
+        params = []
+        if hotel_name is not None:
+            clauses.append('hotel_name = ?')
+            params.append(hotel_name)
+        if customer_id is not None:
+            clauses.append('customer_id = ?')
+            params.append(customer_id)
+        return ' AND '.join(clauses), params
+
+    def _delete_reservations(self, hotel_name, customer_id):
+        """Deletes the rows matching a cancel event through the indexes."""
+        clauses, params = self._where(hotel_name, customer_id)
+        self._conn.execute('DELETE FROM reservations WHERE ' + clauses,
+                           params)
+
+    @contextmanager
+    def transaction(self):
+        """Runs nested saves inside one IMMEDIATE transaction."""
+        with self._guard:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._depth = 1
+            try:
+                yield
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            else:
+                self._conn.execute('COMMIT')
+            finally:
+                self._depth = 0
+
+    def load_occupancy(self):
+        """
+        Returns the saved totals, or None when none were saved. They
+        are kept apart from the reservation rows so that reconcile()
+        can check them against a recount of the rows.
+        """
+        with self._guard:
+            rows = self._conn.execute(
+                'SELECT kind, key, rooms, open_rooms, bookings '
+                'FROM occupancy').fetchall()
+        if not rows:
+            return None
+        occupancy = Occupancy()
+        for kind, key, rooms, open_rooms, bookings in rows:
+            if kind == 'hotel':
+                occupancy.hotels[key] = {"rooms": rooms,
+                                         "open_rooms": open_rooms,
+                                         "bookings": bookings}
+            elif kind == 'customer':
+                occupancy.customers[key] = {"rooms": rooms,
+                                            "bookings": bookings}
+        return occupancy
+
+    def has_occupancy(self):
+        """Tells whether totals were saved in this database."""
+        with self._guard:
+            return self._conn.execute(
+                'SELECT 1 FROM occupancy LIMIT 1').fetchone() is not None
+
+    @instrumented('sqlite.save_occupancy')
+    def save_occupancy(self, deltas=(), occupancy=None):
+        """Adds deltas to the saved totals, or replaces them all."""
+        with self.transaction():
+            if occupancy is not None:
+                self._conn.execute('DELETE FROM occupancy')
+                self._conn.executemany(
+                    'INSERT INTO occupancy VALUES (?, ?, ?, ?, ?)',
+                    [('hotel', name, totals["rooms"], totals["open_rooms"],
+                      totals["bookings"])
+                     for name, totals in occupancy.hotels.items()] +
+                    [('customer', key, totals["rooms"], 0,
+                      totals["bookings"])
+                     for key, totals in occupancy.customers.items()])
+            for change in deltas:
+                for kind, key, open_rooms in (
+                        ('hotel', change["hotel_name"],
+                         change["open_rooms"]),
+                        ('customer', change["customer_id"], 0)):
+                    self._conn.execute(
+                        'INSERT INTO occupancy VALUES (?, ?, ?, ?, ?) '
+                        'ON CONFLICT (kind, key) DO UPDATE SET '
+                        'rooms = rooms + excluded.rooms, '
+                        'open_rooms = open_rooms + excluded.open_rooms, '
+                        'bookings = bookings + excluded.bookings',
+                        (kind, key, change["rooms"], open_rooms,
+                         change["bookings"]))
+            # The marker row keeps has_occupancy() true once all the
+            # totals fall back to zero
+            self._conn.execute(
+                "DELETE FROM occupancy WHERE rooms = 0 AND open_rooms = 0 "
+                "AND bookings = 0 AND kind != 'saved'")
+            self._conn.execute("INSERT OR IGNORE INTO occupancy "
+                               "VALUES ('saved', '', 0, 0, 0)")
+
+    @instrumented('sqlite.load_waitlist')
+    def load_waitlist(self):
+        """Returns every waitlist row."""
+        with self._guard:
+            rows = self._conn.execute(
+                'SELECT record FROM waitlist ORDER BY id').fetchall()
+        return [loads_json(row[0]) for row in rows]
+
+    @instrumented('sqlite.save_waitlist')
+    def save_waitlist(self, entries):
+        """Replaces the waitlist rows."""
+        with self.transaction():
+            self._conn.execute('DELETE FROM waitlist')
+            self._conn.executemany(
+                'INSERT INTO waitlist (record) VALUES (?)',
+                [(json.dumps(entry),) for entry in entries])
+
+    def set_durability(self, fsync):
+        """Uses synchronous=FULL when every commit must be durable."""
+        with self._guard:
+            self._conn.execute('PRAGMA synchronous=' +
+                               ('FULL' if fsync else 'NORMAL'))
+
+    def lock(self):
+        """Returns an advisory lock next to the database file."""
+        return file_lock(self.path + '.lock')
+
+    def close(self):
+        """Closes the database connection."""
+        self._conn.close()
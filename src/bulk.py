@@ -0,0 +1,394 @@
+'''
+This script is focused on importing and exporting hotels, customers
+and reservations in bulk, as CSV or JSON Lines files.
+Rows are parsed and validated in batches across a process pool; the
+valid rows are then merged into the store in one session and written
+once, instead of rewriting a whole file per record.
+The functions pertaining to this script are
+a. Importing a file, reporting every rejected row with its reason
+b. Exporting a collection to a file
+
+Usage:
+    python -m src.bulk import hotels hotels.csv --report rejected.jsonl
+    python -m src.bulk export reservations reservations.jsonl
+'''
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from src.backends import CUSTOMERS, HOTELS, RESERVATIONS
+from src.durability import MANUAL
+from src.inventory import night
+from src.store import BEST_EFFORT, Store
+
+CSV = 'csv'
+JSONL = 'jsonl'
+
+FORMATS = (CSV, JSONL)
+
+# Columns written on export, in order; imports accept them too
+FIELDS = {
+    HOTELS: ('name', 'address', 'rooms'),
+    CUSTOMERS: ('id', 'name', 'email', 'phone_number'),
+    RESERVATIONS: ('hotel_name', 'customer_id', 'customer_name',
+                   'num_rooms', 'check_in', 'check_out')
+}
+
+# Rows handed to a worker at a time
+BATCH_SIZE = 5000
+
+
+def file_format(path):
+    """Returns the format of a file from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return CSV
+    if extension in ('.jsonl', '.ndjson'):
+        return JSONL
+    raise ValueError(f"Cannot tell the format of {path!r}; pass fmt.")
+
+
+def _integer(value):
+    """Returns value as an int, or None when it is not one."""
+    # pylint: disable-next=unidiomatic-typecheck
+    if type(value) is int:
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _text(row, field):
+    """Returns a field as a stripped string, '' when missing."""
+    value = row.get(field)
+    return '' if value is None else str(value).strip()
+
+
+def _validate(kind, row):
+    """
+    Returns (record, None) for a valid row of kind, or (None, reason).
+    Only checks one row; names and references are checked on merge.
+    """
+    if not isinstance(row, dict):
+        return None, "not an object"
+    if kind == HOTELS:
+        rooms = _integer(row.get('rooms'))
+        if not _text(row, 'name'):
+            return None, "missing name"
+        if rooms is None or rooms < 0:
+            return None, "rooms must be a non-negative integer"
+        return {"name": _text(row, 'name'),
+                "address": _text(row, 'address'), "rooms": rooms}, None
+    if kind == CUSTOMERS:
+        if not _text(row, 'name'):
+            return None, "missing name"
+        return {"id": _text(row, 'id') or None, "name": _text(row, 'name'),
+                "email": _text(row, 'email'),
+                "phone_number": _text(row, 'phone_number')}, None
+    num_rooms = _integer(row.get('num_rooms'))
+    if not _text(row, 'hotel_name'):
+        return None, "missing hotel_name"
+    if not _text(row, 'customer_name') and not _text(row, 'customer_id'):
+        return None, "missing customer_name or customer_id"
+    if num_rooms is None or num_rooms < 1:
+        return None, "num_rooms must be a positive integer"
+    dates = (_text(row, 'check_in'), _text(row, 'check_out'))
+    if any(dates):
+        try:
+            if night(dates[0]) >= night(dates[1]):
+                return None, "check_out must follow check_in"
+        except ValueError:
+            return None, "invalid dates"
+    return {"hotel_name": _text(row, 'hotel_name'),
+            "customer_name": _text(row, 'customer_name') or None,
+            "customer_id": _text(row, 'customer_id') or None,
+            "num_rooms": num_rooms,
+            "dates": dates if any(dates) else ()}, None
+
+
+def _parse_batch(job):
+    """
+    Parses and validates one batch of (line, text) rows in a worker,
+    returning the valid (line, record) pairs and the rejections.
+    """
+    kind, fmt, header, rows = job
+    valid = []
+    rejected = []
+    for line, text in rows:
+        if fmt == JSONL:
+            try:
+                row = json.loads(text)
+            except ValueError as error:
+                rejected.append({"line": line, "reason": f"invalid JSON: "
+                                 f"{error.msg}", "row": text.rstrip('\n')})
+                continue
+        else:
+            values = next(csv.reader(io.StringIO(text)), [])
+            if len(values) != len(header):
+                rejected.append({"line": line, "reason": f"expected "
+                                 f"{len(header)} fields, got {len(values)}",
+                                 "row": text.rstrip('\r\n')})
+                continue
+            row = dict(zip(header, values))
+        record, reason = _validate(kind, row)
+        if reason is None:
+            valid.append((line, record))
+        else:
+            rejected.append({"line": line, "reason": reason, "row": row})
+    return valid, rejected
+
+
+def _rows(file, fmt):
+    """
+    Yields (line, text) for every row of an open file, keeping quoted
+    CSV fields that span lines together.
+    """
+    pending = ''
+    start = 0
+    for line, text in enumerate(file, 1):
+        if fmt == CSV:
+            if not pending:
+                start = line
+            pending += text
+            # A row ends once its quotes are balanced
+            if pending.count('"') % 2:
+                continue
+            text, line, pending = pending, start, ''
+        if text.strip():
+            yield line, text
+    if pending.strip():
+        yield start, pending
+
+
+def _batches(rows, size):
+    """Groups rows into lists of at most size rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _map(function, jobs, workers):
+    """Runs function over jobs in a process pool, in order."""
+    jobs = iter(jobs)
+    head = list(islice(jobs, 2))
+    if len(head) < 2 or workers == 1:
+        # Not worth starting a pool
+        yield from map(function, chain(head, jobs))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(function, chain(head, jobs))
+
+
+def parse(kind, path, fmt=None, workers=None, batch_size=BATCH_SIZE):
+    """
+    Parses and validates a CSV or JSON Lines file of kind across
+    workers processes, returning the valid (line, record) pairs and
+    the rejected rows, both in file order.
+    """
+    if kind not in FIELDS:
+        raise ValueError(f"Unknown collection {kind!r}.")
+    fmt = fmt or file_format(path)
+    valid = []
+    rejected = []
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        header = None
+        rows = _rows(file, fmt)
+        if fmt == CSV:
+            first = next(rows, None)
+            if first is None:
+                return valid, rejected
+            header = [name.strip() for name in
+                      next(csv.reader(io.StringIO(first[1])))]
+        jobs = ((kind, fmt, header, batch)
+                for batch in _batches(rows, batch_size))
+        for batch_valid, batch_rejected in _map(_parse_batch, jobs,
+                                                workers):
+            valid.extend(batch_valid)
+            rejected.extend(batch_rejected)
+    return valid, rejected
+
+
+def import_records(kind, path, directory='.', fmt=None, workers=None,
+                   batch_size=BATCH_SIZE):
+    """
+    Imports the rows of a CSV or JSON Lines file into the kind
+    collection of the store in directory, written in one flush.
+    Returns a report of the rows read, the rows imported and the
+    rejected rows with their line and reason.
+    """
+    valid, rejected = parse(kind, path, fmt, workers, batch_size)
+    read = len(valid) + len(rejected)
+    with Store(directory, durability=MANUAL) as store:
+        if kind == RESERVATIONS:
+            imported = _merge_reservations(store, valid, rejected)
+        else:
+            imported = _merge_named(store, kind, valid, rejected)
+    rejected.sort(key=lambda entry: entry["line"])
+    return {"kind": kind, "read": read,
+            "imported": imported, "rejected": rejected}
+
+
+def _merge_named(store, kind, valid, rejected):
+    """Adds hotels or customers, rejecting names already taken."""
+    seen = set()
+    ids = ({customer["id"] for customer in store.customers}
+           if kind == CUSTOMERS else set())
+    imported = 0
+    for line, record in valid:
+        reason = None
+        if record["name"] in seen:
+            reason = "duplicate name in file"
+        elif kind == HOTELS:
+            if not store.create_hotel(record["name"], record["address"],
+                                      record["rooms"]):
+                reason = "name already exists"
+        elif record["id"] is not None and record["id"] in ids:
+            reason = "id already exists"
+        elif not store.create_customer(record["name"], record["email"],
+                                       record["phone_number"],
+                                       record["id"]):
+            reason = "name already exists"
+        seen.add(record["name"])
+        if reason is None:
+            # Rows without an id are given a fresh one by the store
+            if record.get("id") is not None:
+                ids.add(record["id"])
+            imported += 1
+        else:
+            rejected.append({"line": line, "reason": reason, "row": record})
+    return imported
+
+
+def _merge_reservations(store, valid, rejected):
+    """Books the reservations, rejecting unknown references."""
+    names = {customer["id"]: customer["name"]
+             for customer in store.customers}
+    bookings = []
+    lines = []
+    for line, record in valid:
+        customer_name = record["customer_name"]
+        if record["customer_id"] is not None:
+            customer_name = names.get(record["customer_id"])
+            if customer_name is None:
+                rejected.append({"line": line, "reason": "unknown customer",
+                                 "row": record})
+                continue
+        bookings.append((record["hotel_name"], customer_name,
+                         record["num_rooms"]) + record["dates"])
+        lines.append(line)
+    report = store.create_reservations(bookings, BEST_EFFORT)
+    failures = iter(report["rejected"])
+    failure = next(failures, None)
+    for line, booking in zip(lines, bookings):
+        if failure is not None and failure["booking"] is booking:
+            rejected.append({"line": line, "reason": failure["reason"],
+                             "row": list(booking)})
+            failure = next(failures, None)
+    return len(report["accepted"])
+
+
+def _encode_batch(job):
+    """Encodes one batch of records as CSV or JSON Lines text."""
+    fmt, fields, records = job
+    if fmt == JSONL:
+        return ''.join(json.dumps(record) + '\n' for record in records)
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fields, extrasaction='ignore',
+                            lineterminator='\n')
+    writer.writerows(records)
+    return text.getvalue()
+
+
+def export_records(kind, path, directory='.', fmt=None, workers=None,
+                   batch_size=BATCH_SIZE):
+    """
+    Writes the kind collection of the store in directory to a CSV or
+    JSON Lines file, encoding batches across workers processes, and
+    returns the number of records written.
+    """
+    if kind not in FIELDS:
+        raise ValueError(f"Unknown collection {kind!r}.")
+    fmt = fmt or file_format(path)
+    fields = FIELDS[kind]
+    count = [0]
+    with Store(directory) as store:
+        if kind == RESERVATIONS:
+            names = {customer["id"]: customer["name"]
+                     for customer in store.customers}
+            records = (dict(reservation, customer_name=names.get(
+                reservation["customer_id"]))
+                for reservation in store.iter_reservations())
+        else:
+            records = iter(store.collection(kind))
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            if fmt == CSV:
+                csv.writer(file, lineterminator='\n').writerow(fields)
+            jobs = ((fmt, fields, batch)
+                    for batch in _batches(records, batch_size))
+            for text in _map(_encode_batch, _counted(jobs, count), workers):
+                file.write(text)
+    return count[0]
+
+
+def _counted(jobs, total):
+    """Yields jobs, adding the records of each to total[0]."""
+    for job in jobs:
+        total[0] += len(job[2])
+        yield job
+
+
+def _print_report(report, output):
+    """Writes the rejected rows as JSON Lines and prints a summary."""
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            for entry in report["rejected"]:
+                file.write(json.dumps(entry) + '\n')
+    else:
+        for entry in report["rejected"]:
+            print(f"line {entry['line']}: {entry['reason']}",
+                  file=sys.stderr)
+    print(f"{report['kind']}: {report['read']} read, {report['imported']} "
+          f"imported, {len(report['rejected'])} rejected")
+
+
+def main(argv=None):
+    """Parses the command line and runs an import or an export."""
+    parser = argparse.ArgumentParser(
+        description='Import or export records as CSV or JSON Lines.')
+    parser.add_argument('command', choices=('import', 'export'))
+    parser.add_argument('kind', choices=tuple(FIELDS))
+    parser.add_argument('path', help='CSV or JSON Lines file')
+    parser.add_argument('--directory', default='.',
+                        help='directory holding the data files')
+    parser.add_argument('--format', choices=FORMATS,
+                        help='file format, by default from the extension')
+    parser.add_argument('--workers', type=int,
+                        help='worker processes, by default one per CPU')
+    parser.add_argument('--report',
+                        help='file to write the rejected rows to')
+    args = parser.parse_args(argv)
+    if args.command == 'import':
+        report = import_records(args.kind, args.path, args.directory,
+                                args.format, args.workers)
+        _print_report(report, args.report)
+        return 1 if report["rejected"] else 0
+    count = export_records(args.kind, args.path, args.directory,
+                           args.format, args.workers)
+    print(f"{args.kind}: {count} exported")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+'''
+This script is focused on generating the FileCache class, the
+read-through cache the JSON backend parses its files through.
+Every entry remembers the os.stat signature (mtime, size, inode) of
+the files it was parsed from and is only served while they are
+unchanged, so edits made by other processes are picked up on the next
+read, while this process's own writes drop their entries at once.
+The methods pertaining containing the FileCache class are
+a. Reading a value through the cache, or only when already cached
+b. Invalidating the entries parsed from a file
+c. Evicting the least recently used entries past the entry and
+   memory caps, measured on the parsed values
+'''
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 4096
+# Measured in bytes of the parsed values held in memory
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def signature(paths):
+    """Returns the (mtime, size, inode) of each path, None if missing."""
+    found = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            found.append(None)
+        else:
+            found.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(found)
+
+
+def parsed_size(value):
+    """
+    Returns the bytes a parsed value takes in memory, counting what
+    its lists, tuples and dictionaries hold, each object only once.
+    Other objects report their own size through __sizeof__.
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return total
+
+
+class FileCache:
+    """
+    An LRU cache of values parsed from files. Entries are keyed by the
+    caller and each depends on a tuple of paths; callers must not
+    mutate the values they are given. Past max_entries entries or
+    max_bytes of cost the least recently used entries are evicted.
+    """
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        """Initializes an empty cache with its caps."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Key -> (paths, signature, value, cost), least recent first
+        self._entries = OrderedDict()
+        # Path -> keys of the entries parsed from it
+        self._keys = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Returns the number of entries held."""
+        return len(self._entries)
+
+    def get(self, key, paths, load, cost=None):
+        """
+        Returns the value cached under key while paths are unchanged,
+        otherwise the value of load(), which is then cached. cost maps
+        the value to its size; by default its parsed_size().
+        """
+        paths = tuple(os.path.abspath(path) for path in paths)
+        current = signature(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == current:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        value = load()
+        size = parsed_size(value) if cost is None else cost(value)
+        with self._lock:
+            self._drop(key)
+            if size <= self.max_bytes and self.max_entries > 0:
+                self._entries[key] = (paths, current, value, size)
+                self._bytes += size
+                for path in paths:
+                    self._keys.setdefault(path, set()).add(key)
+                self._evict()
+        return value
+
+    def peek(self, key, paths):
+        """
+        Returns the value cached under key while paths are unchanged,
+        or None, never loading it.
+        """
+        paths = tuple(os.path.abspath(path) for path in paths)
+        current = signature(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != current:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def invalidate(self, path):
+        """Drops every entry parsed from path."""
+        with self._lock:
+            for key in self._keys.pop(os.path.abspath(path), ()):
+                self._drop(key)
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._bytes = 0
+
+    def info(self):
+        """Returns the hits, misses, entries and bytes held."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "bytes": self._bytes}
+
+    def _drop(self, key):
+        """Removes one entry. Hold _lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[3]
+        for path in entry[0]:
+            keys = self._keys.get(path)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys[path]
+
+    def _evict(self):
+        """Drops the least recent entries past the caps. Hold _lock."""
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+
+
+# The cache shared by every JSON backend of the process, or None
+_DEFAULT = [FileCache()]
+
+
+def default_cache():
+    """Returns the cache JSON backends read through, or None."""
+    return _DEFAULT[0]
+
+
+def set_default_cache(cache):
+    """Sets the cache JSON backends read through; None disables it."""
+    _DEFAULT[0] = cache
@@ -0,0 +1,164 @@
+'''
+This script is focused on applying a stream of operations, one JSON
+command per line, against a single in-memory Store session instead of
+a file round trip per operation. Each command is an object naming its
+"op" and the keyword arguments of the Store method, e.g.
+    {"op": "create_hotel", "name": "Kyatt Hotel",
+     "address": "786 Mountain View Rd", "rooms": 50}
+and yields one JSON result line. An optional "id" is echoed back.
+The functions pertaining to this script are
+a. Applying one command to a Store
+b. Streaming a file of commands, checkpointing every N commands
+c. Reporting the throughput once the stream ends
+
+Usage:
+    python -m src commands.jsonl --checkpoint 1000 > results.jsonl
+    cat commands.jsonl | python -m src - --directory data
+'''
+import argparse
+import inspect
+import sys
+import time
+from src.durability import MANUAL
+from src.serialization import dumps_json, loads_json
+from src.store import Store
+
+# Operations a command may name; each is the Store method of that name
+OPERATIONS = frozenset((
+    'create_hotel', 'modify_hotel', 'delete_hotel',
+    'create_customer', 'modify_customer', 'delete_customer',
+    'create_reservation', 'cancel_reservation', 'leave_waitlist'))
+
+# Type of every argument a command may pass, checked before applying it
+ARGUMENT_TYPES = {
+    'name': str, 'new_name': str, 'address': str, 'new_address': str,
+    'email': str, 'new_email': str, 'phone_number': str, 'new_phone': str,
+    'customer_id': str, 'hotel_name': str, 'customer_name': str,
+    'check_in': str, 'check_out': str, 'rooms': int, 'new_rooms': int,
+    'num_rooms': int, 'priority': int, 'waitlist': bool}
+
+# Arguments whose None selects every hotel or customer
+NULLABLE = frozenset(('hotel_name', 'customer_name'))
+
+CHECKPOINT = 1000
+
+
+def check_arguments(op, arguments):
+    """
+    Returns why arguments do not fit the Store method op, or None.
+    Commands are checked whole first, so one is never half applied.
+    """
+    signature = inspect.signature(getattr(Store, op))
+    try:
+        signature.bind(None, **arguments)
+    except TypeError as error:
+        return str(error)
+    for key, value in arguments.items():
+        if value is None and (key in NULLABLE or
+                              signature.parameters[key].default is None):
+            continue
+        expected = ARGUMENT_TYPES.get(key, object)
+        # bool is an int, but True is not a number of rooms
+        if not isinstance(value, expected) or (
+                expected is int and isinstance(value, bool)):
+            return f"{key} must be of type {expected.__name__}"
+    return None
+
+
+def apply_command(store, command):
+    """
+    Applies one decoded command to store and returns its result
+    dictionary. Invalid commands are reported, never raised.
+    """
+    if not isinstance(command, dict):
+        return {"ok": False, "error": "command must be an object"}
+    arguments = dict(command)
+    op = arguments.pop("op", None)
+    result = {"op": op}
+    if "id" in arguments:
+        result["id"] = arguments.pop("id")
+    if op not in OPERATIONS:
+        result.update(ok=False, error=f"unknown op {op!r}")
+        return result
+    error = check_arguments(op, arguments)
+    if error is not None:
+        result.update(ok=False, error=error)
+        return result
+    try:
+        value = getattr(store, op)(**arguments)
+    except (TypeError, ValueError) as error:
+        result.update(ok=False, error=str(error))
+        return result
+    # Refused creates and modifies return False, cancels the (possibly
+    # empty) list of cancelled reservations and deletes always None
+    result.update(ok=value is None or bool(value), result=value)
+    return result
+
+
+def process(store, lines, output, checkpoint=CHECKPOINT):
+    """
+    Applies the commands of an iterable of JSON lines to store, writes
+    a result line per command to the binary output and flushes the
+    store every checkpoint commands. Returns the run's statistics.
+    """
+    stats = {"commands": 0, "failed": 0, "checkpoints": 0}
+    started = time.perf_counter()
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            result = {"line": number,
+                      **apply_command(store, loads_json(line))}
+        except ValueError:
+            result = {"line": number, "ok": False, "error": "invalid JSON"}
+        output.write(dumps_json(result) + b'\n')
+        stats["commands"] += 1
+        stats["failed"] += not result["ok"]
+        if checkpoint and stats["commands"] % checkpoint == 0:
+            store.flush()
+            output.flush()
+            stats["checkpoints"] += 1
+    store.flush()
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    """Parses the command line and processes the commands."""
+    parser = argparse.ArgumentParser(
+        prog='python -m src',
+        description='Apply a JSON Lines file of commands in one session.')
+    parser.add_argument('commands', nargs='?', default='-',
+                        help='file of commands, - (the default) for stdin')
+    parser.add_argument('--directory', default='.',
+                        help='directory holding the data files')
+    parser.add_argument('--checkpoint', type=int, default=CHECKPOINT,
+                        help='commands between flushes to disk, 0 for '
+                        'only at the end')
+    parser.add_argument('--output',
+                        help='file to write the results to, by default '
+                        'stdout')
+    args = parser.parse_args(argv)
+    opened = []
+    if args.commands == '-':
+        source = sys.stdin.buffer
+    else:
+        source = open(args.commands, 'rb')  # pylint: disable=R1732
+        opened.append(source)
+    if args.output is None:
+        output = sys.stdout.buffer
+    else:
+        output = open(args.output, 'wb')  # pylint: disable=R1732
+        opened.append(output)
+    try:
+        with Store(args.directory, durability=MANUAL) as store:
+            stats = process(store, source, output, args.checkpoint)
+    finally:
+        output.flush()
+        for file in opened:
+            file.close()
+    rate = stats["commands"] / stats["seconds"] if stats["seconds"] else 0
+    print(f"{stats['commands']} commands in {stats['seconds']:.3f} s "
+          f"({rate:,.0f}/s), {stats['failed']} failed, "
+          f"{stats['checkpoints']} checkpoints", file=sys.stderr)
+    return 1 if stats["failed"] else 0
@@ -5,100 +5,108 @@ a. Creating a Customer
 b. Deleting a Customer
 c. Displaying Customer Information
 d. Modifying Customer Information
+e. Reading the rooms and bookings of a Customer
 '''
-import json
+from src.instrumentation import instrumented
+from src.store import session, CUSTOMERS
 
 
 class Customer:
     """A class representing a customer with name, email, and phone number."""
-    def __init__(self, name, email, phone_number):
+    __slots__ = ('name', 'email', 'phone_number', 'customer_id')
+
+    def __init__(self, name, email, phone_number, customer_id=None):
         """
         Initializes a new Customer object with the specified name,
-        email, and phone number.
+        email, and phone number. customer_id is the stable id the
+        store assigns, which reservations refer to.
         """
         self.name = name
         self.email = email
         self.phone_number = phone_number
+        self.customer_id = customer_id
 
     def to_dict(self):
         """Convert Customer object to dictionary."""
-        return {
+        data = {
             "name": self.name,
             "email": self.email,
             "phone_number": self.phone_number
         }
+        if self.customer_id is not None:
+            data["id"] = self.customer_id
+        return data
 
     @classmethod
     def from_dict(cls, data):
         """Creates an instance of the class from a dictionary."""
-        return cls(data["name"], data["email"], data["phone_number"])
+        return cls(data["name"], data["email"], data["phone_number"],
+                   data.get("id"))
 
     @staticmethod
+    @instrumented('Customer.create_customer')
     def create_customer(name, email, phone_number):
         """Creates a new customer and saves it to the JSON file."""
-        customer = Customer(name, email, phone_number)
-        customers = Customer.load_customers()
-        customers.append(customer)
-        Customer.save_customers(customers)
+        with session() as store:
+            return store.create_customer(name, email, phone_number)
 
     @staticmethod
+    @instrumented('Customer.delete_customer')
     def delete_customer(name):
         """Deletes a customer by name."""
-        customers = Customer.load_customers()
-        # Filter customers, keep only those who do not match the name
-        customers = [c for c in customers if c.name != name]
-        Customer.save_customers(customers)
+        with session() as store:
+            store.delete_customer(name)
 
     @staticmethod
+    @instrumented('Customer.display_customer_info')
     def display_customer_info(name):
         """Displays customer information."""
-        customers = Customer.load_customers()
-        for customer in customers:
-            if customer.name == name:
-                print(customer.display_info())
+        with session() as store:
+            customer = store.find_customer(name)
+        if customer is not None:
+            print(Customer.from_dict(customer).display_info())
 
     @staticmethod
+    @instrumented('Customer.modify_customer_info')
     def modify_customer_info(name, new_name=None,
                              new_email=None, new_phone=None):
         """Modifies customer information."""
-        customers = Customer.load_customers()
-        for customer in customers:
-            if customer.name == name:  # Match by customer name
-                if new_name:
-                    customer.name = new_name
-                if new_email:
-                    customer.email = new_email
-                if new_phone:
-                    customer.phone_number = new_phone
-                Customer.save_customers(customers)
-                break
+        with session() as store:
+            return store.modify_customer(name, new_name=new_name,
+                                         new_email=new_email,
+                                         new_phone=new_phone)
+
+    @staticmethod
+    @instrumented('Customer.occupancy')
+    def occupancy(name):
+        """Returns the rooms held and the bookings of a customer."""
+        with session() as store:
+            return store.customer_occupancy(name)
 
     def display_info(self):
         """Displays the customer information in a readable format."""
         return f"Name:{self.name},Email:{self.email},Phone:{self.phone_number}"
 
     @staticmethod
+    @instrumented('Customer.load_customers')
     def load_customers():
         """Loads the list of customers from a JSON file."""
-        try:
-            with open('customers.json', 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                # Convert each dictionary to a Customer object
-                return [Customer.from_dict(customer) for customer in data]
-        except FileNotFoundError:
-            return []
-        except json.JSONDecodeError:
-            return []
+        with session() as store:
+            # Convert each dictionary to a Customer object
+            return [Customer.from_dict(customer)
+                    for customer in store.customers]
 
     @staticmethod
+    @instrumented('Customer.save_customers')
     def save_customers(customers):
         """Save customers to file."""
-        with open('customers.json', 'w', encoding='utf-8') as file:
+        with session() as store:
             # Save list of customer dictionaries
-            json.dump([customer.to_dict()
-                       for customer in customers], file, indent=4)
+            store.replace(CUSTOMERS, [customer.to_dict()
+                                      for customer in customers])
 
     @staticmethod
+    @instrumented('Customer.get_customers')
     def get_customers():
         """Returns a list of all customers."""
         return Customer.load_customers()
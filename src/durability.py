@@ -0,0 +1,147 @@
+'''
+This script is focused on generating the DurabilityPolicy class
+which decides when a Store writes its dirty collections and how hard
+the backend works to make those writes survive a crash.
+The modes pertaining to the DurabilityPolicy class are
+a. immediate: every mutation is flushed atomically and fsynced
+b. coalesced: flushes happen at most every N ms or M mutations
+c. manual: only explicit flushes (and leaving a ``with`` block) write
+'''
+import json
+import os
+import tempfile
+
+IMMEDIATE = 'immediate'
+COALESCED = 'coalesced'
+MANUAL = 'manual'
+
+MODES = (IMMEDIATE, COALESCED, MANUAL)
+
+
+class DurabilityPolicy:
+    """
+    A persistence setting shared by hotels, customers and reservations.
+    Files are always replaced atomically, so a crash never leaves a
+    truncated collection; only immediate also fsyncs every write.
+    """
+    def __init__(self, mode=MANUAL, interval_ms=None, max_mutations=None):
+        """
+        Initializes a policy. interval_ms and max_mutations only apply
+        to coalesced mode, which needs at least one of them.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown durability mode {mode!r}.")
+        if mode == COALESCED and interval_ms is None and \
+                max_mutations is None:
+            raise ValueError("Coalesced mode needs interval_ms or "
+                             "max_mutations.")
+        self.mode = mode
+        self.interval_ms = interval_ms
+        self.max_mutations = max_mutations
+
+    def __repr__(self):
+        """Returns the policy as its constructor call."""
+        return (f"DurabilityPolicy({self.mode!r}, "
+                f"interval_ms={self.interval_ms!r}, "
+                f"max_mutations={self.max_mutations!r})")
+
+    @property
+    def fsync(self):
+        """True when every write must reach the disk before returning."""
+        return self.mode == IMMEDIATE
+
+    @property
+    def interval(self):
+        """The coalescing interval in seconds, or None."""
+        if self.mode != COALESCED or self.interval_ms is None:
+            return None
+        return self.interval_ms / 1000
+
+    def due(self, mutations, elapsed):
+        """
+        Tells whether a flush is due after mutations changes made over
+        elapsed seconds since the last flush.
+        """
+        if self.mode == IMMEDIATE:
+            return True
+        if self.mode == MANUAL:
+            return False
+        if self.max_mutations is not None and \
+                mutations >= self.max_mutations:
+            return True
+        return self.interval is not None and elapsed >= self.interval
+
+    @classmethod
+    def parse(cls, setting):
+        """
+        Returns a policy from a DurabilityPolicy, a mode name or a
+        "coalesced:<ms>[:<mutations>]" string such as "coalesced:50".
+        """
+        if isinstance(setting, cls):
+            return setting
+        mode, *limits = str(setting).split(':')
+        values = [int(limit) if limit else None for limit in limits]
+        values += [None] * (2 - len(values))
+        return cls(mode, *values[:2])
+
+
+# The policy of stores built without one, e.g. by session()
+_DEFAULT = [DurabilityPolicy()]
+
+
+def default_durability():
+    """Returns the policy used by stores built without one."""
+    return _DEFAULT[0]
+
+
+def set_default_durability(setting):
+    """Sets the policy of stores built without one, for a deployment."""
+    _DEFAULT[0] = DurabilityPolicy.parse(setting)
+
+
+def atomic_write_json(path, data, fsync=False, **dump_options):
+    """Writes data as JSON to path with atomic_write()."""
+    atomic_write(path, json.dumps(data, **dump_options).encode('utf-8'),
+                 fsync)
+
+
+def atomic_write(path, data, fsync=False):
+    """
+    Writes the bytes data to a temporary file next to path and renames
+    it over path, so readers see the old or the new file, never half
+    of one. With fsync the file and its directory are forced to disk.
+    """
+    directory = os.path.dirname(path) or '.'
+    handle, temporary = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            # mkstemp creates the file private; keep the target's mode
+            try:
+                mode = os.stat(path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o644
+            os.chmod(temporary, mode)
+            file.write(data)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    if fsync:
+        fsync_directory(directory)
+
+
+def fsync_directory(directory):
+    """Forces a directory entry change (such as a rename) to disk."""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:  # pragma: no cover - Windows cannot open directories
+        return
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
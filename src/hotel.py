@@ -7,8 +7,12 @@ c. Displaying Hotel Information
 d. Modifying Hotel Information
 e. Reserving a Room
 f. Canceling a Reservation
+g. Querying the rooms available over a range of nights
+h. Searching the hotels with enough rooms, page by page
+i. Reading the rooms and bookings of a Hotel
 '''
-import json
+from src.instrumentation import instrumented
+from src.store import session, HOTELS
 
 
 class Hotel:
@@ -16,6 +20,8 @@ class Hotel:
     A class representing a hotel with a name,
     address, and number of rooms.
     """
+    __slots__ = ('name', 'address', 'rooms')
+
     def __init__(self, name, address, rooms):
         """
         Initializes a new Hotel object with the specified name,
@@ -26,19 +32,18 @@ class Hotel:
         self.rooms = rooms
 
     @staticmethod
+    @instrumented('Hotel.create_hotel')
     def create_hotel(name, address, rooms):
         '''This method is used to create a hotel'''
-        hotels = Hotel.load_hotels()
-        new_hotel = Hotel(name, address, rooms)
-        hotels.append(new_hotel.to_dict())
-        Hotel.save_hotels(hotels)
+        with session() as store:
+            return store.create_hotel(name, address, rooms)
 
     @staticmethod
+    @instrumented('Hotel.delete_hotel')
     def delete_hotel(hotel_name):
         '''This method is used to delete a hotel'''
-        hotels = Hotel.load_hotels()
-        hotels = [h for h in hotels if h["name"] != hotel_name]
-        Hotel.save_hotels(hotels)
+        with session() as store:
+            store.delete_hotel(hotel_name)
 
     def display_info(self):
         '''This method is used to display hotel information'''
@@ -55,67 +60,101 @@ class Hotel:
         return cls(data["name"], data["address"], data["rooms"])
 
     @staticmethod
+    @instrumented('Hotel.display_hotel_info')
     def display_hotel_info(hotel_name):
         """Displays the information of a hotel by its name"""
-        hotels = Hotel.load_hotels()
-        for hotel in hotels:
-            if hotel["name"] == hotel_name:
-                print(Hotel.from_dict(hotel).display_info())
+        with session() as store:
+            hotel = store.find_hotel(hotel_name)
+        if hotel is not None:
+            print(Hotel.from_dict(hotel).display_info())
 
     @staticmethod
+    @instrumented('Hotel.modify_hotel_info')
     def modify_hotel_info(hotel_name, new_name=None,
                           new_address=None, new_rooms=None):
         """Modifies the information of an existing hotel"""
-        hotels = Hotel.load_hotels()
-        for hotel in hotels:
-            if hotel["name"] == hotel_name:
-                if new_name:
-                    hotel["name"] = new_name
-                if new_address:
-                    hotel["address"] = new_address
-                if new_rooms is not None:
-                    hotel["rooms"] = new_rooms
-                Hotel.save_hotels(hotels)
-                break
+        with session() as store:
+            return store.modify_hotel(hotel_name, new_name=new_name,
+                                      new_address=new_address,
+                                      new_rooms=new_rooms)
+
+    @staticmethod
+    @instrumented('Hotel.available_rooms')
+    def available_rooms(hotel_name, check_in, check_out):
+        """
+        Returns the fewest rooms free on any night of a stay, or None
+        for an unknown hotel or invalid dates.
+        """
+        with session() as store:
+            return store.min_free_rooms(hotel_name, check_in, check_out)
+
+    @staticmethod
+    @instrumented('Hotel.occupancy')
+    def occupancy(hotel_name):
+        """
+        Returns the rooms held, the rooms held by open-ended bookings
+        and the bookings of a hotel.
+        """
+        with session() as store:
+            return store.hotel_occupancy(hotel_name)
 
+    @instrumented('Hotel.reserve_room')
     def reserve_room(self, num_rooms):
         """Reserves rooms at the hotel if there are enough available"""
         if self.rooms >= num_rooms:
             self.rooms -= num_rooms
+            with session() as store:
+                store.set_rooms(self.name, self.rooms)
             return True
         return False
 
+    @instrumented('Hotel.cancel_reservation')
     def cancel_reservation(self, num_rooms):
         """This method is used to cancel reservations"""
         self.rooms += num_rooms
+        with session() as store:
+            store.set_rooms(self.name, self.rooms)
 
-        # Load the hotels
-        hotels = Hotel.load_hotels()
-
-        # Update the specific hotel in the list
-        for hotel in hotels:
-            if hotel["name"] == self.name:
-                hotel["rooms"] = self.rooms
+    @staticmethod
+    @instrumented('Hotel.search_hotels')
+    def search_hotels(num_rooms, address_prefix=None, limit=10, after=None):
+        """
+        Returns a page of the hotels that can take num_rooms rooms, most
+        rooms first, with the cursor of the next page under "next".
+        """
+        with session() as store:
+            return store.search_hotels(num_rooms, address_prefix, limit,
+                                       after)
 
-        # Save the updated list of hotels
-        Hotel.save_hotels(hotels)
+    @staticmethod
+    def iter_available_hotels(num_rooms, address_prefix=None,
+                              page_size=100):
+        """Yields every hotel that can take num_rooms, page by page."""
+        after = None
+        while True:
+            page = Hotel.search_hotels(num_rooms, address_prefix,
+                                       page_size, after)
+            yield from page["hotels"]
+            after = page["next"]
+            if after is None:
+                return
 
     @staticmethod
+    @instrumented('Hotel.load_hotels')
     def load_hotels():
         """Loads the list of hotels from the 'hotels.json' file"""
-        try:
-            with open('hotels.json', 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return []
+        with session() as store:
+            return [dict(hotel) for hotel in store.hotels]
 
     @staticmethod
+    @instrumented('Hotel.save_hotels')
     def save_hotels(hotels):
         """Saves the list of hotels to the 'hotels.json' file."""
-        with open('hotels.json', 'w', encoding='utf-8') as file:
-            json.dump(hotels, file, indent=4)
+        with session() as store:
+            store.replace(HOTELS, [dict(hotel) for hotel in hotels])
 
     @staticmethod
+    @instrumented('Hotel.get_hotels')
     def get_hotels():
         """Returns the list of hotels."""
         return Hotel.load_hotels()
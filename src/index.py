@@ -0,0 +1,357 @@
+'''
+This script is focused on generating the ReservationIndex class
+The index keeps reservations in a columnar table together with
+secondary indexes so cancellations never scan the whole list.
+The methods pertaining containing the ReservationIndex class are
+a. Adding a Reservation
+b. Finding Reservations by hotel, customer or both, lazily
+c. Cancelling matching Reservations
+d. Tracking the rooms booked per night at each hotel
+e. Moving a hotel's Reservations to its new name
+Reservations reference customers by id; the legacy format embedding
+the whole customer record is upgraded as reservations are added.
+Reservations without check_in/check_out dates are open-ended: they
+hold their rooms every night and are counted in the hotel's rooms.
+'''
+import sys
+import uuid
+from array import array
+from src.instrumentation import count_scanned, enabled
+from src.inventory import SegmentTree, iso, night
+
+# Namespace deriving the id of customers saved before ids existed
+LEGACY_CUSTOMER_NAMESPACE = uuid.UUID(
+    '6f1c2d1e-5b0a-4c8e-9a57-3f4b2e8d7c10')
+
+
+def new_customer_id():
+    """Returns a fresh, stable customer id."""
+    return uuid.uuid4().hex
+
+
+def legacy_customer_id(name):
+    """
+    Returns the id given to a customer saved before ids existed.
+    It only depends on the name, so legacy customers and the legacy
+    reservations embedding them agree without a lookup.
+    """
+    return uuid.uuid5(LEGACY_CUSTOMER_NAMESPACE, name).hex
+
+
+def is_legacy(reservation):
+    """Tells whether a reservation still embeds its customer."""
+    return "customer_id" not in reservation
+
+
+def customer_key(reservation):
+    """Returns the customer id a reservation refers to."""
+    if is_legacy(reservation):
+        return legacy_customer_id(reservation['customer']['name'])
+    return reservation['customer_id']
+
+
+def normalize(reservation):
+    """Returns a reservation referencing its customer by id."""
+    if not is_legacy(reservation):
+        return reservation
+    upgraded = {key: value for key, value in reservation.items()
+                if key != 'customer'}
+    upgraded['customer_id'] = customer_key(reservation)
+    return upgraded
+
+
+class _Codes:
+    """Interns keys such as hotel names as small integer codes."""
+    __slots__ = ('keys', '_codes')
+
+    def __init__(self):
+        """Initializes an empty code table."""
+        self.keys = []
+        self._codes = {}
+
+    def code(self, key):
+        """Returns the code of key, assigning the next one when new."""
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.keys)
+            self.keys.append(sys.intern(key))
+        return code
+
+    def get(self, key):
+        """Returns the code of key, or None when it was never seen."""
+        return self._codes.get(key)
+
+    def rename(self, key, new_key):
+        """Gives the code of key to new_key, which must be unseen."""
+        code = self._codes.pop(key)
+        self.keys[code] = sys.intern(new_key)
+        self._codes[new_key] = code
+
+    def __sizeof__(self):
+        """Returns the bytes the table and its keys take."""
+        return (object.__sizeof__(self) + sys.getsizeof(self.keys) +
+                sys.getsizeof(self._codes) +
+                sum(sys.getsizeof(key) for key in self.keys))
+
+    def copy(self):
+        """Returns an independent copy of the table."""
+        codes = _Codes()
+        codes.keys = list(self.keys)
+        codes._codes = dict(self._codes)
+        return codes
+
+
+# Fields held in columns; any other field is kept per reservation
+_COLUMNS = ('hotel_name', 'customer_id', 'num_rooms', 'check_in',
+            'check_out')
+
+# Smallest num_rooms the 32-bit column holds
+_INT_MIN = -2 ** 31
+
+
+class ReservationIndex:
+    """
+    Reservations held column by column: hotel and customer keys are
+    integer codes into interned key tables and num_rooms is a plain
+    array, so a reservation costs a few bytes instead of a dict.
+    Reservations are numbered in booking order and indexed by hotel
+    and by customer; cancelled rows are dropped on the next compaction.
+    Dated reservations also feed a per-hotel SegmentTree of the rooms
+    booked each night, built the first time a hotel is queried.
+    """
+    def __init__(self, reservations=()):
+        """Initializes the index with an iterable of reservations."""
+        # True once a legacy reservation has been upgraded on add
+        self.upgraded = False
+        # Hotel name -> rooms booked per night by dated reservations
+        self._trees = {}
+        self._clear()
+        for reservation in reservations:
+            self.add(reservation)
+
+    def _clear(self):
+        """Empties the key tables, the columns and the indexes."""
+        self._hotels = _Codes()
+        self._customers = _Codes()
+        self._hotel_column = array('I')
+        self._customer_column = array('I')
+        self._rooms_column = array('i')
+        # Date ordinals, 0 for open-ended reservations
+        self._check_in_column = array('I')
+        self._check_out_column = array('I')
+        self._alive = bytearray()
+        self._live = 0
+        # Row -> fields that do not fit the columns
+        self._extra = {}
+        self._by_hotel = {}
+        self._by_customer = {}
+
+    def __len__(self):
+        """Returns the number of reservations held."""
+        return self._live
+
+    def __sizeof__(self):
+        """
+        Returns the bytes the key tables, the columns and the indexes
+        take, so caches can measure an index; the trees are left out.
+        """
+        size = object.__sizeof__(self) + sum(map(sys.getsizeof, (
+            self._hotels, self._customers, self._hotel_column,
+            self._customer_column, self._rooms_column,
+            self._check_in_column, self._check_out_column, self._alive,
+            self._extra, self._by_hotel, self._by_customer)))
+        size += sum(sys.getsizeof(extra) for extra in self._extra.values())
+        return size + sum(sys.getsizeof(rows) for table in (
+            self._by_hotel, self._by_customer) for rows in table.values())
+
+    def copy(self):
+        """
+        Returns an independent copy of the index, e.g. of one kept in
+        a cache. The per-night trees are rebuilt on demand.
+        """
+        index = ReservationIndex()
+        index.upgraded = self.upgraded
+        index._hotels = self._hotels.copy()
+        index._customers = self._customers.copy()
+        for name in ('_hotel_column', '_customer_column', '_rooms_column',
+                     '_check_in_column', '_check_out_column'):
+            setattr(index, name, getattr(self, name)[:])
+        index._alive = bytearray(self._alive)
+        index._live = self._live
+        index._extra = {row: dict(extra)
+                        for row, extra in self._extra.items()}
+        index._by_hotel = {key: rows[:]
+                           for key, rows in self._by_hotel.items()}
+        index._by_customer = {key: rows[:]
+                              for key, rows in self._by_customer.items()}
+        return index
+
+    def records(self):
+        """Returns the reservations in booking order."""
+        return [self._record(row) for row in range(len(self._alive))
+                if self._alive[row]]
+
+    def _record(self, row):
+        """Builds the dictionary of one row."""
+        record = {
+            "hotel_name": self._hotels.keys[self._hotel_column[row]],
+            "customer_id": self._customers.keys[self._customer_column[row]],
+            "num_rooms": self._rooms_column[row]
+        }
+        if self._check_in_column[row]:
+            record["check_in"] = iso(self._check_in_column[row])
+            record["check_out"] = iso(self._check_out_column[row])
+        extra = self._extra.get(row)
+        if extra:
+            record.update(extra)
+        return record
+
+    def add(self, reservation):
+        """Adds a reservation, upgrading a legacy one, and returns its row."""
+        if is_legacy(reservation):
+            reservation = normalize(reservation)
+            self.upgraded = True
+        row = len(self._alive)
+        hotel = self._hotels.code(reservation['hotel_name'])
+        customer = self._customers.code(reservation['customer_id'])
+        num_rooms = reservation.get('num_rooms')
+        extra = {key: value for key, value in reservation.items()
+                 if key not in _COLUMNS}
+        # pylint: disable-next=unidiomatic-typecheck
+        if type(num_rooms) is not int or not _INT_MIN <= num_rooms < -_INT_MIN:
+            extra['num_rooms'] = num_rooms
+            num_rooms = 0
+        nights = _nights(reservation)
+        if nights is None:
+            extra.update((key, reservation[key])
+                         for key in ('check_in', 'check_out')
+                         if key in reservation)
+            nights = (0, 0)
+        if extra:
+            self._extra[row] = extra
+        self._check_in_column.append(nights[0])
+        self._check_out_column.append(nights[1])
+        tree = self._trees.get(reservation['hotel_name'])
+        if tree is not None and nights[0]:
+            tree.add(nights[0], nights[1], num_rooms)
+        self._hotel_column.append(hotel)
+        self._customer_column.append(customer)
+        self._rooms_column.append(num_rooms)
+        self._alive.append(1)
+        self._live += 1
+        self._by_hotel.setdefault(hotel, array('I')).append(row)
+        self._by_customer.setdefault(customer, array('I')).append(row)
+        return row
+
+    def _rows(self, hotel_name=None, customer_id=None):
+        """Yields the live rows matching a hotel, a customer or both."""
+        hotel = None if hotel_name is None else self._hotels.get(hotel_name)
+        customer = (None if customer_id is None
+                    else self._customers.get(customer_id))
+        if ((hotel_name is not None and hotel is None) or
+                (customer_id is not None and customer is None)):
+            return iter(())
+        if customer is not None:
+            # A customer's bookings are few, so filter them by hotel
+            rows = self._by_customer.get(customer, ())
+            if hotel is not None:
+                rows = [row for row in rows
+                        if self._hotel_column[row] == hotel]
+        elif hotel is not None:
+            rows = self._by_hotel.get(hotel, ())
+        else:
+            rows = range(len(self._alive))
+        if enabled():
+            count_scanned('index.lookup', len(rows))
+        return (row for row in rows if self._alive[row])
+
+    def find(self, hotel_name=None, customer_id=None):
+        """
+        Yields the reservations matching a hotel and/or a customer, one
+        at a time; the index must not change until the caller is done.
+        """
+        return map(self._record, self._rows(hotel_name, customer_id))
+
+    def cancel(self, hotel_name=None, customer_id=None):
+        """Removes and returns the reservations matching the filters."""
+        rows = list(self._rows(hotel_name, customer_id))
+        cancelled = [self._record(row) for row in rows]
+        for row in rows:
+            self._alive[row] = 0
+            self._extra.pop(row, None)
+            tree = self._trees.get(
+                self._hotels.keys[self._hotel_column[row]])
+            if tree is not None and self._check_in_column[row]:
+                tree.add(self._check_in_column[row],
+                         self._check_out_column[row],
+                         -self._rooms_column[row])
+        self._live -= len(rows)
+        dead = len(self._alive) - self._live
+        if dead > self._live and dead >= 1024:
+            self._compact()
+        return cancelled
+
+    def rename_hotel(self, hotel_name, new_name):
+        """
+        Moves a hotel's reservations and night tree to new_name and
+        returns how many live reservations moved.
+        """
+        code = self._hotels.get(hotel_name)
+        if code is None:
+            return 0
+        moved = sum(self._alive[row] for row in self._by_hotel.get(code, ()))
+        tree = self._trees.pop(hotel_name, None)
+        target = self._hotels.get(new_name)
+        if target is None:
+            self._hotels.rename(hotel_name, new_name)
+            if tree is not None:
+                self._trees[new_name] = tree
+            return moved
+        # Rows left under new_name by an earlier hotel join the moved
+        # ones, still in booking order; the tree is rebuilt on demand
+        self._trees.pop(new_name, None)
+        rows = self._by_hotel.pop(code, array('I'))
+        for row in rows:
+            self._hotel_column[row] = target
+        self._by_hotel[target] = array('I', sorted(
+            self._by_hotel.get(target, array('I')) + rows))
+        return moved
+
+    def _compact(self):
+        """Rebuilds the columns without the cancelled rows."""
+        records = self.records()
+        # The trees already hold the live rows, so keep them aside
+        trees, self._trees = self._trees, {}
+        self._clear()
+        for record in records:
+            self.add(record)
+        self._trees = trees
+
+    def inventory(self, hotel_name):
+        """
+        Returns the SegmentTree of the rooms booked each night at a
+        hotel by its dated reservations, building it on first use.
+        """
+        tree = self._trees.get(hotel_name)
+        if tree is None:
+            tree = self._trees[hotel_name] = SegmentTree()
+            hotel = self._hotels.get(hotel_name)
+            for row in self._by_hotel.get(hotel, ()):
+                if self._alive[row] and self._check_in_column[row]:
+                    tree.add(self._check_in_column[row],
+                             self._check_out_column[row],
+                             self._rooms_column[row])
+        return tree
+
+
+def _nights(reservation):
+    """
+    Returns the (check_in, check_out) ordinals of a reservation, or
+    None when it is open-ended or its dates are not a valid range.
+    """
+    try:
+        check_in = night(reservation['check_in'])
+        check_out = night(reservation['check_out'])
+    except (KeyError, ValueError):
+        return None
+    return (check_in, check_out) if check_in < check_out else None
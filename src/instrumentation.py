@@ -0,0 +1,200 @@
+'''
+This script is focused on generating the instrumentation layer
+that times loads, saves and public operations and counts the bytes
+and records they move. It is off by default and then costs a single
+flag check per instrumented call.
+The functions pertaining to this script are
+a. Enabling, disabling and resetting the counters
+b. Decorating a function so its calls are counted and timed
+c. Recording bytes read and written and records scanned
+d. Reading every counter with stats(), or logging them periodically
+'''
+import functools
+import logging
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Latency histogram buckets: bucket i holds calls of under 2**i µs
+BUCKETS = 24
+
+_ENABLED = False
+_GUARD = threading.Lock()
+_METRICS = {}
+
+
+class _Metric:
+    """The counters kept for one instrumented name."""
+    __slots__ = ('calls', 'total_ns', 'max_ns', 'histogram', 'bytes_read',
+                 'bytes_written', 'lookups', 'records_scanned')
+
+    def __init__(self):
+        """Initializes every counter at zero."""
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = [0] * BUCKETS
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.lookups = 0
+        self.records_scanned = 0
+
+    def as_dict(self):
+        """Returns the counters, with latencies in milliseconds."""
+        data = {"calls": self.calls,
+                "total_ms": round(self.total_ns / 1e6, 3),
+                "mean_ms": round(self.total_ns / self.calls / 1e6, 4)
+                if self.calls else 0.0,
+                "max_ms": round(self.max_ns / 1e6, 4),
+                "p50_ms": _quantile(self.histogram, self.calls, 0.50),
+                "p99_ms": _quantile(self.histogram, self.calls, 0.99),
+                "histogram_us": {f"<{2 ** i}": count for i, count
+                                 in enumerate(self.histogram) if count}}
+        if self.bytes_read or self.bytes_written:
+            data["bytes_read"] = self.bytes_read
+            data["bytes_written"] = self.bytes_written
+        if self.lookups:
+            data["lookups"] = self.lookups
+            data["records_scanned"] = self.records_scanned
+            data["scanned_per_lookup"] = round(
+                self.records_scanned / self.lookups, 2)
+        return data
+
+
+def _quantile(histogram, calls, fraction):
+    """Returns the upper bound, in ms, of the bucket holding a quantile."""
+    if not calls:
+        return 0.0
+    seen = 0
+    for bucket, count in enumerate(histogram):
+        seen += count
+        if seen >= fraction * calls:
+            return 2 ** bucket / 1000
+    return 2 ** (BUCKETS - 1) / 1000
+
+
+def _metric(name):
+    """Returns the counters of name, creating them. Hold _GUARD."""
+    metric = _METRICS.get(name)
+    if metric is None:
+        metric = _METRICS[name] = _Metric()
+    return metric
+
+
+def enable(enabled=True):
+    """Turns instrumentation on (or off with enabled=False)."""
+    global _ENABLED  # pylint: disable=global-statement
+    _ENABLED = enabled
+
+
+def disable():
+    """Turns instrumentation off, keeping the counters."""
+    enable(False)
+
+
+def enabled():
+    """Tells whether instrumentation is on."""
+    return _ENABLED
+
+
+def reset():
+    """Clears every counter."""
+    with _GUARD:
+        _METRICS.clear()
+
+
+def stats():
+    """Returns a snapshot of every counter, keyed by instrumented name."""
+    with _GUARD:
+        return {name: metric.as_dict()
+                for name, metric in sorted(_METRICS.items())}
+
+
+def record(name, elapsed_ns):
+    """Counts one call of name that took elapsed_ns nanoseconds."""
+    bucket = min(BUCKETS - 1, (elapsed_ns // 1000).bit_length())
+    with _GUARD:
+        metric = _metric(name)
+        metric.calls += 1
+        metric.total_ns += elapsed_ns
+        metric.max_ns = max(metric.max_ns, elapsed_ns)
+        metric.histogram[bucket] += 1
+
+
+def count_bytes(name, read=0, written=0):
+    """Adds bytes read and written on behalf of name."""
+    if _ENABLED:
+        with _GUARD:
+            metric = _metric(name)
+            metric.bytes_read += read
+            metric.bytes_written += written
+
+
+def count_scanned(name, records):
+    """Counts one lookup of name that examined records records."""
+    if _ENABLED:
+        with _GUARD:
+            metric = _metric(name)
+            metric.lookups += 1
+            metric.records_scanned += records
+
+
+def instrumented(name):
+    """
+    Decorates a function so each call is counted and timed under
+    name while instrumentation is enabled.
+    """
+    def decorate(function):
+        """Wraps function with the timing code."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            """Times the call when instrumentation is enabled."""
+            if not _ENABLED:
+                return function(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter_ns() - start)
+        return wrapper
+    return decorate
+
+
+class Reporter:
+    """A daemon thread logging stats() every interval seconds."""
+    def __init__(self, interval=60.0, logger=None, level=logging.INFO):
+        """Initializes a reporter; call start() to begin logging."""
+        self.interval = interval
+        self.logger = logger or _LOGGER
+        self.level = level
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='instrumentation-reporter')
+
+    def start(self):
+        """Starts the reporting thread and returns the reporter."""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the reporting thread after a final report."""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        """Logs the counters until stopped."""
+        while not self._stopped.wait(self.interval):
+            self.report()
+        self.report()
+
+    def report(self):
+        """Logs one line per instrumented name."""
+        for name, data in stats().items():
+            self.logger.log(self.level, "%s %s", name, data)
+
+
+def start_reporter(interval=60.0, logger=None, level=logging.INFO):
+    """Enables instrumentation and logs its stats every interval."""
+    enable()
+    return Reporter(interval, logger, level).start()
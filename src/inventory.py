@@ -0,0 +1,101 @@
+'''
+This script is focused on generating the SegmentTree class
+used to track the rooms booked at a hotel night by night.
+Nights are date ordinals, so a booking from check-in to check-out
+covers the half-open range [check_in, check_out).
+The methods pertaining containing the SegmentTree class are
+a. Adding rooms over a range of nights
+b. Finding the most rooms booked on any night of a range
+'''
+from datetime import date
+
+# Every date ordinal fits below this power of two
+NIGHTS = 2 ** 22
+
+
+def night(value):
+    """
+    Returns the ordinal of a date or ISO "YYYY-MM-DD" string.
+    Raises ValueError for anything else.
+    """
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    if not isinstance(value, date):
+        raise ValueError(f"Invalid date {value!r}.")
+    return value.toordinal()
+
+
+def iso(ordinal):
+    """Returns the ISO string of a date ordinal."""
+    return date.fromordinal(ordinal).isoformat()
+
+
+class SegmentTree:
+    """
+    A sparse segment tree over nights supporting range add and range
+    maximum in O(log n). Nodes are created only along booked ranges
+    and live in parallel lists; each node keeps the rooms added over
+    its whole range plus the maximum of its subtree. Positions never
+    added to count as 0, so values must not drop below zero.
+    """
+    __slots__ = ('size', '_left', '_right', '_added', '_max')
+
+    def __init__(self, size=NIGHTS):
+        """Initializes an empty tree over positions [0, size)."""
+        self.size = size
+        self._left = [0]
+        self._right = [0]
+        self._added = [0]
+        self._max = [0]
+
+    def _child(self, node, right):
+        """Returns a child of node, creating it when missing."""
+        children = self._right if right else self._left
+        if not children[node]:
+            children[node] = len(self._max)
+            for column in (self._left, self._right, self._added, self._max):
+                column.append(0)
+        return children[node]
+
+    def add(self, start, end, value):
+        """Adds value to every position in [start, end)."""
+        if start < end:
+            self._add(0, 0, self.size, start, end, value)
+
+    def _add(self, node, low, high, start, end, value):
+        """Adds value over the part of [start, end) inside the node."""
+        if start <= low and high <= end:
+            self._added[node] += value
+            self._max[node] += value
+            return
+        middle = (low + high) // 2
+        if start < middle:
+            self._add(self._child(node, False), low, middle,
+                      start, end, value)
+        if middle < end:
+            self._add(self._child(node, True), middle, high,
+                      start, end, value)
+        self._max[node] = self._added[node] + max(
+            self._max[self._left[node]] if self._left[node] else 0,
+            self._max[self._right[node]] if self._right[node] else 0)
+
+    def max(self, start, end):
+        """Returns the largest value of a position in [start, end)."""
+        if start >= end:
+            return 0
+        return self._query(0, 0, self.size, start, end)
+
+    def _query(self, node, low, high, start, end):
+        """Returns the maximum over the part of [start, end) in node."""
+        if start <= low and high <= end:
+            return self._max[node]
+        middle = (low + high) // 2
+        best = 0
+        for child, child_low, child_high in (
+                (self._left[node], low, middle),
+                (self._right[node], middle, high)):
+            if start < child_high and child_low < end:
+                if child:
+                    best = max(best, self._query(child, child_low,
+                                                 child_high, start, end))
+        return self._added[node] + best
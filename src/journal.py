@@ -0,0 +1,320 @@
+'''
+This script is focused on generating the ReservationJournal class
+Reservations are kept as a snapshot, in either serialization format,
+plus an append-only log holding one JSON event per line.
+The methods pertaining containing the ReservationJournal class are
+a. Appending create and cancel events
+b. Replaying the snapshot and the log
+c. Streaming reservations with bounded memory
+d. Compacting the log into the snapshot
+'''
+import logging
+import os
+import threading
+from src.index import (ReservationIndex, customer_key, legacy_customer_id,
+                       normalize)
+from src.instrumentation import count_bytes, enabled, instrumented
+from src.locking import file_lock
+from src.serialization import (check_format, default_format, dumps,
+                               dumps_json, iter_records, loads, loads_json)
+
+CREATE = 'create'
+CANCEL = 'cancel'
+
+
+def create_event(reservation):
+    """Builds the log event recording a new reservation."""
+    return {"op": CREATE, "reservation": reservation}
+
+
+def cancel_event(hotel_name=None, customer_id=None):
+    """
+    Builds the log event cancelling the reservations of a customer
+    at a hotel; leaving either key as None matches every value.
+    """
+    return {"op": CANCEL, "hotel_name": hotel_name,
+            "customer_id": customer_id}
+
+
+def event_customer(event):
+    """Returns the customer id of a cancel event, reading old events."""
+    if "customer_id" in event:
+        return event["customer_id"]
+    name = event.get("customer_name")
+    return None if name is None else legacy_customer_id(name)
+
+
+def apply_event(index, event):
+    """Applies one event to a ReservationIndex."""
+    if event["op"] == CREATE:
+        index.add(event["reservation"])
+    elif event["op"] == CANCEL:
+        index.cancel(event["hotel_name"], event_customer(event))
+    else:
+        logging.warning("Ignoring unknown journal event %r.", event["op"])
+
+
+def _cancelled(reservation, position, cancels):
+    """
+    Tells whether a reservation created at position (-1 for the
+    snapshot) is removed by a later event of cancels, which maps
+    (hotel_name, customer_name) keys to their last log position.
+    """
+    hotel_name = reservation['hotel_name']
+    customer_id = customer_key(reservation)
+    return any(cancels.get(key, -1) > position
+               for key in ((hotel_name, customer_id),
+                           (hotel_name, None), (None, customer_id)))
+
+
+def _file_size(path):
+    """Returns the size of a file in bytes, 0 when it is missing."""
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+class ReservationJournal:
+    """
+    A reservation store made of a snapshot file and an event log.
+    Writes only ever append to the log; compaction folds the log
+    back into the snapshot, in the background once the log grows
+    past compact_bytes.
+    """
+    def __init__(self, snapshot_path, log_path=None,
+                 compact_bytes=1024 * 1024, fmt=None):
+        """
+        Initializes a journal over snapshot_path. The log defaults to
+        the snapshot path with a .jsonl extension. Snapshots are
+        written in fmt, by default the deployment-wide format.
+        """
+        self.snapshot_path = snapshot_path
+        self.format = default_format() if fmt is None else check_format(fmt)
+        self.log_path = log_path or (
+            os.path.splitext(snapshot_path)[0] + '.jsonl')
+        self.compact_bytes = compact_bytes
+        # Set to fsync every append before it returns
+        self.fsync = False
+        # Guards the files against every thread and process; the
+        # compaction lock is held by the one running compaction
+        self._lock = file_lock(snapshot_path + '.lock')
+        self._compaction_lock = file_lock(self._rotated_path + '.lock')
+        self._compactor = None
+
+    @property
+    def _rotated_path(self):
+        """The log being folded by an in-progress compaction."""
+        return self.log_path + '.compacting'
+
+    @property
+    def _staged_path(self):
+        """The snapshot written by an in-progress compaction."""
+        return self.snapshot_path + '.new'
+
+    @property
+    def paths(self):
+        """Every file the reservations are read from."""
+        return (self.snapshot_path, self._rotated_path, self.log_path,
+                self._staged_path)
+
+    def load(self):
+        """Returns the reservations of the snapshot with the log replayed."""
+        return self.load_index().records()
+
+    @instrumented('journal.load_index')
+    def load_index(self):
+        """Returns a ReservationIndex of the snapshot and the log."""
+        with self._lock:
+            self._recover()
+            index = ReservationIndex(self._read_snapshot(self.snapshot_path))
+            paths = (self.snapshot_path, self._rotated_path, self.log_path)
+            for path in paths[1:]:
+                for event in self._read_log(path):
+                    apply_event(index, event)
+            if enabled():
+                count_bytes('journal.load_index',
+                            read=sum(map(_file_size, paths)))
+            return index
+
+    def iter_reservations(self, hotel_name=None, customer_id=None):
+        """
+        Yields the current reservations one at a time, optionally only
+        those of a hotel and/or a customer. The snapshot is streamed
+        from disk; only the log, which compaction keeps small, is read
+        up front.
+        """
+        with self._lock:
+            self._recover()
+            events = [event for path in (self._rotated_path, self.log_path)
+                      for event in self._read_log(path)]
+            try:
+                # pylint: disable=consider-using-with
+                snapshot = open(self.snapshot_path, 'rb')
+            except FileNotFoundError:
+                snapshot = None
+        cancels = {}
+        for position, event in enumerate(events):
+            if event["op"] == CANCEL:
+                cancels[(event["hotel_name"],
+                         event_customer(event))] = position
+
+        def wanted(reservation):
+            return ((hotel_name is None or
+                     reservation['hotel_name'] == hotel_name) and
+                    (customer_id is None or
+                     customer_key(reservation) == customer_id))
+
+        if snapshot is not None:
+            with snapshot:
+                try:
+                    for reservation in iter_records(snapshot):
+                        if (wanted(reservation) and
+                                not _cancelled(reservation, -1, cancels)):
+                            yield normalize(reservation)
+                except ValueError:
+                    logging.error("Error decoding reservations file.")
+        for position, event in enumerate(events):
+            if event["op"] != CREATE:
+                continue
+            reservation = event["reservation"]
+            if (wanted(reservation) and
+                    not _cancelled(reservation, position, cancels)):
+                yield normalize(reservation)
+
+    @instrumented('journal.append')
+    def append(self, events):
+        """Appends events to the log in a single write."""
+        if not events:
+            return
+        lines = b''.join(dumps_json(event) + b'\n' for event in events)
+        if enabled():
+            count_bytes('journal.append', written=len(lines))
+        with self._lock:
+            with open(self.log_path, 'ab') as file:
+                file.write(lines)
+                if self.fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+        self.maybe_compact()
+
+    @instrumented('journal.rewrite')
+    def rewrite(self, reservations):
+        """Replaces the snapshot with reservations and clears the log."""
+        with self._lock:
+            self._recover()
+            self._write_snapshot(self._staged_path, reservations)
+            for path in (self._rotated_path, self.log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            os.replace(self._staged_path, self.snapshot_path)
+
+    def remove(self):
+        """
+        Deletes the snapshot, the log, any compaction leftovers and
+        the lock files of a journal no longer in use.
+        """
+        self.wait()
+        with self._lock:
+            for path in (self.snapshot_path, self.log_path,
+                         self._rotated_path, self._staged_path,
+                         self._compaction_lock.path, self._lock.path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def log_size(self):
+        """Returns the size of the pending log in bytes."""
+        return _file_size(self.log_path)
+
+    def maybe_compact(self):
+        """Starts a background compaction once the log is large enough."""
+        if self.compact_bytes is None:
+            return
+        if self.log_size() < self.compact_bytes:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def wait(self):
+        """Waits for a running background compaction to finish."""
+        if self._compactor is not None:
+            self._compactor.join()
+
+    @instrumented('journal.compact')
+    def compact(self):
+        """
+        Folds the log into the snapshot. The log is first rotated so
+        that appends made while folding land in a fresh log. Returns
+        at once when another thread or process is compacting.
+        """
+        if not self._compaction_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                self._recover()
+                # A rotated log left by a crash is folded before a new one
+                if not os.path.exists(self._rotated_path):
+                    if not os.path.exists(self.log_path):
+                        return
+                    os.replace(self.log_path, self._rotated_path)
+                index = ReservationIndex(
+                    self._read_snapshot(self.snapshot_path))
+            for event in self._read_log(self._rotated_path):
+                apply_event(index, event)
+            with self._lock:
+                # A rewrite() in the meantime supersedes this compaction
+                if os.path.exists(self._rotated_path):
+                    self._write_snapshot(self._staged_path,
+                                         index.records())
+                    os.remove(self._rotated_path)
+                    os.replace(self._staged_path, self.snapshot_path)
+        finally:
+            self._compaction_lock.release()
+
+    def _recover(self):
+        """
+        Finishes or rolls back a compaction interrupted by a crash.
+        Compaction stages, swaps in and removes its snapshot under the
+        lock, so a staged file seen while holding it was left by a
+        crash; it is complete only once the rotated log is gone.
+        """
+        if not os.path.exists(self._staged_path):
+            return
+        if os.path.exists(self._rotated_path):
+            os.remove(self._staged_path)
+        else:
+            os.replace(self._staged_path, self.snapshot_path)
+
+    @staticmethod
+    def _read_snapshot(path):
+        """Reads the snapshot list, returning an empty list on errors."""
+        try:
+            with open(path, 'rb') as file:
+                return loads(file.read())
+        except FileNotFoundError:
+            return []
+        except ValueError:
+            logging.error("Error decoding reservations file.")
+            return []
+
+    @staticmethod
+    def _read_log(path):
+        """Yields the events of a log, skipping a torn final line."""
+        try:
+            with open(path, 'rb') as file:
+                for line in file:
+                    try:
+                        yield loads_json(line)
+                    except ValueError:
+                        logging.error("Skipping corrupt journal line.")
+        except FileNotFoundError:
+            return
+
+    def _write_snapshot(self, path, reservations):
+        """Writes a snapshot file and forces it to disk."""
+        with open(path, 'wb') as file:
+            file.write(dumps(reservations, self.format))
+            file.flush()
+            os.fsync(file.fileno())
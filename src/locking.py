@@ -0,0 +1,168 @@
+'''
+This script is focused on generating the locking helpers
+used to keep concurrent bookings from overbooking a hotel.
+The classes pertaining to this script are
+a. FileLock, an advisory fcntl lock shared between processes
+b. LockChain, several FileLocks taken in order as one
+c. KeyedLocks, one in-process lock per hotel name
+'''
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+LOCK_FILE = '.store.lock'
+
+
+class FileLock:
+    """
+    An exclusive advisory lock on a file, held across processes.
+    The lock is reentrant within a process; on platforms without
+    fcntl it only excludes threads of the current process.
+    """
+    def __init__(self, path):
+        """Initializes a lock on path, creating the file when needed."""
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self, blocking=True):
+        """
+        Blocks until the lock is held. Without blocking, returns False
+        at once when another thread or process holds it.
+        """
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            # pylint: disable=consider-using-with
+            file = open(self.path, 'a', encoding='utf-8')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking
+                                else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    file.close()
+                    self._thread_lock.release()
+                    return False
+            self._file = file
+        self._depth += 1
+        return True
+
+    def release(self):
+        """Releases one level of the lock."""
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        """Acquires the lock."""
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Releases the lock."""
+        self.release()
+
+
+class LockChain:
+    """
+    FileLocks taken in order and released in reverse, used as one
+    lock, e.g. every shard of a data directory and then the directory.
+    """
+    def __init__(self, locks):
+        """Initializes the chain over locks, in the order to take them."""
+        self.locks = list(locks)
+
+    def acquire(self, blocking=True):
+        """
+        Takes every lock in order. Without blocking, releases those
+        taken and returns False as soon as one is held elsewhere.
+        """
+        for number, lock in enumerate(self.locks):
+            if not lock.acquire(blocking):
+                for held in reversed(self.locks[:number]):
+                    held.release()
+                return False
+        return True
+
+    def release(self):
+        """Releases every lock, the last taken first."""
+        for lock in reversed(self.locks):
+            lock.release()
+
+    def __enter__(self):
+        """Acquires the locks."""
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Releases the locks."""
+        self.release()
+
+
+# One FileLock object per lock path so threads share its reentrancy
+_FILE_LOCKS = {}
+_FILE_LOCKS_GUARD = threading.Lock()
+
+
+def file_lock(path):
+    """Returns the process-wide FileLock for a lock file path."""
+    path = os.path.abspath(path)
+    with _FILE_LOCKS_GUARD:
+        if path not in _FILE_LOCKS:
+            _FILE_LOCKS[path] = FileLock(path)
+        return _FILE_LOCKS[path]
+
+
+def directory_lock(directory):
+    """Returns the process-wide FileLock guarding a data directory."""
+    return file_lock(os.path.join(directory, LOCK_FILE))
+
+
+class KeyedLocks:
+    """A lazily created threading lock per key, such as a hotel name."""
+    def __init__(self):
+        """Initializes an empty lock table."""
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key):
+        """Returns the lock for key, creating it on first use."""
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.RLock()
+            return lock
+
+    def holding(self, keys):
+        """
+        Returns a context manager holding the locks of every key.
+        Keys are locked in sorted order so batches cannot deadlock.
+        """
+        return _Holding([self.get(key) for key in sorted(set(keys))])
+
+
+class _Holding:
+    """Context manager acquiring a list of locks in order."""
+    def __init__(self, locks):
+        """Stores the locks to acquire."""
+        self._locks = locks
+
+    def __enter__(self):
+        """Acquires every lock in order."""
+        for lock in self._locks:
+            lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Releases the locks in reverse order."""
+        for lock in reversed(self._locks):
+            lock.release()
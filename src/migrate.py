@@ -0,0 +1,52 @@
+'''
+This script is focused on migrating the JSON files into a SQLite
+database so the Store can run on the SqliteBackend.
+
+Usage:
+    python -m src.migrate --source . --target store.db
+'''
+import argparse
+from src.backends import (CUSTOMERS, HOTELS, JsonBackend, RESERVATIONS,
+                          SqliteBackend)
+from src.store import Store
+
+
+def migrate(source_directory, target_path):
+    """
+    Copies hotels, customers and reservations from the JSON files in
+    source_directory into the database at target_path, replacing its
+    contents, and returns the number of records copied per collection.
+    """
+    source = Store(backend=JsonBackend(source_directory))
+    target = SqliteBackend(target_path)
+    counts = {}
+    try:
+        with target.transaction():
+            for kind in (HOTELS, CUSTOMERS):
+                records = source.collection(kind)
+                target.save(kind, records=records)
+                counts[kind] = len(records)
+            reservations = source.reservations
+            target.save_reservations(records=reservations)
+            counts[RESERVATIONS] = len(reservations)
+    finally:
+        target.close()
+    return counts
+
+
+def main(argv=None):
+    """Parses the command line and runs the migration."""
+    parser = argparse.ArgumentParser(
+        description='Import the JSON data files into a SQLite database.')
+    parser.add_argument('--source', default='.',
+                        help='directory holding the JSON files')
+    parser.add_argument('--target', required=True,
+                        help='SQLite database file to create or replace')
+    args = parser.parse_args(argv)
+    counts = migrate(args.source, args.target)
+    for kind, count in counts.items():
+        print(f"{kind}: {count}")
+
+
+if __name__ == '__main__':
+    main()
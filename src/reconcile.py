@@ -0,0 +1,98 @@
+'''
+This script is focused on reconciling the occupancy totals with the
+reservations: it recounts the rooms and bookings of every hotel and
+customer in one streaming pass, reports every total that drifted and,
+with --repair, saves the recounted totals and gives back the rooms
+hotels lost to open-ended bookings that no longer exist.
+
+Usage:
+    python -m src.reconcile --directory . [--repair]
+'''
+import argparse
+import sys
+from src.aggregates import Occupancy
+from src.backends import HOTELS, JsonBackend, SqliteBackend
+
+
+def reconcile(backend, repair=False):
+    """
+    Compares the saved occupancy of backend with a recount of its
+    reservations and returns a report of the reservations counted, the
+    drifted totals and the hotels whose rooms are off. With repair the
+    recount is saved and the hotel rooms are corrected.
+    """
+    with backend.lock():
+        stored = backend.load_occupancy()
+        actual = Occupancy.compute(backend.iter_reservations())
+        drift = (stored or Occupancy()).drift(actual)
+        rooms = []
+        if stored is not None:
+            # Open-ended bookings the totals still hold took their rooms
+            for hotel_name in sorted(stored.hotels.keys() |
+                                     actual.hotels.keys()):
+                leaked = (stored.hotel(hotel_name)["open_rooms"] -
+                          actual.hotel(hotel_name)["open_rooms"])
+                hotel = backend.get(HOTELS, hotel_name) if leaked else None
+                if hotel is not None:
+                    rooms.append({"hotel_name": hotel_name,
+                                  "rooms": hotel["rooms"],
+                                  "expected": hotel["rooms"] + leaked})
+        if repair:
+            with backend.transaction():
+                if drift or stored is None:
+                    backend.save_occupancy(occupancy=actual)
+                if rooms:
+                    _repair_rooms(backend, rooms)
+    return {"reservations": sum(totals["bookings"]
+                                for totals in actual.hotels.values()),
+            "drift": drift, "rooms": rooms, "repaired": repair}
+
+
+def _repair_rooms(backend, rooms):
+    """Saves the expected rooms of the hotels found off."""
+    if backend.guards_rooms:
+        backend.save_rooms({entry["hotel_name"]:
+                            entry["rooms"] - entry["expected"]
+                            for entry in rooms})
+        return
+    expected = {entry["hotel_name"]: entry["expected"] for entry in rooms}
+    hotels = backend.load(HOTELS)
+    changes = {}
+    for hotel in hotels:
+        if hotel["name"] in expected:
+            hotel["rooms"] = expected[hotel["name"]]
+            changes[hotel["name"]] = hotel
+    backend.save(HOTELS, records=hotels, changes=changes)
+
+
+def main(argv=None):
+    """Parses the command line and reconciles the totals."""
+    parser = argparse.ArgumentParser(
+        description='Check the occupancy totals against the reservations.')
+    parser.add_argument('--directory', default='.',
+                        help='directory holding the JSON files')
+    parser.add_argument('--database',
+                        help='SQLite database to check instead')
+    parser.add_argument('--repair', action='store_true',
+                        help='save the recounted totals and hotel rooms')
+    args = parser.parse_args(argv)
+    backend = (SqliteBackend(args.database) if args.database
+               else JsonBackend(args.directory))
+    try:
+        report = reconcile(backend, args.repair)
+    finally:
+        backend.close()
+    for entry in report["drift"]:
+        print(f"{entry['kind']} {entry['key']}: {entry['field']} "
+              f"{entry['stored']} != {entry['actual']}")
+    for entry in report["rooms"]:
+        print(f"hotel {entry['hotel_name']}: rooms {entry['rooms']} "
+              f"!= {entry['expected']}")
+    found = len(report["drift"]) + len(report["rooms"])
+    action = "repaired" if args.repair else "found"
+    print(f"{report['reservations']} reservations, {found} drifts {action}")
+    return 1 if found and not args.repair else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
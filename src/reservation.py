@@ -3,93 +3,150 @@ This script is focused on generating the Reservation class
 The methods pertaining containing the Reservation class are
 a. Creating a Reservation
 b. Canceling a Reservation
+c. Waiting for rooms at a fully booked hotel
 '''
-import json
-import logging
-from src.hotel import Hotel
-from src.customer import Customer
-
-logging.basicConfig(level=logging.DEBUG)
+from src.instrumentation import instrumented
+from src.store import hotel_session, reader, session, BEST_EFFORT
+from src.waitlist import DEFAULT_PRIORITY
 
 
 class Reservation:
     """A class representing a reservation made by a customer at a hotel."""
-    def __init__(self, hotel_name, customer, num_rooms):
-        """Initializes a new Reservation object."""
+    __slots__ = ('hotel_name', 'customer', 'num_rooms', 'check_in',
+                 'check_out')
+
+    def __init__(self, hotel_name, customer, num_rooms, check_in=None,
+                 check_out=None):
+        """
+        Initializes a new Reservation object. Without check_in and
+        check_out dates the reservation is open-ended.
+        """
         self.hotel_name = hotel_name
         self.customer = customer
         self.num_rooms = num_rooms
+        self.check_in = check_in
+        self.check_out = check_out
 
     def to_dict(self):
-        """Convert Reservation object to dictionary."""
-        return {
-            "hotel_name": self.hotel_name,
-            "customer": self.customer.to_dict(),
-            "num_rooms": self.num_rooms
-        }
+        """
+        Convert Reservation object to dictionary. The customer is
+        referenced by id, or embedded when it has no id yet.
+        """
+        customer_id = getattr(self.customer, "customer_id", None)
+        if customer_id is not None:
+            customer = {"customer_id": customer_id}
+        else:
+            customer = {"customer": self.customer.to_dict()}
+        data = {"hotel_name": self.hotel_name, **customer,
+                "num_rooms": self.num_rooms}
+        if self.check_in is not None:
+            data["check_in"] = str(self.check_in)
+            data["check_out"] = str(self.check_out)
+        return data
+
+    @staticmethod
+    @instrumented('Reservation.create_reservation')
+    def create_reservation(hotel_name, customer_name, num_rooms,
+                           check_in=None, check_out=None, waitlist=False,
+                           priority=DEFAULT_PRIORITY):
+        """
+        Creates a reservation for a customer at a hotel, from check_in
+        to check_out when dates are given. With waitlist a full hotel
+        queues the request at priority instead of only refusing it.
+        """
+        with hotel_session(hotel_name) as store:
+            return store.create_reservation(hotel_name, customer_name,
+                                            num_rooms, check_in, check_out,
+                                            waitlist, priority)
+
+    @staticmethod
+    @instrumented('Reservation.waitlist_position')
+    def waitlist_position(hotel_name, customer_name):
+        """
+        Returns the position of a customer's request on a hotel's
+        waitlist, 1 being next, or None when it is not waiting.
+        """
+        with session() as store:
+            return store.waitlist_position(hotel_name, customer_name)
+
+    @staticmethod
+    @instrumented('Reservation.leave_waitlist')
+    def leave_waitlist(hotel_name, customer_name):
+        """Withdraws a customer's waiting requests at a hotel."""
+        with hotel_session(hotel_name) as store:
+            return store.leave_waitlist(hotel_name, customer_name)
 
     @staticmethod
-    def create_reservation(hotel_name, customer_name, num_rooms):
-        """Creates a reservation for a customer at a hotel."""
-        hotels = Hotel.load_hotels()
-        customers = Customer.load_customers()
-
-        hotel = next((h for h in hotels if h['name'] == hotel_name), None)
-        customer = next((c for c in customers
-                         if c.name == customer_name), None)
-
-        if hotel and customer:
-            if hotel["rooms"] >= num_rooms:
-                reservation = Reservation(hotel_name, customer, num_rooms)
-                Reservation._save_reservation(reservation)
-                hotel["rooms"] -= num_rooms
-                Hotel.save_hotels(hotels)
-                return True
-        return False
+    @instrumented('Reservation.create_reservations')
+    def create_reservations(bookings, policy=BEST_EFFORT):
+        """
+        Creates a batch of (hotel_name, customer_name, num_rooms)
+        bookings, saving hotels and reservations once. Returns a report
+        of the accepted and rejected bookings.
+        """
+        with session() as store:
+            return store.create_reservations(bookings, policy)
 
     @staticmethod
     def _save_reservation(reservation):
         """Save reservation to the reservations file."""
-        reservations = Reservation._load_reservations()
-        reservations.append(reservation.to_dict())
-        with open('reservations.json', 'w', encoding='utf-8') as file:
-            json.dump(reservations, file, indent=4)
-            return []
+        with session() as store:
+            store.add_reservation(reservation.to_dict())
+
+    @staticmethod
+    @instrumented('Reservation.cancel_reservation')
+    def cancel_reservation(hotel_name, customer_name, num_rooms=None):
+        """
+        Cancel a reservation. The rooms the customer actually held are
+        given back; num_rooms is accepted for backwards compatibility.
+        """
+        with hotel_session(hotel_name) as store:
+            return store.cancel_reservation(hotel_name, customer_name)
+
+    @staticmethod
+    @instrumented('Reservation.cancel_reservations')
+    def cancel_reservations(cancellations):
+        """
+        Cancels a batch of (hotel_name, customer_name) pairs, saving
+        hotels and reservations once, and returns what was cancelled.
+        """
+        with session() as store:
+            return store.cancel_reservations(cancellations)
+
+    @staticmethod
+    def iter_reservations(hotel_name=None, customer_name=None,
+                          resolve=False):
+        """
+        Yields reservations one at a time from disk, optionally only
+        those of a hotel and/or a customer, with bounded memory.
+        Reservations hold a customer_id; with resolve the customer
+        record is joined in under "customer" instead. No file lock is
+        held, so a caller may stop at any point.
+        """
+        store = reader()
+        for reservation in store.iter_reservations(hotel_name,
+                                                   customer_name):
+            if resolve:
+                reservation = store.resolve_reservation(reservation)
+            yield reservation
+
+    @staticmethod
+    def iter_hotel_reservations(hotel_name):
+        """Yields the reservations made at a hotel."""
+        return Reservation.iter_reservations(hotel_name=hotel_name)
 
     @staticmethod
-    def cancel_reservation(hotel_name, customer_name, num_rooms):
-        """Cancel a reservation."""
-        hotels = Hotel.get_hotels()
-        reservations = Reservation._load_reservations()
-        # Cancelling the reservation and adjust rooms
-        for hotel in hotels:
-            if hotel["name"] == hotel_name:
-                hotel_instance = Hotel.from_dict(hotel)
-                hotel_instance.cancel_reservation(num_rooms)
-                hotel["rooms"] = hotel_instance.rooms
-
-                # Removing the reservation from the list
-                reservations = [r for r in reservations if not (
-                                r['customer']['name'] == customer_name and
-                                r['hotel_name'] == hotel_name)]
+    def iter_customer_reservations(customer_name):
+        """Yields the reservations made by a customer."""
+        return Reservation.iter_reservations(customer_name=customer_name)
 
     @staticmethod
     def _load_reservations():
         """Loads reservations from a file and handles errors gracefully."""
-        try:
-            # Attempt to open and read the reservations file
-            with open('reservations.json', 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            # If the file is not found, log the error and return an empty list
-            logging.error("Reservations file not found.")
-            return []
-        except json.JSONDecodeError:
-            # If the JSON file is malformed, log the error
-            logging.error("Error decoding JSON from reservations file.")
-            return []
+        return list(Reservation.iter_reservations(resolve=True))
 
     @staticmethod
+    @instrumented('Reservation.load_reservations')
     def load_reservations():
         """Public method to load reservations with error handling."""
         return Reservation._load_reservations()
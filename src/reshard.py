@@ -0,0 +1,66 @@
+'''
+This script is focused on resharding the reservations of a data
+directory: splitting the single reservations file into per-hotel
+shard journals, changing the number of shards, or merging the shards
+back into one file with --shards 0.
+
+Usage:
+    python -m src.reshard --directory . --shards 16
+'''
+import argparse
+import os
+from src.backends import FILES, JsonBackend, RESERVATIONS
+from src.journal import ReservationJournal
+from src.serialization import FORMATS
+from src.shards import (ShardedJournal, read_manifest, remove_manifest,
+                        write_manifest)
+
+
+def reshard(directory='.', shards=16, fmt=None):
+    """
+    Rewrites the reservations of directory into shards shard files,
+    or into the single reservations file when shards is 0, and returns
+    the number of reservations written. Switching layouts is atomic:
+    readers see the old files until the manifest changes, and the old
+    files are only removed afterwards.
+    """
+    if shards < 0:
+        raise ValueError("The number of shards cannot be negative.")
+    backend = JsonBackend(directory, fmt)
+    with backend.lock():
+        reservations = backend.load_index().records()
+        old = backend.journal
+        if shards:
+            manifest = read_manifest(directory)
+            generation = 1 if manifest is None else manifest["generation"] + 1
+            ShardedJournal(directory, shards, generation,
+                           fmt=backend.format).rewrite(reservations)
+            write_manifest(directory, shards, generation)
+        else:
+            ReservationJournal(os.path.join(directory, FILES[RESERVATIONS]),
+                               fmt=backend.format).rewrite(reservations)
+            remove_manifest(directory)
+        # Merging a single file into a single file rewrote it in place
+        if shards or isinstance(old, ShardedJournal):
+            old.remove()
+    return len(reservations)
+
+
+def main(argv=None):
+    """Parses the command line and reshards the reservations."""
+    parser = argparse.ArgumentParser(
+        description='Split the reservations into per-hotel shard files.')
+    parser.add_argument('--directory', default='.',
+                        help='directory holding the data files')
+    parser.add_argument('--shards', type=int, default=16,
+                        help='number of shards, 0 for a single file')
+    parser.add_argument('--format', choices=FORMATS,
+                        help='format of the rewritten files')
+    args = parser.parse_args(argv)
+    count = reshard(args.directory, args.shards, args.format)
+    layout = f"{args.shards} shards" if args.shards else "a single file"
+    print(f"{RESERVATIONS}: {count} in {layout}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+'''
+This script is focused on generating the HotelSearchIndex class
+used to find the hotels that can take a number of rooms.
+The methods pertaining containing the HotelSearchIndex class are
+a. Keeping a hotel's capacity and address entries current
+b. Paging through the hotels with enough rooms, most rooms first
+c. Narrowing the search to an address prefix or to the hotels a
+   caller accepts
+'''
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+# Sorts after every character, closing an address prefix range
+_LAST = '\U0010ffff'
+
+
+class HotelSearchIndex:
+    """
+    Two sorted lists over the hotels: (-rooms, name) for capacity and
+    (address, name) for address prefixes, both kept in order with
+    bisect so updates and range lookups never scan every hotel.
+    """
+    def __init__(self, hotels=()):
+        """Initializes the index with an iterable of hotel records."""
+        self._capacity = []
+        self._addresses = []
+        # Name -> (capacity key, address key) currently indexed
+        self._entries = {}
+        for hotel in hotels:
+            self.update(hotel["name"], hotel)
+
+    def __len__(self):
+        """Returns the number of hotels indexed."""
+        return len(self._entries)
+
+    def update(self, name, hotel):
+        """Re-indexes a hotel after a change; None removes it."""
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            capacity, address = entry
+            del self._capacity[bisect_left(self._capacity, capacity)]
+            del self._addresses[bisect_left(self._addresses, address)]
+        if hotel is not None:
+            capacity = (-hotel["rooms"], name)
+            address = (str(hotel.get("address", "")).casefold(), name)
+            insort(self._capacity, capacity)
+            insort(self._addresses, address)
+            self._entries[name] = (capacity, address)
+
+    def search(self, num_rooms, address_prefix=None, limit=10, after=None,
+               accept=None):
+        """
+        Returns up to limit names of hotels with at least num_rooms
+        rooms, most rooms first, and the cursor of the next page (None
+        on the last page). after is the cursor of the previous page.
+        accept, when given, is called with each candidate's name and
+        drops the hotels it returns False for.
+        """
+        start = 0 if after is None else bisect_right(self._capacity,
+                                                     tuple(after))
+        # Capacity keys are negated, so enough rooms sorts first
+        stop = bisect_right(self._capacity, (-num_rooms, _LAST))
+        if address_prefix is None:
+            matches = (self._capacity[position]
+                       for position in range(start, stop))
+        else:
+            prefix = address_prefix.casefold()
+            low = bisect_left(self._addresses, (prefix,))
+            high = bisect_left(self._addresses, (prefix + _LAST,))
+            if high - low < stop - start:
+                # Fewer hotels match the prefix: sort just those
+                first = None if after is None else tuple(after)
+                matches = sorted(
+                    key for key in (self._entries[name][0]
+                                    for _, name in self._addresses[low:high])
+                    if key[0] <= -num_rooms and
+                    (first is None or key > first))
+            else:
+                matches = (self._capacity[position]
+                           for position in range(start, stop)
+                           if self._entries[self._capacity[position][1]]
+                           [1][0].startswith(prefix))
+        if accept is not None:
+            matches = (key for key in matches if accept(key[1]))
+        page = list(islice(matches, limit + 1))
+        cursor = list(page[limit - 1]) if len(page) > limit else None
+        return [name for _, name in page[:limit]], cursor
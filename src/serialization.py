@@ -0,0 +1,248 @@
+'''
+This script is focused on generating the serialization layer the
+JSON backend and the reservation journal read and write files with.
+The formats pertaining to this script are
+a. json: compact JSON, the default, encoded by orjson when installed
+b. binary: blocks of records, each prefixed by its length in bytes
+   and holding runs of records sharing their keys, in JSON
+Readers detect the format from the file header, so pretty-printed
+files written before this layer existed still load, and a store
+switches format the next time each file is rewritten.
+'''
+import io
+import json
+import struct
+from itertools import repeat
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+JSON = 'json'
+BINARY = 'binary'
+
+FORMATS = (JSON, BINARY)
+
+# Starts every binary file; 0x93 never begins a JSON document
+MAGIC = b'\x93HRB'
+VERSION = 2
+# Blocks are JSON arrays of [keys, rows] runs
+RUNS = 1
+# Magic, format version and the encoding of the blocks
+_HEADER = struct.Struct('<4sBB')
+# Length prefix of each block
+_LENGTH = struct.Struct('<I')
+
+# Records encoded together; keys repeated inside a block are shared
+BLOCK_RECORDS = 1024
+
+# Characters read at a time when streaming a JSON array
+CHUNK_SIZE = 64 * 1024
+
+# The format of stores built without one
+_DEFAULT = [JSON]
+
+
+def default_format():
+    """Returns the format new files are written in."""
+    return _DEFAULT[0]
+
+
+def set_default_format(fmt):
+    """Sets the format new files are written in, for a deployment."""
+    _DEFAULT[0] = check_format(fmt)
+
+
+def check_format(fmt):
+    """Returns fmt, raising ValueError when it is unknown."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown serialization format {fmt!r}.")
+    return fmt
+
+
+def accelerated():
+    """Tells whether JSON is encoded and decoded by orjson."""
+    return orjson is not None
+
+
+def dumps_json(value):
+    """Returns value as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
+
+
+def loads_json(data):
+    """Decodes JSON from bytes or a string."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def detect(head):
+    """Returns the format of a file starting with the bytes head."""
+    return BINARY if head.startswith(MAGIC) else JSON
+
+
+def dumps(records, fmt=JSON):
+    """Returns a list of records encoded in fmt."""
+    if check_format(fmt) == JSON:
+        return dumps_json(records)
+    parts = [_HEADER.pack(MAGIC, VERSION, RUNS)]
+    for start in range(0, len(records), BLOCK_RECORDS):
+        block = _encode(records[start:start + BLOCK_RECORDS])
+        parts += (_LENGTH.pack(len(block)), block)
+    return b''.join(parts)
+
+
+def _encode(records):
+    """
+    Encodes one block as runs of [keys, rows]: consecutive records with
+    the same keys are written once as their keys, then one row of
+    values each. Records that are not dictionaries have null keys.
+    """
+    runs = []
+    for record in records:
+        keys = tuple(record) if isinstance(record, dict) else None
+        if not runs or runs[-1][0] != keys:
+            runs.append((keys, []))
+        runs[-1][1].append(record if keys is None else list(record.values()))
+    return dumps_json(runs)
+
+
+def loads(data):
+    """
+    Returns the list of records encoded in data, in either format.
+    Raises ValueError when data is corrupt or truncated.
+    """
+    if detect(data) == JSON:
+        records = loads_json(data)
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array.")
+        return records
+    return [record for block in _blocks(memoryview(data)) for record in block]
+
+
+def dump(records, file, fmt=JSON):
+    """Writes a list of records in fmt to a binary file."""
+    file.write(dumps(records, fmt))
+
+
+def load(file):
+    """Reads the list of records of a binary file in either format."""
+    return loads(file.read())
+
+
+def iter_records(file, chunk_size=CHUNK_SIZE):
+    """
+    Yields the records of a binary file one at a time, in either
+    format, holding about one chunk or block in memory at a time.
+    """
+    head = file.read(_HEADER.size)
+    if detect(head) == JSON:
+        file.seek(0)
+        yield from iter_json_array(io.TextIOWrapper(file, encoding='utf-8'),
+                                   chunk_size)
+        return
+    _check_header(head)
+    while True:
+        prefix = file.read(_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) < _LENGTH.size:
+            raise ValueError("Truncated binary block length.")
+        (length,) = _LENGTH.unpack(prefix)
+        block = file.read(length)
+        if len(block) < length:
+            raise ValueError("Truncated binary block.")
+        yield from _decode(block)
+
+
+def _check_header(head):
+    """Raises ValueError unless head is a header this code can read."""
+    if len(head) < _HEADER.size:
+        raise ValueError("Truncated binary header.")
+    _, version, encoding = _HEADER.unpack(head)
+    if version != VERSION or encoding != RUNS:
+        raise ValueError(f"Unsupported binary format {version}."
+                         f"{encoding}.")
+
+
+def _decode(block):
+    """Decodes one block, reporting corruption as a ValueError."""
+    records = []
+    try:
+        for keys, rows in loads_json(bytes(block)):
+            if keys is None:
+                records.extend(rows)
+            else:
+                records.extend(map(dict, map(zip, repeat(keys), rows)))
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"Corrupt binary block: {error}") from error
+    return records
+
+
+def _blocks(data):
+    """Yields the decoded blocks of a binary file's contents."""
+    _check_header(bytes(data[:_HEADER.size]))
+    position = _HEADER.size
+    while position < len(data):
+        if position + _LENGTH.size > len(data):
+            raise ValueError("Truncated binary block length.")
+        (length,) = _LENGTH.unpack_from(data, position)
+        position += _LENGTH.size
+        if position + length > len(data):
+            raise ValueError("Truncated binary block.")
+        yield _decode(data[position:position + length])
+        position += length
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """
+    Yields the items of a JSON array from an open text file, holding
+    only about chunk_size characters in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    opened = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        end = None
+        if pos < len(buffer):
+            if not opened:
+                if buffer[pos] != '[':
+                    raise ValueError("Expected a JSON array.")
+                opened = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+        elif eof:
+            if opened:
+                raise ValueError("Unterminated JSON array.")
+            return
+        # An item not yet followed by a separator may have been cut short
+        if end is not None and not eof:
+            after = end
+            while after < len(buffer) and buffer[after] in ' \t\r\n':
+                after += 1
+            if after == len(buffer) or buffer[after] not in ',]':
+                end = None
+        if end is None:
+            chunk = file.read(chunk_size)
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            eof = not chunk
+            continue
+        yield item
+        pos = end
@@ -0,0 +1,171 @@
+'''
+This script is focused on generating the AsyncReservationService
+class, an asyncio facade over a Store for event-loop based services.
+Writes are queued and committed in groups: every operation arriving
+within a short window is applied under the file lock and flushed
+together in a worker thread, and each caller's future resolves once
+that single, fsynced flush returns.
+The methods pertaining containing the AsyncReservationService class are
+a. Starting and stopping the group committer
+b. Creating Hotels, Customers and Reservations
+c. Cancelling Reservations
+d. Reading Hotels, Customers and Reservations off the event loop
+'''
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from src.store import BEST_EFFORT, Store
+
+
+class AsyncReservationService:
+    """
+    Awaitable versions of the Store operations. The store is only ever
+    touched from one worker thread, so the event loop never blocks on
+    file I/O and a group of writes costs a single flush.
+    """
+    def __init__(self, store=None, directory='.', window=0.002,
+                 max_group=1000):
+        """
+        Initializes the service over store, by default a Store over
+        the JSON files in directory. window is how many seconds the
+        committer waits for more writes after the first one arrives;
+        max_group caps the writes committed together.
+        """
+        self.store = store if store is not None else Store(directory)
+        self.window = window
+        self.max_group = max_group
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue = None
+        self._committer = None
+
+    async def __aenter__(self):
+        """Starts the group committer."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Commits queued writes and stops the committer."""
+        await self.close()
+
+    async def start(self):
+        """Starts the group committer on the running loop."""
+        if self._committer is None:
+            self._queue = asyncio.Queue()
+            self._committer = asyncio.create_task(self._commit_loop())
+
+    async def close(self):
+        """Commits every queued write, then releases the worker."""
+        if self._committer is not None:
+            await self._queue.put(None)
+            await self._committer
+            self._committer = None
+        self._executor.shutdown(wait=True)
+
+    async def _write(self, operation, *args, **kwargs):
+        """Queues a Store operation and waits for its group commit."""
+        if self._committer is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, args, kwargs, future))
+        return await future
+
+    async def _read(self, operation, *args, **kwargs):
+        """Runs a Store read in the worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: operation(*args, **kwargs))
+
+    async def _commit_loop(self):
+        """Collects writes into groups and commits each one."""
+        stopping = False
+        while not stopping:
+            group = [await self._queue.get()]
+            if group[0] is None:
+                return
+            await asyncio.sleep(self.window)
+            while len(group) < self.max_group and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                group.append(item)
+            outcomes = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._commit, group)
+            for (*_, future), (result, error) in zip(group, outcomes):
+                if future.cancelled():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _commit(self, group):
+        """
+        Applies a group of writes over the data as other processes left
+        it and flushes them once, returning a (result, error) pair per
+        write. A failed flush drops the group's changes and fails every
+        write of it. Runs in the worker thread.
+        """
+        outcomes = []
+        try:
+            with self.store.group():
+                for operation, args, kwargs, _ in group:
+                    try:
+                        outcomes.append((operation(*args, **kwargs), None))
+                    # pylint: disable-next=broad-exception-caught
+                    except Exception as error:
+                        outcomes.append((None, error))
+        # pylint: disable-next=broad-exception-caught
+        except Exception as error:
+            logging.error("Group commit failed: %s", error)
+            outcomes = [(None, error)] * len(group)
+        return outcomes
+
+    async def create_hotel(self, name, address, rooms):
+        """Creates a hotel, returning False when the name is taken."""
+        return await self._write(self.store.create_hotel, name, address,
+                                 rooms)
+
+    async def create_customer(self, name, email, phone_number):
+        """Creates a customer, returning False when the name is taken."""
+        return await self._write(self.store.create_customer, name, email,
+                                 phone_number)
+
+    async def create_reservation(self, hotel_name, customer_name, num_rooms,
+                                 check_in=None, check_out=None):
+        """Books rooms for a customer, returning True on success."""
+        return await self._write(self.store.create_reservation, hotel_name,
+                                 customer_name, num_rooms, check_in,
+                                 check_out)
+
+    async def create_reservations(self, bookings, policy=BEST_EFFORT):
+        """Books a batch of bookings, returning the batch report."""
+        return await self._write(self.store.create_reservations,
+                                 list(bookings), policy)
+
+    async def cancel_reservation(self, hotel_name, customer_name):
+        """Cancels a customer's bookings at a hotel, returning them."""
+        return await self._write(self.store.cancel_reservation, hotel_name,
+                                 customer_name)
+
+    async def find_hotel(self, name):
+        """Returns a copy of the hotel with the given name, or None."""
+        hotel = await self._read(self.store.find_hotel, name)
+        return None if hotel is None else dict(hotel)
+
+    async def find_customer(self, name):
+        """Returns a copy of the customer with the given name, or None."""
+        customer = await self._read(self.store.find_customer, name)
+        return None if customer is None else dict(customer)
+
+    async def search_hotels(self, num_rooms, address_prefix=None, limit=10,
+                            after=None):
+        """Returns a page of the hotels that can take num_rooms rooms."""
+        return await self._read(self.store.search_hotels, num_rooms,
+                                address_prefix, limit, after)
+
+    async def reservations(self, hotel_name=None, customer_name=None):
+        """Returns the reservations of a hotel and/or a customer."""
+        return await self._read(
+            lambda: list(self.store.iter_reservations(hotel_name,
+                                                      customer_name)))
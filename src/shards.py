@@ -0,0 +1,193 @@
+'''
+This script is focused on generating the ShardedJournal class
+Reservations are partitioned by a hash of their hotel name into
+shard journals, so booking or cancelling at a hotel appends to, and
+compacts, only that hotel's shard. A manifest in the shard directory
+records the layout; the JSON backend uses it whenever it exists.
+The methods pertaining containing the ShardedJournal class are
+a. Routing create and cancel events to their shards
+b. Merging the shards lazily into one stream or index
+c. Rewriting, compacting and removing every shard
+d. Locking the shard of a hotel, so writers of other shards go on
+'''
+import json
+import os
+import zlib
+from collections import defaultdict
+from src.durability import atomic_write_json
+from src.index import ReservationIndex
+from src.journal import CANCEL, CREATE, ReservationJournal
+from src.locking import file_lock
+
+# Directory holding the shard files and the manifest
+SHARD_DIRECTORY = 'reservations.d'
+MANIFEST = 'manifest.json'
+
+
+def shard_of(hotel_name, shards):
+    """Returns the shard holding a hotel's reservations."""
+    return zlib.crc32(hotel_name.encode('utf-8')) % shards
+
+
+def read_manifest(directory):
+    """Returns the shard manifest of a data directory, or None."""
+    try:
+        with open(os.path.join(directory, SHARD_DIRECTORY, MANIFEST), 'r',
+                  encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(directory, shards, generation):
+    """Atomically switches a data directory to a shard layout."""
+    os.makedirs(os.path.join(directory, SHARD_DIRECTORY), exist_ok=True)
+    atomic_write_json(os.path.join(directory, SHARD_DIRECTORY, MANIFEST),
+                      {"shards": shards, "generation": generation},
+                      fsync=True)
+
+
+def remove_manifest(directory):
+    """Switches a data directory back to the single reservations file."""
+    path = os.path.join(directory, SHARD_DIRECTORY, MANIFEST)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class ShardedJournal:
+    """
+    A reservation journal split into shards by hotel. Each shard is a
+    ReservationJournal with its own lock, so appends and compactions
+    of different shards never wait on each other. A hotel's
+    reservations stay in booking order; across hotels they are read
+    shard by shard.
+    """
+    def __init__(self, directory, shards, generation=0, fmt=None,
+                 compact_bytes=1024 * 1024):
+        """
+        Initializes the journal over the shard files of generation in
+        directory's shard directory, writing snapshots in fmt.
+        """
+        if shards < 1:
+            raise ValueError("A sharded journal needs at least one shard.")
+        self.directory = os.path.join(directory, SHARD_DIRECTORY)
+        self.generation = generation
+        self.shards = [
+            ReservationJournal(
+                os.path.join(self.directory,
+                             f'shard-{generation}-{number:04d}.json'),
+                compact_bytes=compact_bytes, fmt=fmt)
+            for number in range(shards)]
+
+    @property
+    def fsync(self):
+        """True when every append is fsynced before returning."""
+        return self.shards[0].fsync
+
+    @fsync.setter
+    def fsync(self, fsync):
+        """Sets whether every shard fsyncs its appends."""
+        for shard in self.shards:
+            shard.fsync = fsync
+
+    @property
+    def paths(self):
+        """Every file the reservations are read from."""
+        return tuple(path for shard in self.shards for path in shard.paths)
+
+    def shard(self, hotel_name):
+        """Returns the ReservationJournal holding a hotel."""
+        return self.shards[shard_of(hotel_name, len(self.shards))]
+
+    def lock(self, hotel_name):
+        """
+        Returns the writer lock of a hotel's shard. It is named by
+        shard number alone, so resharding takes the same locks.
+        """
+        return self._writer_lock(shard_of(hotel_name, len(self.shards)))
+
+    def locks(self):
+        """Returns the writer lock of every shard, in shard order."""
+        return [self._writer_lock(number)
+                for number in range(len(self.shards))]
+
+    def _writer_lock(self, number):
+        """Returns the writer lock of a shard number."""
+        return file_lock(os.path.join(self.directory,
+                                      f'shard-{number:04d}.lock'))
+
+    def load(self):
+        """Returns the reservations of every shard."""
+        return self.load_index().records()
+
+    def load_index(self):
+        """Returns a ReservationIndex of every shard, one at a time."""
+        return ReservationIndex(reservation for shard in self.shards
+                                for reservation in shard.load())
+
+    def iter_reservations(self, hotel_name=None, customer_id=None):
+        """
+        Yields the current reservations one at a time, optionally only
+        those of a hotel and/or a customer. A hotel's reservations are
+        read from its shard alone; other reads stream every shard.
+        """
+        if hotel_name is not None:
+            yield from self.shard(hotel_name).iter_reservations(
+                hotel_name, customer_id)
+            return
+        for shard in self.shards:
+            yield from shard.iter_reservations(customer_id=customer_id)
+
+    def append(self, events):
+        """
+        Appends each event to the shard of its hotel. Cancellations
+        without a hotel are appended to every shard.
+        """
+        routed = defaultdict(list)
+        for event in events:
+            if event["op"] == CREATE:
+                hotel_name = event["reservation"]["hotel_name"]
+            elif event["op"] == CANCEL:
+                hotel_name = event["hotel_name"]
+            else:
+                hotel_name = None
+            if hotel_name is None:
+                for shard in self.shards:
+                    routed[shard].append(event)
+            else:
+                routed[self.shard(hotel_name)].append(event)
+        for shard, shard_events in routed.items():
+            shard.append(shard_events)
+
+    def rewrite(self, reservations):
+        """Replaces every shard with its share of reservations."""
+        routed = defaultdict(list)
+        for reservation in reservations:
+            routed[self.shard(reservation["hotel_name"])].append(reservation)
+        os.makedirs(self.directory, exist_ok=True)
+        for shard in self.shards:
+            shard.rewrite(routed.get(shard, []))
+
+    def compact(self):
+        """Folds the log of every shard into its snapshot."""
+        for shard in self.shards:
+            shard.compact()
+
+    def wait(self):
+        """Waits for the background compactions of every shard."""
+        for shard in self.shards:
+            shard.wait()
+
+    def remove(self):
+        """Deletes the files of every shard."""
+        for shard in self.shards:
+            shard.remove()
+
+    def log_size(self):
+        """Returns the size of every pending log in bytes."""
+        return sum(shard.log_size() for shard in self.shards)
+
+    def sizes(self):
+        """Returns the number of reservations per shard."""
+        return [sum(1 for _ in shard.iter_reservations())
+                for shard in self.shards]
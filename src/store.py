@@ -0,0 +1,1222 @@
+'''
+This script is focused on generating the Store class
+The Store loads hotels, customers and reservations once, serves
+every operation from memory and writes changes back through a
+storage backend (see backends.py).
+The methods pertaining containing the Store class are
+a. Loading a collection on first use
+b. Flushing dirty collections to disk
+c. Hotel, Customer and Reservation operations
+d. Resolving the customer a reservation refers to by id
+e. Answering room availability over a range of nights
+f. Searching the hotels that can take a number of rooms
+g. Reading the rooms and bookings of a hotel or customer
+h. Waitlisting bookings a full hotel cannot take, promoting them as
+   rooms free up
+'''
+import logging
+import threading
+from itertools import chain
+import time
+from contextlib import contextmanager
+from datetime import date
+from src.aggregates import Occupancy, delta, merge
+from src.backends import (CUSTOMERS, HOTELS, OCCUPANCY, RESERVATIONS,
+                          WAITLIST, JsonBackend)
+from src.durability import (COALESCED, MANUAL, DurabilityPolicy,
+                            default_durability)
+from src.index import (ReservationIndex, is_legacy, legacy_customer_id,
+                       new_customer_id)
+from src.instrumentation import instrumented
+from src.inventory import NIGHTS, SegmentTree, iso, night
+from src.journal import CREATE, apply_event, cancel_event, create_event
+from src.locking import KeyedLocks
+from src.search import HotelSearchIndex
+from src.waitlist import DEFAULT_PRIORITY, Waitlist
+
+# Partial-failure policies of Store.create_reservations
+BEST_EFFORT = 'best_effort'
+ALL_OR_NOTHING = 'all_or_nothing'
+
+# Collections indexed by their unique "name" field
+KEYED = (HOTELS, CUSTOMERS)
+
+# Stores entered with a ``with`` block, innermost last
+_ACTIVE = []
+
+# Builds the backend of short-lived sessions from a directory
+_BACKEND_FACTORY = [JsonBackend]
+
+
+class Store:
+    """
+    A long-lived session over hotels, customers and reservations.
+    Collections are read on first use and only dirty ones are written
+    back, either by flush() or as the durability policy requires.
+
+    A store is safe to share between threads: bookings lock only the
+    hotels they touch, so different hotels are booked in parallel.
+    Entering a store with ``with`` also holds the backend's advisory
+    file lock, so no other process writes the data meanwhile.
+    """
+    def __init__(self, directory='.', flush_interval=None, backend=None,
+                 durability=None):
+        """
+        Initializes a new Store over backend, by default the JSON files
+        in directory. durability is a DurabilityPolicy or mode name
+        (see durability.py), by default the deployment-wide one.
+        flush_interval is the older way of asking for a coalesced
+        policy flushing at most every flush_interval seconds.
+        """
+        self.backend = backend or JsonBackend(directory)
+        if durability is None and flush_interval is not None:
+            durability = DurabilityPolicy(COALESCED,
+                                          interval_ms=flush_interval * 1000)
+        self.durability = (default_durability() if durability is None
+                           else DurabilityPolicy.parse(durability))
+        self.backend.set_durability(self.durability.fsync)
+        # Mutations since the last flush, and the pending timed flush
+        self._mutations = 0
+        self._timer = None
+        # Open blocks deferring due flushes to their end
+        self._deferred = 0
+        self._collections = {}
+        # Records looked up one by one from an indexed backend
+        self._fetched = {}
+        self._dirty = set()
+        # Changed names per collection, in order, and collections to
+        # rewrite whole
+        self._changed = {}
+        self._full = set()
+        self._last_flush = time.monotonic()
+        # Reservation events not yet handed to the backend
+        self._events = []
+        self._rewrite = False
+        # Hotel name -> rooms taken since the last flush, for backends
+        # guarding rooms, and hotels saved whole (created or renamed)
+        self._taken = {}
+        self._placed = set()
+        # Hotel name -> rooms booked per night, built from the hotel's
+        # own reservations while the whole index is not loaded
+        self._inventories = {}
+        # Occupancy totals, loaded on first read, and their unsaved deltas
+        self._occupancy = None
+        self._occupancy_checked = False
+        self._deltas = []
+        self._recount = False
+        # Customer id -> record, built on the first resolve
+        self._customer_ids = None
+        # Capacity and address index, built on the first search
+        self._search = None
+        # Requests waiting for rooms, loaded on first use, and the
+        # hotels whose requests changed since the last flush (None: all)
+        self._waitlist = None
+        self._waitlisted = set()
+        # Guards the collections' structure; hotel locks guard rooms
+        self._mutex = threading.RLock()
+        self._hotel_locks = KeyedLocks()
+        self._file_lock = self.backend.lock()
+
+    def __enter__(self):
+        """
+        Makes this store the one used by the static model API. What
+        was read before the file lock was taken is read again.
+        """
+        self._file_lock.acquire()
+        self.reload()
+        _ACTIVE.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Flushes pending changes and deactivates the store."""
+        try:
+            self.flush()
+        finally:
+            _ACTIVE.remove(self)
+            self._file_lock.release()
+
+    def reload(self):
+        """
+        Drops what was read from the backend so the next read sees the
+        writes of other stores. Unflushed changes are kept and laid
+        over the data read again.
+        """
+        with self._mutex:
+            for kind in KEYED:
+                if kind in self._full:
+                    continue
+                table = self._collections.pop(kind, None)
+                fetched = self._fetched.pop(kind, {})
+                source = fetched if table is None else table
+                changed = {name: source.get(name)
+                           for name in self._changed.get(kind, ())}
+                if changed:
+                    self._fetched[kind] = changed
+            # Queued events and deltas are applied again on the next read
+            if not self._rewrite:
+                self._collections.pop(RESERVATIONS, None)
+            if not self._recount:
+                self._occupancy = None
+            if WAITLIST not in self._dirty:
+                self._waitlist = None
+            elif None not in self._waitlisted:
+                # Only the requests of the hotels changed here are kept
+                self._waitlist = Waitlist(chain(
+                    (entry for entry in self.backend.load_waitlist()
+                     if entry["hotel_name"] not in self._waitlisted),
+                    (entry for entry in self._waitlist.entries()
+                     if entry["hotel_name"] in self._waitlisted)))
+            self._inventories = {}
+            self._customer_ids = None
+            self._search = None
+
+    def discard(self):
+        """Drops every unflushed change along with what was read."""
+        with self._mutex:
+            self._collections = {}
+            self._fetched = {}
+            self._dirty.clear()
+            self._changed.clear()
+            self._full.clear()
+            self._mutations = 0
+            self._taken = {}
+            self._placed = set()
+            self._events = []
+            self._rewrite = False
+            self._occupancy = None
+            self._deltas = []
+            self._recount = False
+            self._waitlist = None
+            self._waitlisted = set()
+            self._inventories = {}
+            self._customer_ids = None
+            self._search = None
+
+    @contextmanager
+    def group(self):
+        """
+        Applies the writes of a block as one group: they are made under
+        the file lock over data read again, then flushed together and
+        fsynced once whatever the durability policy. When that flush
+        fails every unflushed change is dropped and the error raised.
+        """
+        with self._file_lock:
+            self.reload()
+            with self._mutex:
+                self._deferred += 1
+            try:
+                yield self
+            finally:
+                with self._mutex:
+                    self._deferred -= 1
+            self.backend.set_durability(True)
+            try:
+                self.flush()
+            except BaseException:
+                self.discard()
+                raise
+            finally:
+                self.backend.set_durability(self.durability.fsync)
+
+    def collection(self, kind):
+        """Returns the in-memory list for a collection, loading it once."""
+        if kind in KEYED:
+            return list(self._table(kind).values())
+        return self._reservation_index().records()
+
+    def _reservation_index(self):
+        """Returns the ReservationIndex, replaying the journal once."""
+        with self._mutex:
+            if RESERVATIONS not in self._collections:
+                index = self.backend.load_index()
+                # Events queued before the first read are not on disk yet
+                for event in self._events:
+                    apply_event(index, event)
+                self._collections[RESERVATIONS] = index
+                # The index keeps its own trees from now on
+                self._inventories = {}
+                if index.upgraded:
+                    # Persist the legacy records in their normalized form
+                    self._events = []
+                    self._rewrite = True
+                    self._dirty.add(RESERVATIONS)
+            return self._collections[RESERVATIONS]
+
+    def _table(self, kind):
+        """Returns the name -> record index of a keyed collection."""
+        with self._mutex:
+            if kind not in self._collections:
+                table = self._index(kind, self.backend.load(kind))
+                # Records fetched or changed before the full load win
+                for name, record in self._fetched.pop(kind, {}).items():
+                    if record is None:
+                        table.pop(name, None)
+                    else:
+                        table[name] = record
+                self._collections[kind] = table
+                if kind == CUSTOMERS:
+                    # Every record is upgraded, so do not stop at the first
+                    upgraded = False
+                    for record in table.values():
+                        upgraded |= self._upgrade_customer(record)
+                    if upgraded:
+                        self._dirty.add(kind)
+                        self._full.add(kind)
+            return self._collections[kind]
+
+    @staticmethod
+    def _upgrade_customer(record):
+        """Gives a customer saved before ids existed its legacy id."""
+        if record is None or "id" in record:
+            return False
+        record["id"] = legacy_customer_id(record["name"])
+        return True
+
+    def _get(self, kind, name):
+        """Returns a hotel or customer record by name, or None."""
+        with self._mutex:
+            table = self._collections.get(kind)
+            if table is not None:
+                return table.get(name)
+            if not self.backend.indexed:
+                return self._table(kind).get(name)
+            fetched = self._fetched.setdefault(kind, {})
+            if name not in fetched:
+                record = self.backend.get(kind, name)
+                fetched[name] = record
+                if kind == CUSTOMERS and self._upgrade_customer(record):
+                    self._dirty.add(kind)
+                    self._changed.setdefault(kind, {})[name] = None
+            return fetched[name]
+
+    def _put(self, kind, name, record):
+        """Stores a record under name (None removes it)."""
+        with self._mutex:
+            table = self._collections.get(kind)
+            if kind == CUSTOMERS and self._customer_ids is not None:
+                old = table.get(name)
+                if old is not None:
+                    self._customer_ids.pop(old["id"], None)
+                if record is not None:
+                    self._customer_ids[record["id"]] = record
+            if kind == HOTELS:
+                # A created, renamed or removed hotel is saved whole
+                self._taken.pop(name, None)
+                self._placed.add(name)
+            if table is None:
+                table = self._fetched.setdefault(kind, {})
+                table[name] = record
+            elif record is None:
+                table.pop(name, None)
+            else:
+                table[name] = record
+            self.mark_dirty(kind, name)
+
+    @staticmethod
+    def _index(kind, records):
+        """Builds a name index, keeping the first record of each name."""
+        table = {}
+        for record in records:
+            if record["name"] in table:
+                logging.warning("Ignoring duplicate %s name %r.",
+                                kind, record["name"])
+                continue
+            table[record["name"]] = record
+        return table
+
+    @instrumented('store.replace')
+    def replace(self, kind, records):
+        """Replaces a whole collection and marks it dirty."""
+        with self._mutex:
+            if kind in KEYED:
+                self._collections[kind] = self._index(kind, records)
+                self._fetched.pop(kind, None)
+                if kind == CUSTOMERS:
+                    for record in self._collections[kind].values():
+                        self._upgrade_customer(record)
+                    self._customer_ids = None
+            else:
+                self._collections[kind] = ReservationIndex(records)
+                self._inventories = {}
+                self._events = []
+                self._rewrite = True
+                self._recount_occupancy()
+            self.mark_dirty(kind)
+
+    def mark_dirty(self, kind, name=None):
+        """
+        Records that a collection changed, flushing if it is due.
+        Without a name the whole collection is rewritten on flush.
+        """
+        with self._mutex:
+            self._dirty.add(kind)
+            if kind == WAITLIST:
+                self._waitlisted.add(name)
+            if kind in KEYED:
+                if name is None:
+                    self._full.add(kind)
+                else:
+                    self._changed.setdefault(kind, {})[name] = None
+            if kind == HOTELS and self._search is not None:
+                if name is None:
+                    self._search = None
+                else:
+                    self._search.update(name, self._get(HOTELS, name))
+            self._mutations += 1
+            self._flush_if_due()
+
+    def _flush_if_due(self):
+        """Flushes or schedules a flush as the durability policy asks."""
+        with self._mutex:
+            if self._deferred or not self._dirty:
+                return
+            elapsed = time.monotonic() - self._last_flush
+            if self.durability.due(self._mutations, elapsed):
+                self.flush()
+            elif self._timer is None and self.durability.interval:
+                # Flush within the interval even if nothing else changes
+                self._timer = threading.Timer(self.durability.interval,
+                                              self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    @contextmanager
+    def _deferring(self):
+        """
+        Defers due flushes to the end of the block, so the changes of
+        one operation are saved in one backend transaction.
+        """
+        with self._mutex:
+            self._deferred += 1
+        try:
+            yield
+        finally:
+            with self._mutex:
+                self._deferred -= 1
+                self._flush_if_due()
+
+    def _timed_flush(self):
+        """
+        Flushes from the coalescing timer thread, under the file lock
+        and over the data as other stores left it.
+        """
+        try:
+            with self._file_lock:
+                self.reload()
+                self.flush()
+        except (OSError, ValueError) as error:
+            logging.error("Coalesced flush failed: %s", error)
+
+    def is_dirty(self, kind=None):
+        """Tells whether a collection (or any collection) has changes."""
+        if kind is None:
+            return bool(self._dirty)
+        return kind in self._dirty
+
+    @instrumented('store.flush')
+    def flush(self):
+        """Writes every dirty collection back through the backend."""
+        with self._mutex, self.backend.transaction():
+            for kind in sorted(self._dirty):
+                if kind == RESERVATIONS:
+                    self._flush_reservations()
+                elif kind == OCCUPANCY:
+                    self._flush_occupancy()
+                elif kind == WAITLIST:
+                    self.backend.save_waitlist(self._waitlist.entries())
+                else:
+                    self._flush_table(kind)
+            self._dirty.clear()
+            self._changed.clear()
+            self._full.clear()
+            self._waitlisted.clear()
+            self._mutations = 0
+            self._last_flush = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _flush_table(self, kind):
+        """
+        Saves the changed records of hotels or customers, then has a
+        backend guarding rooms take the rooms booked from its hotels.
+        """
+        if kind in self._full or not self.backend.indexed:
+            self.backend.save(kind, records=self.collection(kind))
+        else:
+            self.backend.save(kind, changes={
+                name: self._get(kind, name)
+                for name in self._changed.get(kind, ())})
+            if kind == HOTELS and self._taken:
+                self._save_rooms()
+        if kind == HOTELS:
+            self._taken = {}
+            self._placed = set()
+
+    def _save_rooms(self):
+        """
+        Takes the rooms booked since the last flush, which the backend
+        refuses when another store took them first. The rooms and
+        bookings of this store are then stale, so every unflushed
+        change is dropped and the refusal raised.
+        """
+        try:
+            self.backend.save_rooms(
+                {name: rooms for name, rooms in self._taken.items() if rooms})
+        except ValueError:
+            self.discard()
+            raise
+
+    def _take(self, hotel_name, rooms):
+        """Records rooms taken from a saved hotel, negative if given."""
+        with self._mutex:
+            if self.backend.guards_rooms and hotel_name not in self._placed:
+                self._taken[hotel_name] = (self._taken.get(hotel_name, 0) +
+                                           rooms)
+
+    def _flush_reservations(self):
+        """Appends pending events, or rewrites a replaced collection."""
+        if self._rewrite:
+            self.backend.save_reservations(
+                records=self._collections[RESERVATIONS].records())
+        else:
+            self.backend.save_reservations(self._events)
+        self._events = []
+        self._rewrite = False
+
+    def _flush_occupancy(self):
+        """Appends pending occupancy deltas, or rewrites the totals."""
+        if self._recount:
+            self.backend.save_occupancy(occupancy=self._occupancy)
+        else:
+            self.backend.save_occupancy(merge(self._deltas))
+        self._deltas = []
+        self._recount = False
+
+    def _totals(self):
+        """Returns the Occupancy, loading or counting it once."""
+        with self._mutex:
+            if self._occupancy is None:
+                occupancy = self.backend.load_occupancy()
+                if occupancy is None:
+                    self._recount_occupancy()
+                else:
+                    # Deltas counted before the first read are unsaved
+                    for change in self._deltas:
+                        occupancy.apply(change)
+                    self._occupancy = occupancy
+            return self._occupancy
+
+    def _recount_occupancy(self):
+        """Counts the totals from the reservations and saves them whole."""
+        with self._mutex:
+            self._occupancy = Occupancy.compute(
+                self._reservation_index().find())
+            self._deltas = []
+            self._recount = True
+            self._dirty.add(OCCUPANCY)
+
+    def _rename_totals(self, hotel_name, new_name):
+        """Moves a renamed hotel's totals and saves them whole."""
+        with self._mutex:
+            if self._totals().rename_hotel(hotel_name, new_name):
+                self._deltas = []
+                self._recount = True
+                self._dirty.add(OCCUPANCY)
+
+    def _rename_reservations(self, hotel_name, new_name):
+        """
+        Moves a renamed hotel's reservations and night tree. Renames
+        are rare, so the reservations are then rewritten whole rather
+        than journaled.
+        """
+        with self._mutex:
+            if self._reservation_index().rename_hotel(hotel_name, new_name):
+                self._events = []
+                self._rewrite = True
+                self.mark_dirty(RESERVATIONS)
+
+    def _count(self, reservation, sign):
+        """Counts a created (sign 1) or cancelled (-1) reservation."""
+        with self._mutex:
+            if not self._occupancy_checked:
+                self._occupancy_checked = True
+                # Deltas need totals to apply to: count them first
+                if (self._occupancy is None and
+                        not self.backend.has_occupancy()):
+                    self._totals()
+            change = delta(reservation, sign)
+            if self._occupancy is not None:
+                self._occupancy.apply(change)
+            if not self._recount:
+                self._deltas.append(change)
+            self._dirty.add(OCCUPANCY)
+
+    def _record(self, event):
+        """Applies a reservation event in memory and queues it."""
+        with self._mutex:
+            reservation = event["reservation"]
+            self._count(reservation, 1)
+            if RESERVATIONS in self._collections:
+                apply_event(self._collections[RESERVATIONS], event)
+            else:
+                tree = self._inventories.get(reservation["hotel_name"])
+                nights = _stay(reservation)
+                if tree is not None and nights is not None:
+                    tree.add(nights[0], nights[1], reservation["num_rooms"])
+            self._queue(event)
+
+    def _queue(self, event):
+        """Queues a reservation event already applied in memory."""
+        with self._mutex:
+            if not self._rewrite:
+                self._events.append(event)
+            self.mark_dirty(RESERVATIONS)
+
+    @property
+    def hotels(self):
+        """The list of hotel dictionaries."""
+        return self.collection(HOTELS)
+
+    @property
+    def customers(self):
+        """The list of customer dictionaries."""
+        return self.collection(CUSTOMERS)
+
+    @property
+    def reservations(self):
+        """The list of reservation dictionaries."""
+        return self.collection(RESERVATIONS)
+
+    def iter_reservations(self, hotel_name=None, customer_name=None):
+        """
+        Yields reservations, optionally only those of a hotel and/or a
+        customer. Until the reservations are loaded or changed in this
+        store they are streamed from the backend without loading them.
+        """
+        customer_id = (None if customer_name is None
+                       else self.customer_id(customer_name))
+        with self._mutex:
+            streaming = (RESERVATIONS not in self._collections and
+                         not self._events)
+        if streaming:
+            yield from self.backend.iter_reservations(hotel_name,
+                                                      customer_id)
+        else:
+            # Copied out first, as the caller may change the index
+            with self._mutex:
+                reservations = list(self._reservation_index().find(
+                    hotel_name, customer_id))
+            yield from reservations
+
+    def customer_id(self, name):
+        """
+        Returns the id of the customer with the given name. Unknown
+        names map to their legacy id, so bookings kept from a deleted
+        legacy customer can still be found and cancelled.
+        """
+        customer = self.find_customer(name)
+        if customer is None:
+            return legacy_customer_id(name)
+        return customer["id"]
+
+    @instrumented('store.resolve_reservation')
+    def resolve_reservation(self, reservation):
+        """
+        Returns a copy of a reservation with its customer record joined
+        in under "customer". A customer that no longer exists resolves
+        to a record holding only its id.
+        """
+        customer_id = reservation["customer_id"]
+        customer = self._customer_by_id(customer_id)
+        if customer is None:
+            customer = {"id": customer_id, "name": None, "email": None,
+                        "phone_number": None}
+        resolved = {key: value for key, value in reservation.items()
+                    if key != "customer_id"}
+        resolved["customer"] = dict(customer)
+        return resolved
+
+    def _customer_by_id(self, customer_id):
+        """Returns the customer record with an id, or None."""
+        with self._mutex:
+            if self._customer_ids is None:
+                self._customer_ids = {customer["id"]: customer
+                                      for customer in self.customers}
+            return self._customer_ids.get(customer_id)
+
+    def _rename(self, kind, name, new_name):
+        """Moves a record to a new unique name in its index."""
+        with self._mutex:
+            if self._get(kind, new_name) is not None:
+                return False
+            record = self._get(kind, name)
+            self._put(kind, name, None)
+            record["name"] = new_name
+            self._put(kind, new_name, record)
+            return True
+
+    @instrumented('store.search_hotels')
+    def search_hotels(self, num_rooms, address_prefix=None, limit=10,
+                      after=None, check_in=None, check_out=None):
+        """
+        Returns a page of the hotels with at least num_rooms rooms free,
+        most rooms first, optionally only those whose address starts with
+        address_prefix. Rooms are free as when booking: not held by
+        open-ended bookings nor, on any night of the stay (from today
+        on without dates), by dated ones. The result holds the hotel
+        dictionaries under "hotels" and, under "next", the cursor to
+        pass as after for the following page (None on the last page).
+        """
+        dates = (() if check_in is None and check_out is None
+                 else (check_in, check_out))
+        nights = _booking_nights(dates)
+        if nights is None:
+            return {"hotels": [], "next": None}
+        with self._mutex:
+            if self._search is None:
+                self._search = HotelSearchIndex(self.hotels)
+            if RESERVATIONS not in self._collections and any(
+                    totals["rooms"] != totals["open_rooms"]
+                    for totals in self._totals().hotels.values()):
+                # Load the reservations once rather than hotel by hotel
+                self._reservation_index()
+
+            def free(name):
+                return (self._get(HOTELS, name)["rooms"] -
+                        self._booked(name, nights) >= num_rooms)
+            names, cursor = self._search.search(num_rooms, address_prefix,
+                                                limit, after, free)
+            return {"hotels": [dict(self._get(HOTELS, name))
+                               for name in names],
+                    "next": cursor}
+
+    @instrumented('store.hotel_occupancy')
+    def hotel_occupancy(self, hotel_name):
+        """
+        Returns the rooms held, the rooms held by open-ended bookings
+        and the bookings of a hotel, without reading the reservations.
+        """
+        return self._totals().hotel(hotel_name)
+
+    @instrumented('store.customer_occupancy')
+    def customer_occupancy(self, customer_name):
+        """Returns the rooms held and the bookings of a customer."""
+        return self._totals().customer(self.customer_id(customer_name))
+
+    @instrumented('store.find_hotel')
+    def find_hotel(self, name):
+        """Returns the hotel dictionary with the given name, or None."""
+        return self._get(HOTELS, name)
+
+    @instrumented('store.create_hotel')
+    def create_hotel(self, name, address, rooms):
+        """Adds a hotel, returning False when the name is taken."""
+        with self._mutex:
+            if self._get(HOTELS, name) is not None:
+                return False
+            self._put(HOTELS, name, {"name": name, "address": address,
+                                     "rooms": rooms})
+            return True
+
+    @instrumented('store.delete_hotel')
+    def delete_hotel(self, name):
+        """Removes the hotel with the given name."""
+        with self._hotel_locks.get(name), self._mutex:
+            if self._get(HOTELS, name) is not None:
+                self._put(HOTELS, name, None)
+                if self._waiting().remove(name):
+                    self.mark_dirty(WAITLIST, name)
+
+    @instrumented('store.modify_hotel')
+    def modify_hotel(self, name, new_name=None, new_address=None,
+                     new_rooms=None):
+        """
+        Modifies a hotel, returning False when it does not exist
+        or when new_name belongs to another hotel. Adding rooms
+        promotes the requests waiting for them.
+        """
+        with self._hotel_locks.get(name):
+            hotel = self.find_hotel(name)
+            if hotel is None:
+                return False
+            if new_name and new_name != name:
+                if not self._rename(HOTELS, name, new_name):
+                    return False
+                self._rename_totals(name, new_name)
+                self._rename_reservations(name, new_name)
+                with self._mutex:
+                    if self._waiting().peek(name) is not None:
+                        self._waitlist.rename(name, new_name)
+                        self.mark_dirty(WAITLIST)
+            if new_address:
+                hotel["address"] = new_address
+            added = new_rooms is not None and new_rooms > hotel["rooms"]
+            if new_rooms is not None:
+                self._take(hotel["name"], hotel["rooms"] - new_rooms)
+                hotel["rooms"] = new_rooms
+            self.mark_dirty(HOTELS, hotel["name"])
+            if added:
+                self._promote(hotel["name"])
+            return True
+
+    def set_rooms(self, name, rooms):
+        """Sets the available rooms of a hotel."""
+        return self.modify_hotel(name, new_rooms=rooms)
+
+    @instrumented('store.find_customer')
+    def find_customer(self, name):
+        """Returns the customer dictionary with the given name, or None."""
+        return self._get(CUSTOMERS, name)
+
+    @instrumented('store.create_customer')
+    def create_customer(self, name, email, phone_number, customer_id=None):
+        """
+        Adds a customer, returning False when the name is taken. A new
+        id is drawn unless customer_id carries one over, e.g. on import.
+        """
+        with self._mutex:
+            if self._get(CUSTOMERS, name) is not None:
+                return False
+            self._put(CUSTOMERS, name, {"id": customer_id or
+                                        new_customer_id(),
+                                        "name": name, "email": email,
+                                        "phone_number": phone_number})
+            return True
+
+    @instrumented('store.delete_customer')
+    def delete_customer(self, name):
+        """Removes the customer with the given name."""
+        with self._mutex:
+            if self._get(CUSTOMERS, name) is not None:
+                self._put(CUSTOMERS, name, None)
+
+    @instrumented('store.modify_customer')
+    def modify_customer(self, name, new_name=None, new_email=None,
+                        new_phone=None):
+        """
+        Modifies a customer, returning False when it does not exist
+        or when new_name belongs to another customer.
+        """
+        customer = self.find_customer(name)
+        if customer is None:
+            return False
+        if new_name and new_name != name:
+            if not self._rename(CUSTOMERS, name, new_name):
+                return False
+        if new_email:
+            customer["email"] = new_email
+        if new_phone:
+            customer["phone_number"] = new_phone
+        self.mark_dirty(CUSTOMERS, customer["name"])
+        return True
+
+    @instrumented('store.add_reservation')
+    def add_reservation(self, reservation):
+        """
+        Records a reservation dictionary without touching rooms. One
+        embedding its customer is stored with the customer's id instead.
+        """
+        if is_legacy(reservation):
+            reservation = dict(reservation)
+            customer = reservation.pop("customer")
+            reservation["customer_id"] = (customer.get("id") or
+                                          self.customer_id(customer["name"]))
+        self._record(create_event(reservation))
+
+    @instrumented('store.create_reservation')
+    def create_reservation(self, hotel_name, customer_name, num_rooms,
+                           check_in=None, check_out=None, waitlist=False,
+                           priority=DEFAULT_PRIORITY):
+        """
+        Books rooms for a customer, returning True on success. Without
+        dates the booking is open-ended and holds the rooms for good.
+        With waitlist, a booking refused for lack of rooms is queued
+        at priority and booked once rooms free up.
+        """
+        booking = (hotel_name, customer_name, num_rooms)
+        if check_in is not None or check_out is not None:
+            booking += (check_in, check_out)
+        # Held so rooms cannot free up between the refusal and the queue
+        with self._hotel_locks.get(hotel_name):
+            report = self.create_reservations([booking])
+            if (waitlist and report["rejected"] and
+                    report["rejected"][0]["reason"] == "not enough rooms"):
+                reservation = {"hotel_name": hotel_name,
+                               "customer_id": self.customer_id(
+                                   customer_name),
+                               "num_rooms": num_rooms}
+                if booking[3:]:
+                    nights = _booking_nights(booking[3:])
+                    reservation["check_in"] = iso(nights[0])
+                    reservation["check_out"] = iso(nights[1])
+                with self._mutex:
+                    self._waiting().add(reservation, priority)
+                    self.mark_dirty(WAITLIST, hotel_name)
+        return bool(report["accepted"])
+
+    def _waiting(self):
+        """Returns the Waitlist, loading it once."""
+        with self._mutex:
+            if self._waitlist is None:
+                self._waitlist = Waitlist(self.backend.load_waitlist())
+            return self._waitlist
+
+    @instrumented('store.waitlist_position')
+    def waitlist_position(self, hotel_name, customer_name):
+        """
+        Returns the 1-based position of a customer's request on a
+        hotel's waitlist, or None when the customer is not waiting.
+        """
+        with self._mutex:
+            return self._waiting().position(
+                hotel_name, self.customer_id(customer_name))
+
+    @instrumented('store.leave_waitlist')
+    def leave_waitlist(self, hotel_name=None, customer_name=None):
+        """
+        Withdraws the waiting requests of a customer at a hotel, at
+        every hotel without a hotel_name, and returns them.
+        """
+        customer_id = (None if customer_name is None
+                       else self.customer_id(customer_name))
+        with self._mutex:
+            removed = self._waiting().remove(hotel_name, customer_id)
+            if removed:
+                self.mark_dirty(WAITLIST, hotel_name)
+            return removed
+
+    def _promote(self, hotel_name):
+        """
+        Books a hotel's waiting requests and returns those booked.
+        Within the best waiting tier every request that fits is booked
+        in order of arrival, skipping those that do not; a lower tier
+        is only served once the tiers above it are empty. A request
+        whose customer is gone is dropped.
+        """
+        with self._hotel_locks.get(hotel_name), self._mutex:
+            waiting = self._waiting()
+            promoted = []
+            blocked = False
+            while not blocked:
+                tier = waiting.tier(hotel_name)
+                if not tier:
+                    break
+                for entry in tier:
+                    customer = self._customer_by_id(entry["customer_id"])
+                    if customer is not None:
+                        booking = (hotel_name, customer["name"],
+                                   entry["num_rooms"])
+                        if "check_in" in entry:
+                            booking += (entry["check_in"],
+                                        entry["check_out"])
+                        reason = self._booking_error(booking, {})
+                        if reason == "not enough rooms":
+                            blocked = True
+                            continue
+                        if reason is None:
+                            self.create_reservations([booking])
+                            promoted.append(entry)
+                    waiting.discard(entry)
+                    self.mark_dirty(WAITLIST, hotel_name)
+            return promoted
+
+    def _booked(self, hotel_name, nights):
+        """
+        Returns the most rooms dated bookings hold on any of nights.
+        A hotel whose totals hold no dated rooms is answered without
+        reading any reservation.
+        """
+        with self._mutex:
+            if (RESERVATIONS not in self._collections and
+                    hotel_name not in self._inventories):
+                totals = self._totals().hotel(hotel_name)
+                if totals["rooms"] == totals["open_rooms"]:
+                    return 0
+            return self._inventory(hotel_name).max(*nights)
+
+    def _hold(self, hotel_name, nights, num_rooms):
+        """Adds rooms to a hotel's nights, or removes negative ones."""
+        with self._mutex:
+            self._inventory(hotel_name).add(nights[0], nights[1], num_rooms)
+
+    def _inventory(self, hotel_name):
+        """
+        Returns the SegmentTree of the rooms a hotel's dated bookings
+        hold each night. Until the reservations are loaded it is built
+        from that hotel's reservations alone, then kept up to date.
+        """
+        with self._mutex:
+            if RESERVATIONS in self._collections:
+                return self._collections[RESERVATIONS].inventory(hotel_name)
+            tree = self._inventories.get(hotel_name)
+            if tree is None:
+                tree = self._inventories[hotel_name] = SegmentTree()
+                # Cancels load the index, so only creates are queued
+                queued = [event["reservation"] for event in self._events
+                          if event["op"] == CREATE and
+                          event["reservation"]["hotel_name"] == hotel_name]
+                for reservation in chain(
+                        self.backend.iter_reservations(hotel_name), queued):
+                    nights = _stay(reservation)
+                    if nights is not None:
+                        tree.add(nights[0], nights[1],
+                                 reservation["num_rooms"])
+            return tree
+
+    @instrumented('store.min_free_rooms')
+    def min_free_rooms(self, hotel_name, check_in, check_out):
+        """
+        Returns the fewest rooms a hotel has free on any night from
+        check_in to check_out, or None when the hotel or the dates
+        are invalid.
+        """
+        with self._hotel_locks.get(hotel_name):
+            hotel = self.find_hotel(hotel_name)
+            nights = _booking_nights((check_in, check_out))
+            if hotel is None or nights is None:
+                return None
+            return hotel["rooms"] - self._booked(hotel_name, nights)
+
+    def can_book(self, hotel_name, num_rooms, check_in, check_out):
+        """Tells whether num_rooms are free every night of a stay."""
+        free = self.min_free_rooms(hotel_name, check_in, check_out)
+        return free is not None and free >= num_rooms
+
+    def _booking_error(self, booking, rooms_left):
+        """
+        Returns why a (hotel_name, customer_name, num_rooms[, check_in,
+        check_out]) booking cannot be made, or None. rooms_left holds
+        the rooms of hotels already touched by the current batch.
+        """
+        hotel_name, customer_name, num_rooms, *dates = booking
+        hotel = self.find_hotel(hotel_name)
+        if hotel is None:
+            return "unknown hotel"
+        if self.find_customer(customer_name) is None:
+            return "unknown customer"
+        if not isinstance(num_rooms, int) or num_rooms < 1:
+            return "invalid number of rooms"
+        nights = _booking_nights(dates)
+        if nights is None:
+            return "invalid dates"
+        rooms = rooms_left.get(hotel_name, hotel["rooms"])
+        if rooms - self._booked(hotel_name, nights) < num_rooms:
+            return "not enough rooms"
+        return None
+
+    @instrumented('store.create_reservations')
+    def create_reservations(self, bookings, policy=BEST_EFFORT):
+        """
+        Books a batch of (hotel_name, customer_name, num_rooms) tuples,
+        optionally followed by check_in and check_out dates, in order
+        against the in-memory inventory. With BEST_EFFORT the valid
+        bookings are kept; with ALL_OR_NOTHING a single rejection drops
+        the whole batch. Returns a report with the accepted bookings
+        and the rejected ones with their reason.
+        """
+        if policy not in (BEST_EFFORT, ALL_OR_NOTHING):
+            raise ValueError(f"Unknown batch policy {policy!r}.")
+        bookings = [tuple(booking) for booking in bookings]
+        with self._hotel_locks.holding(b[0] for b in bookings), \
+                self._deferring():
+            return self._apply_bookings(bookings, policy)
+
+    def _apply_bookings(self, bookings, policy):
+        """Books a batch while the locks of its hotels are held."""
+        rooms_left = {}
+        accepted = []
+        rejected = []
+        # Dated bookings of the batch, held in the trees while checking
+        held = []
+        for booking in bookings:
+            reason = self._booking_error(booking, rooms_left)
+            if reason is not None:
+                rejected.append({"booking": booking, "reason": reason})
+                continue
+            hotel_name, _, num_rooms, *dates = booking
+            if dates:
+                nights = _booking_nights(dates)
+                self._hold(hotel_name, nights, num_rooms)
+                held.append((hotel_name, nights, num_rooms))
+            else:
+                rooms = rooms_left.get(hotel_name,
+                                       self.find_hotel(hotel_name)["rooms"])
+                rooms_left[hotel_name] = rooms - num_rooms
+            accepted.append(booking)
+        with self._mutex:
+            for hotel_name, nights, num_rooms in held:
+                self._hold(hotel_name, nights, -num_rooms)
+            if rejected and policy == ALL_OR_NOTHING:
+                rejected.extend({"booking": booking,
+                                 "reason": "batch aborted"}
+                                for booking in accepted)
+                return {"accepted": [], "rejected": rejected}
+            for hotel_name, customer_name, num_rooms, *dates in accepted:
+                reservation = {"hotel_name": hotel_name,
+                               "customer_id": self.customer_id(
+                                   customer_name),
+                               "num_rooms": num_rooms}
+                if dates:
+                    nights = _booking_nights(dates)
+                    reservation["check_in"] = iso(nights[0])
+                    reservation["check_out"] = iso(nights[1])
+                self.add_reservation(reservation)
+        for hotel_name, rooms in rooms_left.items():
+            self.set_rooms(hotel_name, rooms)
+        return {"accepted": accepted, "rejected": rejected}
+
+    @instrumented('store.cancel_reservation')
+    def cancel_reservation(self, hotel_name, customer_name):
+        """Cancels a customer's bookings at a hotel, returning them."""
+        return self.cancel_reservations([(hotel_name, customer_name)])
+
+    @instrumented('store.cancel_reservations')
+    def cancel_reservations(self, cancellations):
+        """
+        Cancels a batch of (hotel_name, customer_name) pairs. A None
+        customer_name cancels a whole hotel and a None hotel_name every
+        booking of the customer. Rooms held by open-ended bookings are
+        given back to their hotels, waiting requests that now fit are
+        booked and the cancelled reservations are returned.
+        """
+        cancellations = list(cancellations)
+        if any(hotel_name is None and customer_name is None
+               for hotel_name, customer_name in cancellations):
+            raise ValueError("A cancellation needs a hotel or customer.")
+        keys = [(hotel_name, None if customer_name is None
+                 else self.customer_id(customer_name))
+                for hotel_name, customer_name in cancellations]
+        with self._deferring():
+            index = self._reservation_index()
+            cancelled = []
+            with self._mutex:
+                for hotel_name, customer_id in keys:
+                    removed = index.cancel(hotel_name, customer_id)
+                    for reservation in removed:
+                        self._count(reservation, -1)
+                    if removed:
+                        self._queue(cancel_event(hotel_name, customer_id))
+                        cancelled.extend(removed)
+            freed = {}
+            for reservation in cancelled:
+                if "check_in" in reservation:
+                    # Dated bookings free their nights, not the room count
+                    continue
+                name = reservation['hotel_name']
+                freed[name] = freed.get(name, 0) + reservation['num_rooms']
+            for name, rooms in freed.items():
+                with self._hotel_locks.get(name):
+                    hotel = self.find_hotel(name)
+                    if hotel is not None:
+                        self.set_rooms(name, hotel["rooms"] + rooms)
+            # Cancelled dated bookings free nights without adding rooms
+            for name in {r["hotel_name"] for r in cancelled} - freed.keys():
+                if self.find_hotel(name) is not None:
+                    self._promote(name)
+            return cancelled
+
+
+def _booking_nights(dates):
+    """
+    Returns the (check_in, check_out) ordinals a booking holds, from
+    today on for an open-ended one, or None for invalid dates.
+    """
+    if not dates:
+        return (date.today().toordinal(), NIGHTS)
+    if len(dates) != 2:
+        return None
+    try:
+        check_in, check_out = night(dates[0]), night(dates[1])
+    except ValueError:
+        return None
+    return (check_in, check_out) if check_in < check_out else None
+
+
+def _stay(reservation):
+    """Returns the nights a dated reservation holds, or None."""
+    # pylint: disable-next=unidiomatic-typecheck
+    if "check_in" not in reservation or type(
+            reservation.get("num_rooms")) is not int:
+        return None
+    return _booking_nights((reservation["check_in"],
+                            reservation["check_out"]))
+
+
+def active_store():
+    """Returns the innermost store entered with ``with``, or None."""
+    return _ACTIVE[-1] if _ACTIVE else None
+
+
+def set_default_backend(factory):
+    """
+    Sets the callable building the backend of short-lived sessions
+    from a directory, e.g. ``lambda d: SqliteBackend(d + '/store.db')``.
+    """
+    _BACKEND_FACTORY[0] = factory
+
+
+def reader(directory='.'):
+    """
+    Returns the active store, or a short-lived one for reads that take
+    no file lock. Backends replace files atomically and read journals
+    under their own locks, so such reads never see a torn write; the
+    store's changes, such as upgraded legacy records, are not saved.
+    """
+    store = active_store()
+    if store is not None:
+        return store
+    return Store(backend=_BACKEND_FACTORY[0](directory))
+
+
+@contextmanager
+def session(directory='.'):
+    """
+    Yields the active store, or a short-lived one that is flushed
+    on exit so the static model API keeps its write-through behaviour.
+    """
+    store = active_store()
+    if store is not None:
+        yield store
+        return
+    backend = _BACKEND_FACTORY[0](directory)
+    # The file lock makes the read-modify-write atomic across processes
+    with backend.lock():
+        store = Store(backend=backend)
+        yield store
+        store.flush()
+
+
+@contextmanager
+def hotel_session(hotel_name, directory='.'):
+    """
+    Yields the active store, or a short-lived one for the bookings,
+    cancellations and waiting requests of one hotel. It holds only the
+    lock of the hotel's shard, so sessions at hotels of other shards
+    run in parallel, and takes the directory lock just to flush, once,
+    over the data as other sessions left it. Without a hotel_name, and
+    for any other change, it is a plain session().
+    """
+    store = active_store()
+    if store is not None or hotel_name is None:
+        with session(directory) as store:
+            yield store
+        return
+    while True:
+        backend = _BACKEND_FACTORY[0](directory)
+        lock = backend.hotel_lock(hotel_name)
+        lock.acquire()
+        if not backend.stale():
+            break
+        # Resharded while waiting, so the shard files have moved
+        lock.release()
+    try:
+        # Nothing is written before the directory lock is held
+        store = Store(backend=backend, durability=MANUAL)
+        yield store
+        with backend.save_lock():
+            store.reload()
+            backend.set_durability(default_durability().fsync)
+            store.flush()
+    finally:
+        lock.release()
@@ -0,0 +1,133 @@
+'''
+This script is focused on generating the Waitlist class, the queue
+of booking requests a fully booked hotel could not take yet.
+Each hotel has its own heap ordered by priority tier, higher first,
+then by arrival, so the next request to promote is always on top.
+The methods pertaining containing the Waitlist class are
+a. Adding a request to a hotel's waitlist
+b. Peeking at and popping the next request, in O(log n)
+c. Listing the requests of a hotel's best tier and taking any of them
+d. Finding the position of a customer's request
+e. Removing the requests of a customer or of a hotel
+'''
+import heapq
+
+# Tier of requests made without one; higher tiers are served first
+DEFAULT_PRIORITY = 0
+
+
+def _key(entry):
+    """Returns the heap key of an entry: best tier, then earliest."""
+    return (-entry["priority"], entry["seq"])
+
+
+class Waitlist:
+    """
+    The waiting requests of every hotel. An entry is a reservation
+    dictionary (hotel_name, customer_id, num_rooms and optional dates)
+    with its priority tier and its arrival sequence number "seq".
+    """
+    def __init__(self, entries=()):
+        """Initializes the waitlist with saved entries."""
+        # Hotel name -> heap of (key, entry)
+        self._heaps = {}
+        self._seq = 0
+        for entry in entries:
+            self._push(entry)
+
+    def __len__(self):
+        """Returns the number of waiting requests."""
+        return sum(len(heap) for heap in self._heaps.values())
+
+    def _push(self, entry):
+        """Adds an entry to its hotel's heap."""
+        self._seq = max(self._seq, entry["seq"] + 1)
+        heapq.heappush(self._heaps.setdefault(entry["hotel_name"], []),
+                       (_key(entry), entry))
+
+    def add(self, reservation, priority=DEFAULT_PRIORITY):
+        """Queues a reservation request and returns its entry."""
+        entry = dict(reservation, priority=priority, seq=self._seq)
+        self._push(entry)
+        return entry
+
+    def peek(self, hotel_name):
+        """Returns the next request of a hotel, or None."""
+        heap = self._heaps.get(hotel_name)
+        return heap[0][1] if heap else None
+
+    def pop(self, hotel_name):
+        """Removes and returns the next request of a hotel."""
+        heap = self._heaps[hotel_name]
+        entry = heapq.heappop(heap)[1]
+        if not heap:
+            del self._heaps[hotel_name]
+        return entry
+
+    def tier(self, hotel_name):
+        """Returns the requests of a hotel's best tier, in order."""
+        heap = self._heaps.get(hotel_name)
+        if not heap:
+            return []
+        best = heap[0][0][0]
+        return [entry for key, entry in sorted(heap, key=lambda i: i[0])
+                if key[0] == best]
+
+    def discard(self, entry):
+        """Removes one entry, such as one returned by tier."""
+        name = entry["hotel_name"]
+        kept = [item for item in self._heaps[name]
+                if item[0] != _key(entry)]
+        if kept:
+            heapq.heapify(kept)
+            self._heaps[name] = kept
+        else:
+            del self._heaps[name]
+
+    def position(self, hotel_name, customer_id):
+        """
+        Returns the 1-based position of a customer's first request at
+        a hotel, or None when the customer is not waiting there.
+        """
+        heap = self._heaps.get(hotel_name, ())
+        mine = [key for key, entry in heap
+                if entry["customer_id"] == customer_id]
+        if not mine:
+            return None
+        best = min(mine)
+        return 1 + sum(1 for key, _ in heap if key < best)
+
+    def remove(self, hotel_name=None, customer_id=None):
+        """
+        Removes and returns the requests matching a hotel and/or a
+        customer, in the order they would have been served.
+        """
+        removed = []
+        hotels = (list(self._heaps) if hotel_name is None
+                  else [hotel_name] if hotel_name in self._heaps else [])
+        for name in hotels:
+            kept = []
+            for item in self._heaps[name]:
+                if customer_id in (None, item[1]["customer_id"]):
+                    removed.append(item)
+                else:
+                    kept.append(item)
+            if kept:
+                heapq.heapify(kept)
+                self._heaps[name] = kept
+            else:
+                del self._heaps[name]
+        return [entry for _, entry in sorted(removed, key=lambda i: i[0])]
+
+    def rename(self, hotel_name, new_name):
+        """Moves a hotel's requests to its new name."""
+        heap = self._heaps.pop(hotel_name, None)
+        if heap is not None:
+            for _, entry in heap:
+                entry["hotel_name"] = new_name
+            self._heaps[new_name] = heap
+
+    def entries(self):
+        """Returns every entry, each hotel's in the order served."""
+        return [entry for heap in self._heaps.values()
+                for _, entry in sorted(heap, key=lambda i: i[0])]
@@ -0,0 +1,218 @@
+'''
+This script contains all the unit test
+pertaining to the occupancy totals (aggregates.py) and their
+reconciliation (reconcile.py)
+'''
+import os
+import tempfile
+import unittest
+from src.aggregates import Occupancy, OccupancyJournal, delta, merge
+from src.backends import JsonBackend, RESERVATIONS, SqliteBackend
+from src.customer import Customer
+from src.hotel import Hotel
+from src.journal import cancel_event
+from src.reconcile import reconcile
+from src.reservation import Reservation
+from src.store import Store
+
+
+def _booking(hotel_name, customer_id, num_rooms, dated=False):
+    """Builds a reservation dictionary for the tests"""
+    reservation = {"hotel_name": hotel_name, "customer_id": customer_id,
+                   "num_rooms": num_rooms}
+    if dated:
+        reservation["check_in"] = "2030-01-01"
+        reservation["check_out"] = "2030-01-03"
+    return reservation
+
+
+class TestOccupancy(unittest.TestCase):
+    """Unit tests for validating the Occupancy totals"""
+    def test_compute_and_apply(self):
+        """Test counting reservations and cancelling one"""
+        occupancy = Occupancy.compute([
+            _booking("Kyatt Hotel", "a", 2), _booking("Kyatt Hotel", "b", 3,
+                                                      dated=True),
+            _booking("Hotel Harris", "a", 1)])
+        self.assertEqual(occupancy.hotel("Kyatt Hotel"),
+                         {"rooms": 5, "open_rooms": 2, "bookings": 2})
+        self.assertEqual(occupancy.customer("a"),
+                         {"rooms": 3, "bookings": 2})
+        occupancy.apply(delta(_booking("Hotel Harris", "a", 1), -1))
+        self.assertNotIn("Hotel Harris", occupancy.hotels)
+        self.assertEqual(occupancy.hotel("Hotel Harris"),
+                         {"rooms": 0, "open_rooms": 0, "bookings": 0})
+
+    def test_merge(self):
+        """Test that deltas cancelling out are dropped"""
+        deltas = [delta(_booking("Kyatt Hotel", "a", 2)),
+                  delta(_booking("Kyatt Hotel", "a", 2), -1),
+                  delta(_booking("Kyatt Hotel", "b", 1)),
+                  delta(_booking("Kyatt Hotel", "b", 4))]
+        self.assertEqual(merge(deltas), [
+            {"hotel_name": "Kyatt Hotel", "customer_id": "b", "rooms": 5,
+             "open_rooms": 5, "bookings": 2}])
+
+    def test_drift(self):
+        """Test reporting the totals that differ"""
+        stored = Occupancy.compute([_booking("Kyatt Hotel", "a", 2)])
+        actual = Occupancy.compute([_booking("Kyatt Hotel", "a", 1)])
+        self.assertEqual(
+            [(d["kind"], d["field"], d["stored"], d["actual"])
+             for d in stored.drift(actual)],
+            [("hotel", "rooms", 2, 1), ("hotel", "open_rooms", 2, 1),
+             ("customer", "rooms", 2, 1)])
+        self.assertEqual(actual.drift(actual), [])
+
+
+class TestOccupancyJournal(unittest.TestCase):
+    """Unit tests for validating the persisted totals"""
+    def setUp(self):
+        """Creates a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'occupancy.json')
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_append_and_compact(self):
+        """Test that deltas replay and fold into the snapshot"""
+        journal = OccupancyJournal(self.path, compact_bytes=None)
+        self.assertIsNone(journal.load())
+        journal.rewrite(Occupancy())
+        journal.append([delta(_booking("Kyatt Hotel", "a", 2))])
+        self.assertEqual(journal.load().hotel("Kyatt Hotel")["rooms"], 2)
+        journal.compact_bytes = 1
+        journal.append([delta(_booking("Kyatt Hotel", "a", 1))])
+        self.assertFalse(os.path.exists(journal.log_path))
+        self.assertEqual(journal.load().hotel("Kyatt Hotel")["rooms"], 3)
+
+    def test_recover_staged_snapshot(self):
+        """Test that a staged snapshot counts only once the log is gone"""
+        journal = OccupancyJournal(self.path, compact_bytes=None)
+        journal.rewrite(Occupancy())
+        journal.append([delta(_booking("Kyatt Hotel", "a", 2))])
+        with open(self.path + '.new', 'w', encoding='utf-8') as file:
+            file.write('{"hotels": {}, "customers": {}}')
+        self.assertEqual(journal.load().hotel("Kyatt Hotel")["rooms"], 2)
+        self.assertFalse(os.path.exists(self.path + '.new'))
+
+
+class TestStoreOccupancy(unittest.TestCase):
+    """Unit tests for validating the totals kept by the Store"""
+    def setUp(self):
+        """Creates a temporary directory with hotels and a customer"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        with Store(self.directory) as store:
+            store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 50)
+            store.create_hotel("Hotel Harris", "456 Frontier Drive", 100)
+            store.create_customer("Arian Reyes", "a@b.com", "000")
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_totals_follow_bookings(self):
+        """Test that creates and cancels keep the totals current"""
+        with Store(self.directory) as store:
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 5)
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 2,
+                                     "2030-01-01", "2030-01-05")
+            store.create_reservation("Hotel Harris", "Arian Reyes", 1)
+            store.cancel_reservation("Hotel Harris", "Arian Reyes")
+        store = Store(self.directory)
+        self.assertEqual(store.hotel_occupancy("Kyatt Hotel"),
+                         {"rooms": 7, "open_rooms": 5, "bookings": 2})
+        self.assertEqual(store.customer_occupancy("Arian Reyes"),
+                         {"rooms": 7, "bookings": 2})
+        # Read from the saved totals, not the reservations
+        self.assertNotIn(RESERVATIONS, store._collections)
+
+    def test_totals_follow_rename(self):
+        """Test that a renamed hotel keeps its totals"""
+        with Store(self.directory) as store:
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 5)
+            store.modify_hotel("Kyatt Hotel", new_name="Kyatt Suites")
+            store.create_reservation("Kyatt Suites", "Arian Reyes", 1)
+        store = Store(self.directory)
+        self.assertEqual(store.hotel_occupancy("Kyatt Suites"),
+                         {"rooms": 6, "open_rooms": 6, "bookings": 2})
+        self.assertEqual(store.hotel_occupancy("Kyatt Hotel")["bookings"],
+                         0)
+
+    def test_static_api(self):
+        """Test reading the totals through the models"""
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            Reservation.create_reservation("Kyatt Hotel", "Arian Reyes", 3)
+            self.assertEqual(Hotel.occupancy("Kyatt Hotel")["rooms"], 3)
+            self.assertEqual(Customer.occupancy("Arian Reyes")["bookings"],
+                             1)
+        finally:
+            os.chdir(cwd)
+
+    def test_counts_existing_reservations(self):
+        """Test that totals are counted once for data without them"""
+        with Store(self.directory) as store:
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 4)
+        for name in os.listdir(self.directory):
+            if name.startswith('occupancy'):
+                os.remove(os.path.join(self.directory, name))
+        with Store(self.directory) as store:
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 1)
+        self.assertEqual(
+            Store(self.directory).hotel_occupancy("Kyatt Hotel")["rooms"], 5)
+
+    def test_reconcile(self):
+        """Test reporting and repairing drift"""
+        with Store(self.directory) as store:
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 4)
+            customer_id = store.customer_id("Arian Reyes")
+        backend = JsonBackend(self.directory)
+        self.assertEqual(reconcile(backend)["drift"], [])
+        # A cancellation that reached the reservations only
+        backend.save_reservations([cancel_event("Kyatt Hotel",
+                                                customer_id)])
+        report = reconcile(backend)
+        self.assertEqual(len(report["drift"]), 5)
+        self.assertEqual(report["rooms"], [{"hotel_name": "Kyatt Hotel",
+                                            "rooms": 46, "expected": 50}])
+        reconcile(backend, repair=True)
+        report = reconcile(backend)
+        self.assertEqual((report["drift"], report["rooms"]), ([], []))
+        self.assertEqual(Store(self.directory).find_hotel(
+            "Kyatt Hotel")["rooms"], 50)
+
+    def test_sqlite_totals(self):
+        """Test that the SQLite backend sums its rows"""
+        backend = SqliteBackend(os.path.join(self.directory, 'store.db'))
+        try:
+            with Store(backend=backend) as store:
+                store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 9)
+                store.create_customer("Arian Reyes", "a@b.com", "000")
+                store.create_reservation("Kyatt Hotel", "Arian Reyes", 2)
+                store.create_reservation("Kyatt Hotel", "Arian Reyes", 1,
+                                         "2030-01-01", "2030-01-02")
+            self.assertEqual(Store(backend=backend).hotel_occupancy(
+                "Kyatt Hotel"), {"rooms": 3, "open_rooms": 2, "bookings": 2})
+            self.assertEqual(reconcile(backend)["drift"], [])
+            # A cancellation that reached the reservation rows only
+            backend.save_reservations([cancel_event(
+                "Kyatt Hotel", Store(backend=backend).customer_id(
+                    "Arian Reyes"))])
+            report = reconcile(backend, repair=True)
+            self.assertEqual(len(report["drift"]), 5)
+            self.assertEqual(report["rooms"], [
+                {"hotel_name": "Kyatt Hotel", "rooms": 7, "expected": 9}])
+            self.assertEqual(reconcile(backend)["drift"], [])
+            self.assertEqual(Store(backend=backend).find_hotel(
+                "Kyatt Hotel")["rooms"], 9)
+        finally:
+            backend.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
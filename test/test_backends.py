@@ -0,0 +1,163 @@
+'''
+This script contains all the unit test
+pertaining to the storage backends (backends.py, migrate.py)
+'''
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from src.backends import HOTELS, JsonBackend, SqliteBackend
+from src.migrate import migrate
+from src.store import Store
+
+
+class TestSqliteBackend(unittest.TestCase):
+    """Unit tests for validating the SqliteBackend through the Store"""
+    def setUp(self):
+        """Creates a database with two hotels and one customer"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'store.db')
+        store = Store(backend=SqliteBackend(self.path))
+        store.create_hotel("Hotel Harris", "456 Frontier Drive", 100)
+        store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 50)
+        store.create_customer("Alex Fregoso", "afreg@gmail.com",
+                              "985-363-7485")
+        store.flush()
+        store.backend.close()
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def _open(self):
+        """Returns a fresh store over the database"""
+        return Store(backend=SqliteBackend(self.path))
+
+    def test_wal_and_indexes(self):
+        """Test that the database runs in WAL mode with name indexes"""
+        conn = sqlite3.connect(self.path)
+        mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        indexes = {row[1] for row in conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE type = 'index'")}
+        conn.close()
+        self.assertEqual(mode, 'wal')
+        self.assertIn('reservations_by_hotel', indexes)
+
+    def test_booking_round_trip(self):
+        """Test that a booking persists rooms and the reservation"""
+        store = self._open()
+        self.assertTrue(store.create_reservation("Kyatt Hotel",
+                                                 "Alex Fregoso", 5))
+        store.flush()
+        store = self._open()
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 45)
+        self.assertEqual(len(store.reservations), 1)
+        store.cancel_reservation("Kyatt Hotel", "Alex Fregoso")
+        store.flush()
+        store = self._open()
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 50)
+        self.assertEqual(store.reservations, [])
+
+    def test_last_room_is_booked_once(self):
+        """Test that two stores cannot both book the last rooms"""
+        first, second = self._open(), self._open()
+        for store in (first, second):
+            self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 50)
+            self.assertTrue(store.create_reservation("Kyatt Hotel",
+                                                     "Alex Fregoso", 30))
+        first.flush()
+        with self.assertRaises(ValueError):
+            second.flush()
+        self.assertFalse(second.is_dirty())
+        self.assertEqual(second.find_hotel("Kyatt Hotel")["rooms"], 20)
+        self.assertEqual(len(second.reservations), 1)
+        # Immediate stores save each booking in one guarded transaction
+        third = Store(backend=SqliteBackend(self.path),
+                      durability='immediate')
+        third.find_hotel("Kyatt Hotel")
+        first.create_reservation("Kyatt Hotel", "Alex Fregoso", 15)
+        first.flush()
+        with self.assertRaises(ValueError):
+            third.create_reservation("Kyatt Hotel", "Alex Fregoso", 10)
+        store = self._open()
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 5)
+        self.assertEqual(len(store.reservations), 2)
+
+    def test_edits_keep_rooms_booked_elsewhere(self):
+        """Test that saving a hotel does not write back stale rooms"""
+        first, second = self._open(), self._open()
+        first.find_hotel("Kyatt Hotel")
+        second.create_reservation("Kyatt Hotel", "Alex Fregoso", 5)
+        second.flush()
+        first.modify_hotel("Kyatt Hotel", new_address="1 Main St")
+        first.flush()
+        hotel = self._open().find_hotel("Kyatt Hotel")
+        self.assertEqual((hotel["address"], hotel["rooms"]),
+                         ("1 Main St", 45))
+
+    def test_lookups_do_not_load_everything(self):
+        """Test that single-name operations touch single rows"""
+        store = self._open()
+        store.modify_hotel("Kyatt Hotel", new_name="Kyatt Grand")
+        self.assertNotIn(HOTELS, store._collections)
+        store.flush()
+        store = self._open()
+        self.assertEqual([h["name"] for h in store.hotels],
+                         ["Hotel Harris", "Kyatt Grand"])
+        self.assertFalse(store.create_hotel("Hotel Harris", "Elsewhere", 1))
+
+    def test_streaming_releases_the_guard(self):
+        """Test that a paused reservation stream blocks no other thread"""
+        store = self._open()
+        store.create_reservation("Kyatt Hotel", "Alex Fregoso", 1)
+        store.flush()
+        rows = store.backend.iter_reservations("Kyatt Hotel")
+        next(rows)
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(
+            store.backend._guard.acquire(blocking=False)))
+        thread.start()
+        thread.join()
+        self.assertEqual(acquired, [True])
+        rows.close()
+
+    def test_migrate(self):
+        """Test importing the JSON files into a database"""
+        source = os.path.join(self.tmp.name, 'json')
+        os.mkdir(source)
+        with Store(source) as store:
+            store.create_hotel("Hotel Harris", "456 Frontier Drive", 10)
+            store.create_customer("Ruben Alvarez", "r@gmail.com", "000")
+            store.create_reservation("Hotel Harris", "Ruben Alvarez", 2)
+        target = os.path.join(self.tmp.name, 'migrated.db')
+        counts = migrate(source, target)
+        self.assertEqual(counts, {"hotels": 1, "customers": 1,
+                                  "reservations": 1})
+        store = Store(backend=SqliteBackend(target))
+        self.assertEqual(store.find_hotel("Hotel Harris")["rooms"], 8)
+        reservation = store.resolve_reservation(store.reservations[0])
+        self.assertEqual(reservation["customer"]["name"], "Ruben Alvarez")
+
+
+
+class TestJsonBackend(unittest.TestCase):
+    """Unit tests for validating the JsonBackend directly"""
+    def test_save_rooms(self):
+        """Test that rooms are taken only when every hotel has them"""
+        with tempfile.TemporaryDirectory() as directory:
+            backend = JsonBackend(directory)
+            backend.save(HOTELS, [{"name": "Kyatt Hotel",
+                                   "address": "786 Mountain View Rd",
+                                   "rooms": 5}])
+            backend.save_rooms({"Kyatt Hotel": 3})
+            self.assertEqual(backend.get(HOTELS, "Kyatt Hotel")["rooms"], 2)
+            with self.assertRaises(ValueError):
+                backend.save_rooms({"Kyatt Hotel": 3})
+            with self.assertRaises(ValueError):
+                backend.save_rooms({"Missing Hotel": 1})
+            backend.save_rooms({"Kyatt Hotel": -1})
+            self.assertEqual(backend.get(HOTELS, "Kyatt Hotel")["rooms"], 3)
+
+if __name__ == '__main__':
+    unittest.main()
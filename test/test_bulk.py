@@ -0,0 +1,116 @@
+'''
+This script contains all the unit test
+pertaining to the bulk import and export (bulk.py)
+'''
+import json
+import os
+import tempfile
+import unittest
+from src.bulk import export_records, import_records, main, parse
+from src.store import Store
+
+
+class TestBulk(unittest.TestCase):
+    """Unit tests for validating bulk imports and exports"""
+    def setUp(self):
+        """Creates a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        """Writes a file in the temporary directory, returning its path"""
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return path
+
+    def test_import_hotels_csv(self):
+        """Test importing hotels and rejecting the invalid rows"""
+        with Store(self.directory) as store:
+            store.create_hotel("Hotel Harris", "456 Frontier Drive", 10)
+        path = self._write('hotels.csv', (
+            'name,address,rooms\n'
+            'Kyatt Hotel,"786 Mountain View Rd,\nSuite 1",50\n'
+            'Kyatt Hotel,1 Main St,5\n'
+            'Hotel Harris,2 Main St,5\n'
+            'Hotel Sesa,3 Main St,-1\n'
+            'Hotel Lima,4 Main St\n'))
+        report = import_records('hotels', path, self.directory, workers=1)
+        self.assertEqual((report["read"], report["imported"]), (5, 1))
+        self.assertEqual(
+            [(entry["line"], entry["reason"]) for entry in report["rejected"]],
+            [(4, "duplicate name in file"), (5, "name already exists"),
+             (6, "rooms must be a non-negative integer"),
+             (7, "expected 3 fields, got 2")])
+        self.assertEqual(Store(self.directory).find_hotel("Kyatt Hotel"),
+                         {"name": "Kyatt Hotel", "rooms": 50,
+                          "address": "786 Mountain View Rd,\nSuite 1"})
+
+    def test_import_reservations_jsonl(self):
+        """Test booking reservations by customer name or id"""
+        with Store(self.directory) as store:
+            store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 3)
+            store.create_customer("Arian Reyes", "a@b.com", "000")
+            customer_id = store.customer_id("Arian Reyes")
+        rows = [
+            {"hotel_name": "Kyatt Hotel", "customer_name": "Arian Reyes",
+             "num_rooms": 2},
+            {"hotel_name": "Kyatt Hotel", "customer_id": customer_id,
+             "num_rooms": 2},
+            {"hotel_name": "Kyatt Hotel", "customer_id": "nobody",
+             "num_rooms": 1},
+            {"hotel_name": "Kyatt Hotel", "customer_name": "Arian Reyes",
+             "num_rooms": 1, "check_in": "2030-01-02",
+             "check_out": "2030-01-01"},
+            {"hotel_name": "Kyatt Hotel", "customer_name": "Arian Reyes",
+             "num_rooms": 1}]
+        path = self._write('bookings.jsonl', ''.join(
+            json.dumps(row) + '\n' for row in rows) + '{"broken\n')
+        report = import_records('reservations', path, self.directory,
+                                workers=2, batch_size=2)
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual([entry["line"] for entry in report["rejected"]],
+                         [2, 3, 4, 6])
+        self.assertEqual(report["rejected"][1]["reason"], "unknown customer")
+        self.assertEqual(
+            [r["num_rooms"] for r in Store(self.directory).reservations],
+            [2, 1])
+
+    def test_import_customers_without_ids(self):
+        """Test that rows without an id are each given one"""
+        path = self._write('customers.csv', (
+            'name,email,phone_number\n'
+            'Arian Reyes,a@b.com,000\n'
+            'Dana Cole,d@b.com,111\n'
+            'Eli Park,e@b.com,222\n'))
+        report = import_records('customers', path, self.directory,
+                                workers=1)
+        self.assertEqual((report["imported"], report["rejected"]), (3, []))
+        ids = [customer["id"] for customer in Store(self.directory).customers]
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_round_trip(self):
+        """Test exporting customers and importing them elsewhere"""
+        with Store(self.directory) as store:
+            for number in range(7):
+                store.create_customer(f"Customer {number}", "a@b.com",
+                                      f"{number:03}")
+            expected = store.customers
+        path = os.path.join(self.directory, 'customers.csv')
+        self.assertEqual(export_records('customers', path, self.directory,
+                                        workers=2, batch_size=3), 7)
+        other = os.path.join(self.directory, 'other')
+        os.mkdir(other)
+        self.assertEqual(main(['import', 'customers', path, '--directory',
+                               other, '--workers', '1']), 0)
+        self.assertEqual(Store(other).customers, expected)
+        valid, rejected = parse('customers', path)
+        self.assertEqual((len(valid), rejected), (7, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
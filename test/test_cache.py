@@ -0,0 +1,149 @@
+'''
+This script contains all the unit test
+pertaining to the FileCache class (cache.py) and the JSON backend
+reading through it
+'''
+import json
+import os
+import tempfile
+import unittest
+from src.backends import HOTELS, JsonBackend
+from src.cache import FileCache, parsed_size
+from src.store import Store
+
+
+class TestFileCache(unittest.TestCase):
+    """Unit tests for validating the read-through cache"""
+    def setUp(self):
+        """Creates a temporary directory with a file"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'data.json')
+        self._write('[1]')
+        self.loads = 0
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def _write(self, text):
+        """Replaces the file with text"""
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+    def _load(self):
+        """Parses the file, counting the calls"""
+        self.loads += 1
+        with open(self.path, encoding='utf-8') as file:
+            return json.load(file)
+
+    def test_revalidates_on_change(self):
+        """Test that a changed file is parsed again"""
+        cache = FileCache()
+        self.assertEqual(cache.get('key', (self.path,), self._load), [1])
+        self.assertEqual(cache.get('key', (self.path,), self._load), [1])
+        self.assertEqual(self.loads, 1)
+        self._write('[1, 2]')
+        self.assertEqual(cache.get('key', (self.path,), self._load), [1, 2])
+        self.assertEqual(self.loads, 2)
+        cache.invalidate(self.path)
+        cache.get('key', (self.path,), self._load)
+        self.assertEqual(self.loads, 3)
+        self.assertEqual(cache.info()["hits"], 1)
+
+    def test_caps(self):
+        """Test evicting the least recently used entries"""
+        cache = FileCache(max_entries=2, max_bytes=10)
+        for key in 'abc':
+            cache.get(key, (self.path,), self._load, cost=lambda value: 1)
+            cache.get('a', (self.path,), self._load, cost=lambda value: 1)
+        self.assertEqual(self.loads, 3)
+        self.assertEqual(len(cache), 2)
+        cache.get('b', (self.path,), self._load, cost=lambda value: 1)
+        self.assertEqual(self.loads, 4)
+        cache.get('big', (self.path,), self._load, cost=lambda value: 11)
+        self.assertEqual(cache.info()["bytes"], 2)
+        self.assertIsNone(cache.peek('big', (self.path,)))
+        self.assertEqual(cache.peek('b', (self.path,)), [1])
+        self.assertEqual(self.loads, 5)
+
+    def test_cost_is_parsed_size(self):
+        """Test that entries are measured in memory, not file bytes"""
+        cache = FileCache()
+        value = cache.get('key', (self.path,), self._load)
+        self.assertEqual(cache.info()["bytes"], parsed_size(value))
+        self.assertGreater(parsed_size(value), os.path.getsize(self.path))
+        record = {"name": "x"}
+        self.assertEqual(parsed_size([record, record]) -
+                         parsed_size([record]), 8)
+
+
+class TestCachedBackend(unittest.TestCase):
+    """Unit tests for validating reads through the JSON backend cache"""
+    def setUp(self):
+        """Creates a temporary directory with a hotel"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.cache = FileCache()
+        with Store(backend=self._backend()) as store:
+            store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 50)
+            store.create_customer("Arian Reyes", "a@b.com", "000")
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 2)
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def _backend(self):
+        """Returns a backend reading through the test cache"""
+        return JsonBackend(self.directory, cache=self.cache)
+
+    def test_repeated_reads_hit(self):
+        """Test that unchanged files are parsed once"""
+        for _ in range(3):
+            store = Store(backend=self._backend())
+            self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 48)
+            self.assertEqual(len(store.reservations), 1)
+        misses = self.cache.info()["misses"]
+        store = Store(backend=self._backend())
+        store.find_hotel("Kyatt Hotel")["rooms"] = 0
+        store.reservations[0]["num_rooms"] = 0
+        self.assertEqual(self.cache.info()["misses"], misses)
+        # Changes to the records handed out never reach the cache
+        store = Store(backend=self._backend())
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 48)
+        self.assertEqual(store.reservations[0]["num_rooms"], 2)
+
+    def test_streams_until_cached(self):
+        """Test that iterating builds no index unless one is cached"""
+        backend = self._backend()
+        self.cache.clear()
+        self.assertEqual(len(list(backend.iter_reservations())), 1)
+        self.assertEqual(len(self.cache), 0)
+        backend.load_index()
+        hits = self.cache.info()["hits"]
+        self.assertEqual(len(list(backend.iter_reservations(
+            "Kyatt Hotel"))), 1)
+        self.assertEqual(self.cache.info()["hits"], hits + 1)
+
+    def test_writes_are_seen(self):
+        """Test that this and other processes' writes are picked up"""
+        backend = self._backend()
+        self.assertEqual(len(backend.load(HOTELS)), 1)
+        with Store(backend=self._backend()) as store:
+            store.create_hotel("Hotel Harris", "456 Frontier Drive", 100)
+            store.modify_hotel("Kyatt Hotel", new_rooms=10)
+            store.cancel_reservation("Kyatt Hotel", "Arian Reyes")
+        self.assertEqual([(h["name"], h["rooms"])
+                          for h in backend.load(HOTELS)],
+                         [("Kyatt Hotel", 12), ("Hotel Harris", 100)])
+        self.assertEqual(list(backend.iter_reservations()), [])
+        # An edit made outside this process
+        with open(backend.path(HOTELS), 'w', encoding='utf-8') as file:
+            json.dump([{"name": "Hotel Sesa", "address": "", "rooms": 3}],
+                      file)
+        self.assertIsNone(backend.get(HOTELS, "Kyatt Hotel"))
+        self.assertEqual(backend.get(HOTELS, "Hotel Sesa")["rooms"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
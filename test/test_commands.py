@@ -0,0 +1,109 @@
+'''
+This script contains all the unit test
+pertaining to the command processor (commands.py)
+'''
+import io
+import json
+import os
+import tempfile
+import unittest
+from src.commands import apply_command, main, process
+from src.store import Store
+
+COMMANDS = [
+    {"op": "create_hotel", "name": "Kyatt Hotel",
+     "address": "786 Mountain View Rd", "rooms": 50, "id": "h1"},
+    {"op": "create_customer", "name": "Arian Reyes", "email": "a@b.com",
+     "phone_number": "000"},
+    {"op": "create_reservation", "hotel_name": "Kyatt Hotel",
+     "customer_name": "Arian Reyes", "num_rooms": 3},
+    {"op": "modify_customer", "name": "Arian Reyes",
+     "new_email": "arian@b.com"},
+    {"op": "create_hotel", "name": "Kyatt Hotel", "address": "",
+     "rooms": 1}]
+
+
+class TestCommands(unittest.TestCase):
+    """Unit tests for validating the command processor"""
+    def setUp(self):
+        """Creates a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_apply_command(self):
+        """Test results and errors of single commands"""
+        store = Store(self.directory)
+        self.assertEqual(apply_command(store, COMMANDS[0]),
+                         {"op": "create_hotel", "id": "h1", "ok": True,
+                          "result": True})
+        self.assertFalse(apply_command(store, COMMANDS[0])["ok"])
+        self.assertEqual(apply_command(store, {"op": "flush"})["error"],
+                         "unknown op 'flush'")
+        self.assertFalse(apply_command(store, {"op": "delete_hotel"})["ok"])
+        self.assertFalse(apply_command(store, [])["ok"])
+        self.assertFalse(apply_command(store, {
+            "op": "cancel_reservation", "hotel_name": "Kyatt Hotel",
+            "customer_name": None})["ok"])
+
+    def test_bad_rename_changes_nothing(self):
+        """Test that a command with a bad argument is not half applied"""
+        store = Store(self.directory)
+        apply_command(store, COMMANDS[0])
+        result = apply_command(store, {
+            "op": "modify_hotel", "name": "Kyatt Hotel",
+            "new_name": "Kyatt Grand", "new_rooms": "many"})
+        self.assertEqual(result, {"op": "modify_hotel", "ok": False,
+                                  "error": "new_rooms must be of type int"})
+        self.assertIsNone(store.find_hotel("Kyatt Grand"))
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 50)
+        self.assertFalse(apply_command(store, {
+            "op": "create_hotel", "name": "Hotel Sesa", "address": "1 St",
+            "rooms": True})["ok"])
+        self.assertTrue(apply_command(store, {
+            "op": "modify_hotel", "name": "Kyatt Hotel",
+            "new_name": None, "new_rooms": 40})["ok"])
+
+    def test_process_checkpoints(self):
+        """Test that results stream out and checkpoints reach the disk"""
+        lines = [json.dumps(command).encode() + b'\n'
+                 for command in COMMANDS] + [b'\n', b'{oops\n']
+        output = io.BytesIO()
+        with Store(self.directory) as store:
+            stats = process(store, iter(lines[:3]), output, checkpoint=2)
+            # The first two commands were checkpointed
+            self.assertEqual(Store(self.directory).find_customer(
+                "Arian Reyes")["email"], "a@b.com")
+            stats = process(store, iter(lines[3:]), output, checkpoint=0)
+        self.assertEqual((stats["commands"], stats["failed"],
+                          stats["checkpoints"]), (3, 2, 0))
+        results = [json.loads(line) for line in
+                   output.getvalue().splitlines()]
+        self.assertEqual([result["ok"] for result in results],
+                         [True, True, True, True, False, False])
+        self.assertEqual(results[-1], {"line": 4, "ok": False,
+                                       "error": "invalid JSON"})
+        store = Store(self.directory)
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 47)
+        self.assertEqual(store.find_customer("Arian Reyes")["email"],
+                         "arian@b.com")
+
+    def test_main(self):
+        """Test running the processor over a file"""
+        path = os.path.join(self.directory, 'commands.jsonl')
+        output = os.path.join(self.directory, 'results.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            for command in COMMANDS[:4]:
+                file.write(json.dumps(command) + '\n')
+        self.assertEqual(main([path, '--directory', self.directory,
+                               '--output', output]), 0)
+        with open(output, encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 4)
+        self.assertEqual(len(Store(self.directory).reservations), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
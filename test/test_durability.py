@@ -0,0 +1,94 @@
+'''
+This script contains all the unit test
+pertaining to the DurabilityPolicy class (durability.py)
+'''
+import json
+import os
+import tempfile
+import time
+import unittest
+from src.durability import (COALESCED, IMMEDIATE, MANUAL, DurabilityPolicy,
+                            atomic_write_json)
+from src.store import Store
+
+
+class TestDurabilityPolicy(unittest.TestCase):
+    """Unit tests for validating the durability modes"""
+    def setUp(self):
+        """Creates a temporary directory with one hotel"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.path = os.path.join(self.directory, 'hotels.json')
+        atomic_write_json(self.path, [{"name": "Kyatt Hotel",
+                                       "address": "786 Mountain View Rd",
+                                       "rooms": 50}])
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def _rooms(self):
+        """Reads the rooms of the hotel from disk"""
+        with open(self.path, 'r', encoding='utf-8') as file:
+            return json.load(file)[0]["rooms"]
+
+    def test_parse(self):
+        """Test building policies from settings"""
+        policy = DurabilityPolicy.parse("coalesced:50:100")
+        self.assertEqual((policy.mode, policy.interval_ms,
+                          policy.max_mutations), (COALESCED, 50, 100))
+        self.assertEqual(DurabilityPolicy.parse("coalesced::3").max_mutations,
+                         3)
+        self.assertTrue(DurabilityPolicy.parse(IMMEDIATE).fsync)
+        with self.assertRaises(ValueError):
+            DurabilityPolicy.parse("coalesced")
+        with self.assertRaises(ValueError):
+            DurabilityPolicy.parse("sometimes")
+
+    def test_failed_write_keeps_old_file(self):
+        """Test that an interrupted write leaves the previous file"""
+        with self.assertRaises(TypeError):
+            atomic_write_json(self.path, [{"rooms": object()}])
+        self.assertEqual(self._rooms(), 50)
+        self.assertEqual(os.listdir(self.directory), ['hotels.json'])
+
+    def test_immediate_flushes_every_mutation(self):
+        """Test that immediate mode writes before returning"""
+        store = Store(self.directory, durability=IMMEDIATE)
+        store.set_rooms("Kyatt Hotel", 10)
+        self.assertFalse(store.is_dirty())
+        self.assertEqual(self._rooms(), 10)
+
+    def test_coalesced_by_mutations(self):
+        """Test that coalesced mode flushes every M mutations"""
+        store = Store(self.directory,
+                      durability=DurabilityPolicy(COALESCED,
+                                                  max_mutations=3))
+        store.set_rooms("Kyatt Hotel", 1)
+        store.set_rooms("Kyatt Hotel", 2)
+        self.assertEqual(self._rooms(), 50)
+        store.set_rooms("Kyatt Hotel", 3)
+        self.assertEqual(self._rooms(), 3)
+
+    def test_coalesced_by_interval(self):
+        """Test that a lone change is flushed once the interval passes"""
+        store = Store(self.directory, durability="coalesced:20")
+        store.set_rooms("Kyatt Hotel", 7)
+        self.assertEqual(self._rooms(), 50)
+        deadline = time.monotonic() + 5
+        while store.is_dirty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self._rooms(), 7)
+
+    def test_manual_waits_for_flush(self):
+        """Test that manual mode only writes on flush"""
+        store = Store(self.directory, durability=MANUAL)
+        for rooms in range(5):
+            store.set_rooms("Kyatt Hotel", rooms)
+        self.assertEqual(self._rooms(), 50)
+        store.flush()
+        self.assertEqual(self._rooms(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+'''
+This script contains all the unit test
+pertaining to the ReservationIndex class (index.py)
+'''
+import unittest
+from src.index import ReservationIndex, legacy_customer_id, normalize
+
+ALEX = legacy_customer_id("Alex Fregoso")
+
+
+def _booking(hotel_name, customer_name, num_rooms):
+    """Builds a reservation dictionary for the tests"""
+    return {"hotel_name": hotel_name, "customer": {"name": customer_name},
+            "num_rooms": num_rooms}
+
+
+class TestReservationIndex(unittest.TestCase):
+    """Unit tests for validating methods of the ReservationIndex class"""
+    def setUp(self):
+        """Builds an index with four reservations"""
+        self.index = ReservationIndex([
+            _booking("Kyatt Hotel", "Alex Fregoso", 2),
+            _booking("Kyatt Hotel", "Carolyn Meyers", 1),
+            _booking("Hotel Harris", "Alex Fregoso", 2),
+            _booking("Kyatt Hotel", "Alex Fregoso", 3)
+        ])
+
+    def test_legacy_records_are_upgraded(self):
+        """Test that embedded customers are replaced by their id"""
+        self.assertTrue(self.index.upgraded)
+        self.assertEqual(self.index.records()[0],
+                         {"hotel_name": "Kyatt Hotel", "customer_id": ALEX,
+                          "num_rooms": 2})
+        self.assertFalse(ReservationIndex(self.index.records()).upgraded)
+
+    def test_find(self):
+        """Test lookups by pair, hotel and customer"""
+        self.assertEqual(len(list(self.index.find("Kyatt Hotel", ALEX))), 2)
+        self.assertEqual(len(list(self.index.find("Kyatt Hotel"))), 3)
+        self.assertEqual(len(list(self.index.find(customer_id=ALEX))), 3)
+        self.assertEqual(list(self.index.find("Nowhere")), [])
+
+    def test_cancel_pair(self):
+        """Test that cancelling a pair keeps the other indexes in sync"""
+        removed = self.index.cancel("Kyatt Hotel", ALEX)
+        self.assertEqual([r["num_rooms"] for r in removed], [2, 3])
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(len(list(self.index.find("Kyatt Hotel"))), 1)
+        self.assertEqual(len(list(self.index.find(customer_id=ALEX))), 1)
+
+    def test_cancel_hotel(self):
+        """Test cancelling every reservation of a hotel"""
+        self.assertEqual(len(self.index.cancel("Kyatt Hotel")), 3)
+        self.assertEqual(self.index.records(),
+                         [normalize(_booking("Hotel Harris",
+                                             "Alex Fregoso", 2))])
+        self.assertEqual(self.index.cancel("Kyatt Hotel"), [])
+
+    def test_extra_fields_round_trip(self):
+        """Test that fields outside the columns are kept per record"""
+        index = ReservationIndex([
+            {"hotel_name": "Kyatt Hotel", "customer_id": "c1",
+             "num_rooms": "2", "note": "late"}])
+        self.assertEqual(index.records(), [
+            {"hotel_name": "Kyatt Hotel", "customer_id": "c1",
+             "num_rooms": "2", "note": "late"}])
+
+    def test_compaction_keeps_lookups(self):
+        """Test that dropping cancelled rows keeps every index correct"""
+        index = ReservationIndex(
+            {"hotel_name": f"Hotel {i % 3}", "customer_id": f"c{i % 7}",
+             "num_rooms": i} for i in range(3000))
+        index.cancel(customer_id="c1")
+        index.cancel("Hotel 0")
+        index.cancel("Hotel 1")
+        self.assertLess(len(index._alive), 3000)
+        expected = [i for i in range(3000) if i % 3 == 2 and i % 7 != 1]
+        self.assertEqual([r["num_rooms"] for r in index.records()],
+                         expected)
+        self.assertEqual([r["num_rooms"] for r in index.find("Hotel 2",
+                                                             "c2")],
+                         [i for i in expected if i % 7 == 2])
+        self.assertEqual(list(index.find("Hotel 0")), [])
+        self.assertEqual(list(index.find(customer_id="c1")), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
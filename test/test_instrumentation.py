@@ -0,0 +1,101 @@
+'''
+This script contains all the unit test
+pertaining to the instrumentation layer (instrumentation.py)
+'''
+import logging
+import subprocess
+import sys
+import tempfile
+import unittest
+from src import instrumentation
+from src.instrumentation import Reporter, instrumented
+from src.store import Store
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Unit tests for validating the counters and the stats API"""
+    def setUp(self):
+        """Starts every test with empty, enabled counters"""
+        self.tmp = tempfile.TemporaryDirectory()
+        instrumentation.reset()
+        instrumentation.enable()
+
+    def tearDown(self):
+        """Turns instrumentation back off"""
+        instrumentation.disable()
+        instrumentation.reset()
+        self.tmp.cleanup()
+
+    def test_disabled_records_nothing(self):
+        """Test that calls are not counted while disabled"""
+        instrumentation.disable()
+        with Store(self.tmp.name) as store:
+            store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 50)
+        self.assertEqual(instrumentation.stats(), {})
+
+    def test_calls_and_latency(self):
+        """Test that an instrumented function is counted and timed"""
+        @instrumented('test.double')
+        def double(value):
+            return value * 2
+
+        for value in range(10):
+            self.assertEqual(double(value), value * 2)
+        metric = instrumentation.stats()['test.double']
+        self.assertEqual(metric["calls"], 10)
+        self.assertEqual(sum(metric["histogram_us"].values()), 10)
+        self.assertLessEqual(metric["p50_ms"], metric["p99_ms"])
+
+    def test_failed_calls_are_counted(self):
+        """Test that a call raising an exception is still timed"""
+        @instrumented('test.fail')
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(instrumentation.stats()['test.fail']["calls"], 1)
+
+    def test_bytes_and_scans(self):
+        """Test the I/O and scan counters of a save and reload"""
+        with Store(self.tmp.name) as store:
+            store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 50)
+            store.create_customer("Cristiano Ronaldo", "cr7@gmail.com",
+                                  "555-555-5555")
+            store.create_reservation("Kyatt Hotel", "Cristiano Ronaldo", 2)
+        with Store(self.tmp.name) as store:
+            self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 48)
+            store.cancel_reservation("Kyatt Hotel", "Cristiano Ronaldo")
+        stats = instrumentation.stats()
+        self.assertGreater(stats['json.save']["bytes_written"], 0)
+        self.assertGreater(stats['json.load']["bytes_read"], 0)
+        self.assertGreater(stats['journal.append']["bytes_written"], 0)
+        self.assertGreaterEqual(stats['index.lookup']["lookups"], 1)
+        self.assertEqual(stats['store.create_reservation']["calls"], 1)
+
+    def test_reset(self):
+        """Test that reset() clears every counter"""
+        instrumentation.record('test.reset', 1000)
+        instrumentation.reset()
+        self.assertEqual(instrumentation.stats(), {})
+
+    def test_reporter_logs(self):
+        """Test that the reporter logs one line per name"""
+        instrumentation.record('test.report', 1000)
+        logger = logging.getLogger('test.instrumentation')
+        with self.assertLogs(logger, level='INFO') as logs:
+            Reporter(interval=60, logger=logger).report()
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('test.report', logs.output[0])
+
+    def test_import_leaves_logging_alone(self):
+        """Test that importing the models configures no log handler"""
+        code = ('import logging, src.reservation, src.hotel, '
+                'src.customer; print(len(logging.getLogger().handlers))')
+        output = subprocess.run([sys.executable, '-c', code], check=True,
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+'''
+This script contains all the unit test
+pertaining to the SegmentTree class (inventory.py)
+'''
+import random
+import unittest
+from datetime import date
+from src.inventory import SegmentTree, iso, night
+
+
+class TestSegmentTree(unittest.TestCase):
+    """Unit tests for validating methods of the SegmentTree class"""
+    def test_matches_brute_force(self):
+        """Test range add and range max against a plain list"""
+        rng = random.Random(7)
+        tree = SegmentTree(64)
+        values = [0] * 64
+        bookings = []
+        for _ in range(500):
+            if bookings and rng.random() < 0.4:
+                # Cancel an earlier booking
+                start, end, value = bookings.pop(
+                    rng.randrange(len(bookings)))
+                value = -value
+            else:
+                start = rng.randrange(64)
+                end = rng.randrange(start, 65)
+                value = rng.randrange(1, 6)
+                bookings.append((start, end, value))
+            tree.add(start, end, value)
+            for position in range(start, end):
+                values[position] += value
+            start = rng.randrange(64)
+            end = rng.randrange(start + 1, 65)
+            self.assertEqual(tree.max(start, end), max(values[start:end]))
+
+    def test_empty_range(self):
+        """Test that an empty range adds nothing and has no maximum"""
+        tree = SegmentTree()
+        tree.add(10, 10, 5)
+        self.assertEqual(tree.max(0, 100), 0)
+        self.assertEqual(tree.max(5, 5), 0)
+
+    def test_nights(self):
+        """Test converting dates and ISO strings to ordinals"""
+        self.assertEqual(night("2024-03-01"), date(2024, 3, 1).toordinal())
+        self.assertEqual(iso(night(date(2024, 3, 1))), "2024-03-01")
+        with self.assertRaises(ValueError):
+            night(20240301)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+'''
+This script contains all the unit test
+pertaining to the ReservationJournal class (journal.py)
+'''
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import unittest
+from src.index import legacy_customer_id, normalize
+from src.journal import ReservationJournal, cancel_event, create_event
+from src.reservation import Reservation
+from src.store import Store
+
+
+def _booking(hotel_name, customer_name, num_rooms):
+    """Builds a reservation dictionary for the tests"""
+    return {"hotel_name": hotel_name,
+            "customer": {"name": customer_name, "email": "a@b.com",
+                         "phone_number": "000"},
+            "num_rooms": num_rooms}
+
+
+def _load_repeatedly(snapshot, times):
+    """Replays a journal over and over, as another process would"""
+    journal = ReservationJournal(snapshot, compact_bytes=None)
+    for _ in range(times):
+        journal.load_index()
+
+
+class TestReservationJournal(unittest.TestCase):
+    """Unit tests for validating methods of the ReservationJournal class"""
+    def setUp(self):
+        """Creates a journal inside a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.tmp.name, 'reservations.json')
+        with open(self.snapshot, 'w', encoding='utf-8') as file:
+            json.dump([_booking("Kyatt Hotel", "Alex Fregoso", 2)], file)
+        self.journal = ReservationJournal(self.snapshot, compact_bytes=None)
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_append_is_one_line_per_event(self):
+        """Test that events are appended without touching the snapshot"""
+        before = os.path.getmtime(self.snapshot)
+        self.journal.append([
+            create_event(_booking("Hotel Harris", "Ruben Alvarez", 1)),
+            cancel_event("Kyatt Hotel", legacy_customer_id("Alex Fregoso"))])
+        with open(self.journal.log_path, 'r', encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 2)
+        self.assertEqual(os.path.getmtime(self.snapshot), before)
+        self.assertEqual(self.journal.load(), [
+            normalize(_booking("Hotel Harris", "Ruben Alvarez", 1))])
+
+    def test_old_cancel_events_replay(self):
+        """Test that cancel events naming the customer still apply"""
+        self.journal.append([{"op": "cancel", "hotel_name": None,
+                              "customer_name": "Alex Fregoso"}])
+        self.assertEqual(self.journal.load(), [])
+        self.assertEqual(list(self.journal.iter_reservations()), [])
+
+    def test_compact_folds_log(self):
+        """Test that compaction leaves an equivalent snapshot only"""
+        self.journal.append([
+            create_event(_booking("Hotel Harris", "Ruben Alvarez", 1))])
+        expected = self.journal.load()
+        self.journal.compact()
+        self.assertFalse(os.path.exists(self.journal.log_path))
+        with open(self.snapshot, 'r', encoding='utf-8') as file:
+            self.assertEqual(json.load(file), expected)
+
+    def test_background_compaction(self):
+        """Test that a large log is compacted in the background"""
+        self.journal.compact_bytes = 1
+        self.journal.append([
+            create_event(_booking("Hotel Harris", "Ruben Alvarez", 1))])
+        self.journal.wait()
+        self.assertEqual(self.journal.log_size(), 0)
+        self.assertEqual(len(self.journal.load()), 2)
+
+    def test_compaction_is_exclusive(self):
+        """Test that a running compaction is neither redone nor undone"""
+        self.journal.append([
+            create_event(_booking("Hotel Harris", "Ruben Alvarez", 1))])
+        folding, resume = threading.Event(), threading.Event()
+        read_log = self.journal._read_log
+
+        def paused(path):
+            folding.set()
+            resume.wait(5)
+            return read_log(path)
+        self.journal._read_log = paused
+        compactor = threading.Thread(target=self.journal.compact)
+        compactor.start()
+        self.assertTrue(folding.wait(5))
+        other = ReservationJournal(self.snapshot, compact_bytes=None)
+        other.append([cancel_event("Kyatt Hotel")])
+        other.compact()
+        self.assertEqual(len(other.load()), 1)
+        resume.set()
+        compactor.join()
+        self.assertEqual(other.load(), [
+            normalize(_booking("Hotel Harris", "Ruben Alvarez", 1))])
+
+    def test_compaction_beside_another_process(self):
+        """Test that another process replaying loses no compaction"""
+        reader = multiprocessing.Process(target=_load_repeatedly,
+                                         args=(self.snapshot, 200))
+        reader.start()
+        for number in range(50):
+            self.journal.append([create_event(
+                _booking("Hotel Harris", f"Customer {number}", 1))])
+            self.journal.compact()
+        reader.join()
+        self.assertEqual(reader.exitcode, 0)
+        self.assertEqual(len(self.journal.load()), 51)
+
+    def test_torn_line_is_skipped(self):
+        """Test that a partially written last line is ignored"""
+        self.journal.append([cancel_event("Kyatt Hotel")])
+        with open(self.journal.log_path, 'a', encoding='utf-8') as file:
+            file.write('{"op": "cre')
+        self.assertEqual(self.journal.load(), [])
+
+    def test_interrupted_compaction_recovers(self):
+        """Test that a staged snapshot is used once the log is gone"""
+        with open(self.snapshot + '.new', 'w', encoding='utf-8') as file:
+            json.dump([], file)
+        self.assertEqual(self.journal.load(), [])
+
+    def test_iter_reservations_matches_load(self):
+        """Test that streaming gives the replayed reservations"""
+        ruben = legacy_customer_id("Ruben Alvarez")
+        self.journal.append([
+            create_event(_booking("Hotel Harris", "Ruben Alvarez", 1)),
+            create_event(_booking("Kyatt Hotel", "Ruben Alvarez", 4)),
+            cancel_event("Hotel Harris", ruben),
+            create_event(_booking("Hotel Harris", "Ruben Alvarez", 2)),
+            cancel_event(None, legacy_customer_id("Alex Fregoso"))])
+        self.assertEqual(list(self.journal.iter_reservations()),
+                         self.journal.load())
+        self.assertEqual(
+            [r["num_rooms"] for r in self.journal.iter_reservations(
+                hotel_name="Hotel Harris")], [2])
+        self.assertEqual(
+            [r["num_rooms"] for r in self.journal.iter_reservations(
+                customer_id=ruben)], [4, 2])
+
+    def test_load_reservations_shape(self):
+        """Test that load_reservations replays snapshot and log"""
+        with open(os.path.join(self.tmp.name, 'customers.json'), 'w',
+                  encoding='utf-8') as file:
+            json.dump([_booking("", name, 0)["customer"]
+                       for name in ("Alex Fregoso", "Ruben Alvarez")], file)
+        with Store(self.tmp.name):
+            Reservation._save_reservation(Reservation(
+                "Hotel Harris", _Customer("Ruben Alvarez"), 1))
+        with Store(self.tmp.name):
+            reservations = Reservation.load_reservations()
+        self.assertEqual([r['customer']['name'] for r in reservations],
+                         ["Alex Fregoso", "Ruben Alvarez"])
+
+
+class _Customer:
+    """Minimal customer stand-in used to build a Reservation"""
+    def __init__(self, name):
+        """Stores the customer name"""
+        self.name = name
+
+    def to_dict(self):
+        """Returns the customer as a dictionary"""
+        return {"name": self.name}
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+'''
+This script contains all the unit test
+pertaining to the locking helpers (locking.py)
+'''
+import os
+import tempfile
+import threading
+import unittest
+from src.locking import FileLock, KeyedLocks, directory_lock
+from src.store import Store
+
+
+class TestLocking(unittest.TestCase):
+    """Unit tests for validating FileLock, KeyedLocks and the Store"""
+    def setUp(self):
+        """Creates a temporary data directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_file_lock_is_reentrant(self):
+        """Test that one thread can nest the same file lock"""
+        lock = FileLock(os.path.join(self.directory, 'test.lock'))
+        with lock:
+            with lock:
+                pass
+        self.assertIs(directory_lock(self.directory),
+                      directory_lock(self.directory))
+
+    def test_file_lock_excludes_other_threads(self):
+        """Test that another thread waits for the file lock"""
+        lock = directory_lock(self.directory)
+        acquired = threading.Event()
+        refused = []
+
+        def other():
+            refused.append(not lock.acquire(blocking=False))
+            with lock:
+                acquired.set()
+
+        with lock:
+            thread = threading.Thread(target=other)
+            thread.start()
+            self.assertFalse(acquired.wait(0.1))
+        thread.join()
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(refused, [True])
+
+    def test_keyed_locks(self):
+        """Test that the same key returns the same lock"""
+        locks = KeyedLocks()
+        self.assertIs(locks.get("Kyatt Hotel"), locks.get("Kyatt Hotel"))
+        self.assertIsNot(locks.get("Kyatt Hotel"), locks.get("Harris"))
+        with locks.holding(["b", "a", "b"]):
+            pass
+
+    def test_threads_do_not_overbook(self):
+        """Test that concurrent bookings accept exactly the inventory"""
+        store = Store(self.directory)
+        store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 50)
+        store.create_customer("Alex Fregoso", "afreg@gmail.com", "000")
+        results = []
+
+        def book():
+            for _ in range(20):
+                results.append(store.create_reservation(
+                    "Kyatt Hotel", "Alex Fregoso", 1))
+
+        threads = [threading.Thread(target=book) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 50)
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 0)
+        self.assertEqual(len(store.reservations), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
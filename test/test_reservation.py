@@ -2,9 +2,11 @@
 This script contains all the unit test
 pertaining to the Reservation class (reservation.py)
 '''
+import threading
 import unittest
 from src.customer import Customer
 from src.hotel import Hotel
+from src.locking import directory_lock
 from src.reservation import Reservation
 
 
@@ -85,6 +87,21 @@ class TestReservationMethods(unittest.TestCase):
                                                 "Ruben Alvarez", 200)
         self.assertFalse(result)
 
+    def test_iteration_releases_lock(self):
+        """Test that a paused iteration does not hold the file lock."""
+        reservations = Reservation.iter_hotel_reservations("Kyatt Hotel")
+        self.assertEqual(next(reservations)["hotel_name"], "Kyatt Hotel")
+        locked = []
+
+        def writer():
+            with directory_lock('.'):
+                locked.append(True)
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join(5)
+        self.assertEqual(locked, [True])
+        reservations.close()
+
     def test_modify_reservation(self):
         """Test modifying an existing reservation."""
         # Cancel previous reservation
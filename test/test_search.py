@@ -0,0 +1,77 @@
+'''
+This script contains all the unit test
+pertaining to the HotelSearchIndex class (search.py)
+'''
+import random
+import unittest
+from src.search import HotelSearchIndex
+
+
+def _pages(index, num_rooms, address_prefix=None, limit=3):
+    """Follows the cursors and returns every page of names"""
+    pages = []
+    after = None
+    while True:
+        names, after = index.search(num_rooms, address_prefix, limit, after)
+        pages.append(names)
+        if after is None:
+            return pages
+
+
+class TestHotelSearchIndex(unittest.TestCase):
+    """Unit tests for validating methods of the HotelSearchIndex class"""
+    def setUp(self):
+        """Builds an index over random hotels"""
+        rng = random.Random(3)
+        streets = ["Main St", "Mountain View Rd", "Frontier Drive"]
+        self.hotels = {f"Hotel {i}": {
+            "name": f"Hotel {i}",
+            "address": f"{rng.randrange(100)} {rng.choice(streets)}",
+            "rooms": rng.randrange(50)} for i in range(60)}
+        self.index = HotelSearchIndex(self.hotels.values())
+
+    def _expected(self, num_rooms, address_prefix=None):
+        """Returns the matching names by a full scan"""
+        return [h["name"] for h in sorted(
+            self.hotels.values(), key=lambda h: (-h["rooms"], h["name"]))
+                if h["rooms"] >= num_rooms and
+                h["address"].lower().startswith(address_prefix or "")]
+
+    def test_pages_match_scan(self):
+        """Test paging by capacity with and without a prefix"""
+        for num_rooms, prefix in ((0, None), (30, None), (10, "1"),
+                                  (45, "1"), (0, "9 m"), (100, None)):
+            pages = _pages(self.index, num_rooms, prefix)
+            self.assertTrue(all(len(page) <= 3 for page in pages))
+            self.assertEqual(sum(pages, []),
+                             self._expected(num_rooms, prefix))
+
+    def test_update_and_remove(self):
+        """Test that changed and removed hotels move in the index"""
+        self.hotels["Hotel 0"]["rooms"] = 99
+        self.index.update("Hotel 0", self.hotels["Hotel 0"])
+        del self.hotels["Hotel 1"]
+        self.index.update("Hotel 1", None)
+        self.assertEqual(len(self.index), 59)
+        self.assertEqual(self.index.search(0, limit=1)[0], ["Hotel 0"])
+        self.assertEqual(sum(_pages(self.index, 20), []),
+                         self._expected(20))
+
+    def test_accept_filters_pages(self):
+        """Test that rejected hotels are skipped across pages"""
+        odd = [name for name in self._expected(10)
+               if int(name.split()[1]) % 2]
+        pages = []
+        after = None
+        while True:
+            names, after = self.index.search(
+                10, limit=3, after=after,
+                accept=lambda name: int(name.split()[1]) % 2)
+            pages.append(names)
+            if after is None:
+                break
+        self.assertEqual(sum(pages, []), odd)
+
+
+if __name__ == '__main__':
+    unittest.main()
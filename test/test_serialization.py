@@ -0,0 +1,145 @@
+'''
+This script contains all the unit test
+pertaining to the serialization layer (serialization.py)
+'''
+import io
+import json
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+from src import serialization
+from src.backends import HOTELS, JsonBackend
+from src.journal import ReservationJournal, create_event
+from src.serialization import (BINARY, JSON, MAGIC, detect, dumps,
+                               iter_json_array, iter_records, loads)
+from src.store import Store
+
+
+def _records(count):
+    """Builds count reservation-shaped records"""
+    return [{"hotel_name": f"Hotel {i % 7}", "customer_id": f"{i:032x}",
+             "num_rooms": i % 5 + 1, "check_in": None if i % 2 else
+             "2030-01-02", "note": "ünïcode"} for i in range(count)]
+
+
+class TestSerialization(unittest.TestCase):
+    """Unit tests for validating both formats and their detection"""
+    def setUp(self):
+        """Creates a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """Test that every format reads back what it wrote"""
+        # More than one binary block
+        records = _records(serialization.BLOCK_RECORDS * 2 + 3)
+        for fmt in (JSON, BINARY):
+            data = dumps(records, fmt)
+            self.assertEqual(detect(data), fmt)
+            self.assertEqual(loads(data), records)
+            self.assertEqual(list(iter_records(io.BytesIO(data), 100)),
+                             records)
+        self.assertEqual(loads(dumps([], BINARY)), [])
+
+    def test_json_is_compact(self):
+        """Test that JSON is written without indentation"""
+        data = dumps(_records(3))
+        self.assertNotIn(b'\n', data)
+        self.assertNotIn(b', ', data)
+
+    def test_without_accelerator(self):
+        """Test that JSON falls back to the json module"""
+        records = _records(10)
+        with mock.patch.object(serialization, 'orjson', None):
+            self.assertFalse(serialization.accelerated())
+            data = dumps(records)
+            self.assertEqual(loads(data), records)
+        self.assertEqual(loads(data), records)
+
+    def test_reads_pretty_json(self):
+        """Test that files written before compaction still load"""
+        records = _records(20)
+        data = json.dumps(records, indent=4).encode('utf-8')
+        self.assertEqual(loads(data), records)
+        self.assertEqual(list(iter_records(io.BytesIO(data), 7)), records)
+
+    def test_corrupt_data(self):
+        """Test that damaged files raise ValueError"""
+        data = dumps(_records(10), BINARY)
+        for damaged in (data[:-3], data[:5], MAGIC + b'\x09\x04',
+                        b'{"a": 1}', b'[{"a": 1}'):
+            with self.assertRaises(ValueError):
+                loads(damaged)
+        with self.assertRaises(ValueError):
+            list(iter_records(io.BytesIO(data[:-3])))
+        # Well-formed JSON that is not a list of runs
+        header = data[:len(MAGIC) + 2]
+        for block in (b'{"a": 1}', b'[[["a"], 3]]', b'[1]'):
+            with self.assertRaises(ValueError):
+                loads(header + struct.pack('<I', len(block)) + block)
+
+    def test_binary_layout(self):
+        """Test that records sharing keys are written as one run"""
+        records = [{"a": 1, "b": None}, {"a": 2, "b": "x"}, {"b": 3}, 7]
+        data = dumps(records, BINARY)
+        self.assertEqual(data[:len(MAGIC) + 2], MAGIC + bytes((2, 1)))
+        (length,) = struct.unpack_from('<I', data, len(MAGIC) + 2)
+        self.assertEqual(json.loads(data[len(MAGIC) + 6:]),
+                         [[["a", "b"], [[1, None], [2, "x"]]],
+                          [["b"], [[3]]], [None, [7]]])
+        self.assertEqual(length, len(data) - len(MAGIC) - 6)
+        self.assertEqual(loads(data), records)
+
+    def test_unknown_format(self):
+        """Test that unknown formats are rejected"""
+        with self.assertRaises(ValueError):
+            dumps([], 'yaml')
+        with self.assertRaises(ValueError):
+            JsonBackend(self.directory, fmt='yaml')
+
+    def test_iter_json_array_small_chunks(self):
+        """Test that items split across chunks are decoded"""
+        data = _records(50)
+        text = json.dumps(data, indent=4)
+        self.assertEqual(list(iter_json_array(io.StringIO(text), 7)), data)
+        self.assertEqual(list(iter_json_array(io.StringIO(''))), [])
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"a": 1}, {'), 4))
+
+    def test_backend_switches_format(self):
+        """Test that a store reads JSON and rewrites it in binary"""
+        with Store(self.directory) as store:
+            store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 50)
+        path = os.path.join(self.directory, 'hotels.json')
+        with Store(backend=JsonBackend(self.directory, BINARY)) as store:
+            self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 50)
+            store.set_rooms("Kyatt Hotel", 40)
+        with open(path, 'rb') as file:
+            self.assertEqual(detect(file.read()), BINARY)
+        self.assertEqual(JsonBackend(self.directory).load(HOTELS)[0]["rooms"],
+                         40)
+
+    def test_binary_journal(self):
+        """Test that binary snapshots are replayed and streamed"""
+        snapshot = os.path.join(self.directory, 'reservations.json')
+        journal = ReservationJournal(snapshot, compact_bytes=None,
+                                     fmt=BINARY)
+        records = [{"hotel_name": "Kyatt Hotel", "customer_id": f"{i:032x}",
+                    "num_rooms": 1} for i in range(5)]
+        journal.rewrite(records[:3])
+        journal.append([create_event(r) for r in records[3:]])
+        journal.compact()
+        with open(snapshot, 'rb') as file:
+            self.assertTrue(file.read().startswith(MAGIC))
+        self.assertEqual(journal.load(), records)
+        self.assertEqual(list(journal.iter_reservations()), records)
+
+
+if __name__ == '__main__':
+    unittest.main()
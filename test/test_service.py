@@ -0,0 +1,134 @@
+'''
+This script contains all the unit test
+pertaining to the AsyncReservationService class (service.py)
+'''
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.service import AsyncReservationService
+from src.store import Store
+
+
+class TestAsyncReservationService(unittest.TestCase):
+    """Unit tests for validating methods of the AsyncReservationService"""
+    def setUp(self):
+        """Creates a temporary directory with one hotel"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        with Store(self.directory) as store:
+            store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 50)
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_bookings_are_group_committed(self):
+        """Test that concurrent bookings share a few flushes"""
+        store = Store(self.directory)
+        flushes = []
+        flush = store.flush
+        store.flush = lambda: flushes.append(1) or flush()
+
+        async def run():
+            async with AsyncReservationService(store, window=0.05) as service:
+                await service.create_customer("Alex Fregoso", "a@b.com", "0")
+                results = await asyncio.gather(*(
+                    service.create_reservation("Kyatt Hotel",
+                                               "Alex Fregoso", 1)
+                    for _ in range(60)))
+                hotel = await service.find_hotel("Kyatt Hotel")
+            return results, hotel
+
+        results, hotel = asyncio.run(run())
+        self.assertEqual(results.count(True), 50)
+        self.assertEqual(hotel["rooms"], 0)
+        self.assertLess(len(flushes), 5)
+        path = os.path.join(self.directory, 'hotels.json')
+        with open(path, 'r', encoding='utf-8') as file:
+            self.assertEqual(json.load(file)[0]["rooms"], 0)
+        self.assertEqual(len(Store(self.directory).reservations), 50)
+
+    def test_errors_reach_their_caller_only(self):
+        """Test that a failing write does not fail its group"""
+        async def run():
+            async with AsyncReservationService(
+                    directory=self.directory) as service:
+                return await asyncio.gather(
+                    service.create_hotel("Hotel Harris", "456 Frontier", 9),
+                    service.cancel_reservation(None, None),
+                    return_exceptions=True)
+
+        created, error = asyncio.run(run())
+        self.assertTrue(created)
+        self.assertIsInstance(error, ValueError)
+        self.assertIsNotNone(Store(self.directory).find_hotel("Hotel Harris"))
+
+    def test_services_share_the_last_room(self):
+        """Test that two services over one directory book it once"""
+        with Store(self.directory) as store:
+            store.create_hotel("Hotel Sesa", "1 Main St", 1)
+            store.create_customer("Alex Fregoso", "a@b.com", "0")
+
+        async def run():
+            first = AsyncReservationService(directory=self.directory)
+            second = AsyncReservationService(directory=self.directory)
+            # Both read the hotel before either books it
+            for service in (first, second):
+                await service.find_hotel("Hotel Sesa")
+            async with first, second:
+                return await asyncio.gather(*(
+                    service.create_reservation("Hotel Sesa",
+                                               "Alex Fregoso", 1)
+                    for service in (first, second)))
+
+        self.assertEqual(sorted(asyncio.run(run())), [False, True])
+        store = Store(self.directory)
+        self.assertEqual(store.find_hotel("Hotel Sesa")["rooms"], 0)
+        self.assertEqual(len(list(store.iter_reservations("Hotel Sesa"))),
+                         1)
+
+    def test_group_is_fsynced_once(self):
+        """Test that a group costs one flush whatever the policy"""
+        for durability in ('manual', 'immediate'):
+            store = Store(self.directory, durability=durability)
+            store.create_customer("Alex Fregoso", "a@b.com", "0")
+            store.flush()
+
+            async def run(service):
+                async with service:
+                    return await asyncio.gather(*(
+                        service.create_reservation("Kyatt Hotel",
+                                                   "Alex Fregoso", 1)
+                        for _ in range(20)))
+
+            with mock.patch('os.fsync') as fsync:
+                results = asyncio.run(run(
+                    AsyncReservationService(store, window=0.05)))
+            self.assertEqual(results, [True] * 20)
+            # One fsync per file the group wrote, however many bookings
+            self.assertTrue(0 < fsync.call_count <= 6, durability)
+
+    def test_failed_commit_drops_its_writes(self):
+        """Test that a group whose flush fails leaves no change behind"""
+        store = Store(self.directory)
+
+        async def run():
+            async with AsyncReservationService(store) as service:
+                with mock.patch.object(store.backend, 'save',
+                                       side_effect=OSError("disk full")):
+                    failed = await asyncio.gather(
+                        service.create_hotel("Hotel Harris", "456 St", 9),
+                        return_exceptions=True)
+                return failed, await service.find_hotel("Hotel Harris")
+
+        failed, hotel = asyncio.run(run())
+        self.assertIsInstance(failed[0], OSError)
+        self.assertIsNone(hotel)
+        self.assertIsNone(Store(self.directory).find_hotel("Hotel Harris"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+'''
+This script contains all the unit test
+pertaining to the ShardedJournal class (shards.py) and resharding
+(reshard.py)
+'''
+import os
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from src.backends import JsonBackend
+from src.journal import cancel_event, create_event
+from src.reshard import reshard
+from src.shards import (SHARD_DIRECTORY, ShardedJournal, read_manifest,
+                        shard_of)
+from src.store import Store, hotel_session
+
+HOTELS = [f"Hotel {i}" for i in range(12)]
+
+
+def _booking(hotel_name, customer_id, num_rooms=1):
+    """Builds a reservation dictionary for the tests"""
+    return {"hotel_name": hotel_name, "customer_id": customer_id,
+            "num_rooms": num_rooms}
+
+
+class TestShardedJournal(unittest.TestCase):
+    """Unit tests for validating the sharded reservation storage"""
+    def setUp(self):
+        """Creates a temporary directory and a four-shard journal"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.journal = ShardedJournal(self.directory, 4, compact_bytes=None)
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def _log_sizes(self):
+        """Returns the log size of every shard"""
+        return [shard.log_size() for shard in self.journal.shards]
+
+    def test_events_touch_one_shard(self):
+        """Test that a booking and its cancellation stay in one shard"""
+        os.makedirs(os.path.join(self.directory, SHARD_DIRECTORY))
+        self.journal.append([create_event(_booking("Hotel 1", "a"))])
+        self.journal.append([cancel_event("Hotel 1", "a")])
+        touched = [size > 0 for size in self._log_sizes()]
+        self.assertEqual(touched.count(True), 1)
+        self.assertIs(self.journal.shards[touched.index(True)],
+                      self.journal.shard("Hotel 1"))
+        self.assertEqual(self.journal.load(), [])
+
+    def test_customer_cancel_reaches_every_shard(self):
+        """Test that a cancel without a hotel applies to every shard"""
+        self.journal.rewrite([_booking(hotel, "a") for hotel in HOTELS] +
+                             [_booking(hotel, "b") for hotel in HOTELS])
+        self.journal.append([cancel_event(None, "a"),
+                             create_event(_booking("Hotel 3", "a", 7))])
+        self.assertEqual(
+            [(r["hotel_name"], r["num_rooms"])
+             for r in self.journal.iter_reservations(customer_id="a")],
+            [("Hotel 3", 7)])
+        self.assertEqual(len(self.journal.load_index()), len(HOTELS) + 1)
+
+    def test_hotel_order_is_kept(self):
+        """Test that a hotel's reservations keep their booking order"""
+        self.journal.rewrite([_booking("Hotel 2", "a", n) for n in (3, 1)])
+        self.journal.append([create_event(_booking("Hotel 2", "b", 2))])
+        self.assertEqual([r["num_rooms"] for r in
+                          self.journal.iter_reservations("Hotel 2")],
+                         [3, 1, 2])
+        self.assertEqual(sum(self.journal.sizes()), 3)
+
+    def test_parallel_appends(self):
+        """Test that threads booking different hotels lose nothing"""
+        self.journal.rewrite([])
+
+        def book(hotel_name):
+            for number in range(50):
+                self.journal.append([create_event(
+                    _booking(hotel_name, f"c{number}"))])
+
+        threads = [threading.Thread(target=book, args=(hotel,))
+                   for hotel in HOTELS]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.journal.compact()
+        self.assertEqual(
+            Counter(r["hotel_name"] for r in self.journal.load()),
+            {hotel: 50 for hotel in HOTELS})
+
+
+class TestReshard(unittest.TestCase):
+    """Unit tests for validating the reshard tool"""
+    def setUp(self):
+        """Creates a temporary directory with hotels and bookings"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        with Store(self.directory) as store:
+            store.create_customer("Arian Reyes", "a@b.com", "000")
+            for hotel in HOTELS:
+                store.create_hotel(hotel, "1 Main St", 10)
+                store.create_reservation(hotel, "Arian Reyes", 2)
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def _bookings(self):
+        """Returns the hotels booked, as a multiset"""
+        return Counter(r["hotel_name"]
+                       for r in Store(self.directory).reservations)
+
+    def test_reshard_round_trip(self):
+        """Test splitting, resharding and merging the reservations"""
+        expected = self._bookings()
+        self.assertEqual(reshard(self.directory, 4), len(HOTELS))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.directory, 'reservations.json')))
+        self.assertEqual(read_manifest(self.directory),
+                         {"shards": 4, "generation": 1})
+        self.assertIsInstance(JsonBackend(self.directory).journal,
+                              ShardedJournal)
+        self.assertEqual(self._bookings(), expected)
+        reshard(self.directory, 3, 'binary')
+        self.assertEqual(self._bookings(), expected)
+        # The manifest and the three shards; older generations are gone
+        self.assertEqual(len([name for name in os.listdir(os.path.join(
+            self.directory, SHARD_DIRECTORY))
+            if not name.endswith('.lock')]), 4)
+        reshard(self.directory, 0)
+        self.assertIsNone(read_manifest(self.directory))
+        self.assertEqual(self._bookings(), expected)
+        with self.assertRaises(ValueError):
+            reshard(self.directory, -1)
+
+    def test_hotel_sessions_run_in_parallel(self):
+        """Test that sessions at hotels of other shards do not wait"""
+        reshard(self.directory, 4)
+        first = HOTELS[0]
+        other = next(hotel for hotel in HOTELS
+                     if shard_of(hotel, 4) != shard_of(first, 4))
+        same = next(hotel for hotel in HOTELS[1:]
+                    if shard_of(hotel, 4) == shard_of(first, 4))
+        entered, done = threading.Event(), threading.Event()
+
+        def hold():
+            """Books at the first hotel, keeping its session open"""
+            with hotel_session(first, self.directory) as store:
+                store.create_reservation(first, "Arian Reyes", 1)
+                store.create_reservation(first, "Arian Reyes", 20,
+                                         waitlist=True)
+                entered.set()
+                done.wait(10)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        entered.wait(10)
+        try:
+            booker = threading.Thread(target=self._book, args=(other,))
+            booker.start()
+            booker.join(10)
+            self.assertFalse(booker.is_alive())
+            lock = JsonBackend(self.directory).hotel_lock(same)
+            self.assertFalse(lock.acquire(blocking=False))
+        finally:
+            done.set()
+            holder.join(10)
+        store = Store(self.directory)
+        for hotel in (first, other):
+            self.assertEqual(store.find_hotel(hotel)["rooms"], 7)
+            self.assertEqual(store.waitlist_position(hotel, "Arian Reyes"),
+                             1)
+
+    def _book(self, hotel_name):
+        """Books a room and a waiting request in a hotel session"""
+        with hotel_session(hotel_name, self.directory) as store:
+            store.create_reservation(hotel_name, "Arian Reyes", 1)
+            store.create_reservation(hotel_name, "Arian Reyes", 20,
+                                     waitlist=True)
+
+    def test_store_on_shards(self):
+        """Test booking and cancelling through the shards"""
+        reshard(self.directory, 4)
+        with Store(self.directory) as store:
+            self.assertTrue(store.create_reservation("Hotel 5",
+                                                     "Arian Reyes", 1))
+            store.cancel_reservation("Hotel 0", "Arian Reyes")
+        store = Store(self.directory)
+        self.assertEqual(
+            [r["num_rooms"] for r in store.iter_reservations("Hotel 5")],
+            [2, 1])
+        self.assertEqual(list(store.iter_reservations("Hotel 0")), [])
+        with Store(self.directory) as store:
+            store.cancel_reservations([(None, "Arian Reyes")])
+        self.assertEqual(Store(self.directory).reservations, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
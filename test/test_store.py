@@ -0,0 +1,399 @@
+'''
+This script contains all the unit test
+pertaining to the Store class (store.py)
+'''
+import json
+import os
+import tempfile
+import unittest
+from src.customer import Customer
+from src.hotel import Hotel
+from src.reservation import Reservation
+from src.store import ALL_OR_NOTHING, Store, session
+
+
+class TestStoreMethods(unittest.TestCase):
+    """Unit tests for validating methods of the Store class"""
+    def setUp(self):
+        """Creates a temporary directory with initial hotels"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.hotels_data = [
+            {"name": "Hotel Harris", "address": "456 Frontier Drive",
+                "rooms": 100},
+            {"name": "Kyatt Hotel", "address": "786 Mountain View Rd",
+                "rooms": 50}
+        ]
+        self._write('hotels.json', self.hotels_data)
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def _write(self, filename, data):
+        """Writes a JSON file inside the temporary directory"""
+        path = os.path.join(self.directory, filename)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=4)
+
+    def _read(self, filename):
+        """Reads a JSON file from the temporary directory"""
+        path = os.path.join(self.directory, filename)
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def test_changes_stay_in_memory_until_flush(self):
+        """Test that the static API writes only on flush"""
+        with Store(self.directory) as store:
+            Customer.create_customer("Arian Reyes", "areyes@mitec.com",
+                                     "859-587-7458")
+            self.assertTrue(Reservation.create_reservation(
+                "Kyatt Hotel", "Arian Reyes", 5))
+            self.assertFalse(os.path.exists(
+                os.path.join(self.directory, 'reservations.jsonl')))
+            self.assertEqual(self._read('hotels.json'), self.hotels_data)
+            self.assertTrue(store.is_dirty())
+            store.flush()
+            self.assertFalse(store.is_dirty())
+            hotels = {h["name"]: h for h in self._read('hotels.json')}
+            self.assertEqual(hotels["Kyatt Hotel"]["rooms"], 45)
+            self.assertEqual(len(Store(self.directory).reservations), 1)
+
+    def test_exit_flushes(self):
+        """Test that leaving the with block writes pending changes"""
+        with Store(self.directory):
+            Hotel.create_hotel("Test Hotel", "123 Test St", 75)
+        names = [h["name"] for h in self._read('hotels.json')]
+        self.assertIn("Test Hotel", names)
+
+    def test_collections_load_once(self):
+        """Test that external edits are not re-read by a session"""
+        with Store(self.directory) as store:
+            self.assertEqual(len(Hotel.get_hotels()), 2)
+            self._write('hotels.json', [])
+            self.assertEqual(len(Hotel.get_hotels()), 2)
+            self.assertFalse(store.is_dirty())
+
+    def test_enter_reads_again_under_lock(self):
+        """Test that entering a store sees writes made since its reads"""
+        store = Store(self.directory)
+        store.create_customer("Arian Reyes", "a@b.com", "000")
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 50)
+        with Store(self.directory) as other:
+            other.modify_hotel("Kyatt Hotel", new_rooms=1)
+        with store:
+            self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 1)
+            self.assertTrue(store.create_reservation(
+                "Kyatt Hotel", "Arian Reyes", 1))
+            self.assertFalse(store.create_reservation(
+                "Kyatt Hotel", "Arian Reyes", 1))
+        hotels = {h["name"]: h for h in self._read('hotels.json')}
+        self.assertEqual(hotels["Kyatt Hotel"]["rooms"], 0)
+        self.assertEqual(len(Store(self.directory).customers), 1)
+
+    def test_flush_interval(self):
+        """Test that a zero interval flushes on every mutation"""
+        store = Store(self.directory, flush_interval=0)
+        store.modify_hotel("Kyatt Hotel", new_rooms=10)
+        self.assertFalse(store.is_dirty())
+        hotels = {h["name"]: h for h in self._read('hotels.json')}
+        self.assertEqual(hotels["Kyatt Hotel"]["rooms"], 10)
+
+    def test_names_are_unique(self):
+        """Test that duplicate hotel and customer names are rejected"""
+        store = Store(self.directory)
+        self.assertFalse(store.create_hotel("Kyatt Hotel", "Elsewhere", 1))
+        self.assertTrue(store.create_customer("Alex Fregoso",
+                                              "afreg@gmail.com",
+                                              "985-363-7485"))
+        self.assertFalse(store.create_customer("Alex Fregoso",
+                                               "other@gmail.com",
+                                               "000-000-0000"))
+        self.assertEqual(store.find_customer("Alex Fregoso")["email"],
+                         "afreg@gmail.com")
+        self.assertFalse(store.modify_hotel("Kyatt Hotel",
+                                            new_name="Hotel Harris"))
+        self.assertEqual(store.find_hotel("Hotel Harris")["rooms"], 100)
+
+    def test_index_follows_rename_and_delete(self):
+        """Test that lookups stay correct across rename and delete"""
+        store = Store(self.directory)
+        self.assertTrue(store.modify_hotel("Kyatt Hotel",
+                                           new_name="Kyatt Grand"))
+        self.assertIsNone(store.find_hotel("Kyatt Hotel"))
+        self.assertEqual(store.find_hotel("Kyatt Grand")["rooms"], 50)
+        store.delete_hotel("Kyatt Grand")
+        self.assertIsNone(store.find_hotel("Kyatt Grand"))
+        self.assertTrue(store.create_hotel("Kyatt Hotel", "New St", 5))
+        self.assertEqual([h["name"] for h in store.hotels],
+                         ["Hotel Harris", "Kyatt Hotel"])
+
+    def test_duplicates_on_load_keep_first(self):
+        """Test that a file with duplicate names keeps the first record"""
+        self._write('hotels.json', self.hotels_data + [
+            {"name": "Kyatt Hotel", "address": "Shadow", "rooms": 1}])
+        store = Store(self.directory)
+        self.assertEqual(len(store.hotels), 2)
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 50)
+
+    def test_cancel_reservations_batch(self):
+        """Test batch cancellation restores rooms and persists once"""
+        with Store(self.directory) as store:
+            for name in ("Alex Fregoso", "Ruben Alvarez"):
+                store.create_customer(name, "a@b.com", "000")
+            store.create_reservation("Kyatt Hotel", "Alex Fregoso", 2)
+            store.create_reservation("Kyatt Hotel", "Ruben Alvarez", 3)
+            store.create_reservation("Hotel Harris", "Alex Fregoso", 4)
+        with Store(self.directory):
+            cancelled = Reservation.cancel_reservations([
+                ("Kyatt Hotel", None), (None, "Alex Fregoso"),
+                ("Hotel Harris", "Nobody")])
+        self.assertEqual(sorted(r["num_rooms"] for r in cancelled),
+                         [2, 3, 4])
+        hotels = {h["name"]: h for h in self._read('hotels.json')}
+        self.assertEqual(hotels["Kyatt Hotel"]["rooms"], 50)
+        self.assertEqual(hotels["Hotel Harris"]["rooms"], 100)
+        self.assertEqual(Store(self.directory).reservations, [])
+
+    def test_cancel_needs_a_key(self):
+        """Test that an empty cancellation is rejected"""
+        with self.assertRaises(ValueError):
+            Store(self.directory).cancel_reservations([(None, None)])
+
+    def test_create_reservations_best_effort(self):
+        """Test a batch keeps valid bookings and reports the others"""
+        with Store(self.directory) as store:
+            store.create_customer("Alex Fregoso", "a@b.com", "000")
+            report = Reservation.create_reservations([
+                ("Kyatt Hotel", "Alex Fregoso", 30),
+                ("Kyatt Hotel", "Alex Fregoso", 30),
+                ("Nowhere", "Alex Fregoso", 1),
+                ("Hotel Harris", "Nobody", 1),
+                ("Hotel Harris", "Alex Fregoso", 0),
+                ("Kyatt Hotel", "Alex Fregoso", 20)])
+        self.assertEqual(len(report["accepted"]), 2)
+        self.assertEqual([r["reason"] for r in report["rejected"]],
+                         ["not enough rooms", "unknown hotel",
+                          "unknown customer", "invalid number of rooms"])
+        hotels = {h["name"]: h for h in self._read('hotels.json')}
+        self.assertEqual(hotels["Kyatt Hotel"]["rooms"], 0)
+        self.assertEqual(len(Store(self.directory).reservations), 2)
+
+    def test_create_reservations_all_or_nothing(self):
+        """Test that one rejection drops the whole batch"""
+        store = Store(self.directory)
+        store.create_customer("Alex Fregoso", "a@b.com", "000")
+        report = store.create_reservations(
+            [("Kyatt Hotel", "Alex Fregoso", 10),
+             ("Kyatt Hotel", "Alex Fregoso", 50)], policy=ALL_OR_NOTHING)
+        self.assertEqual(report["accepted"], [])
+        self.assertEqual([r["reason"] for r in report["rejected"]],
+                         ["not enough rooms", "batch aborted"])
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 50)
+        self.assertEqual(store.reservations, [])
+
+    def test_legacy_data_is_upgraded(self):
+        """Test that embedded customers are rewritten as customer ids"""
+        customer = {"name": "Alex Fregoso", "email": "a@b.com",
+                    "phone_number": "000"}
+        self._write('customers.json', [customer])
+        self._write('reservations.json', [
+            {"hotel_name": "Kyatt Hotel", "customer": customer,
+             "num_rooms": 2}])
+        with Store(self.directory) as store:
+            customer_id = store.find_customer("Alex Fregoso")["id"]
+            self.assertEqual(len(list(store.iter_reservations(
+                customer_name="Alex Fregoso"))), 1)
+            self.assertEqual(len(store.reservations), 1)
+        self.assertEqual(self._read('customers.json')[0]["id"], customer_id)
+        self.assertEqual(self._read('reservations.json'), [
+            {"hotel_name": "Kyatt Hotel", "customer_id": customer_id,
+             "num_rooms": 2}])
+
+    def test_rename_reaches_past_bookings(self):
+        """Test that reservations follow a customer across a rename"""
+        with Store(self.directory) as store:
+            store.create_customer("Alex Fregoso", "a@b.com", "000")
+            store.create_customer("Ruben Alvarez", "r@b.com", "111")
+            store.create_reservation("Kyatt Hotel", "Alex Fregoso", 2)
+        with Store(self.directory) as store:
+            store.modify_customer("Alex Fregoso", new_name="Alex F.",
+                                  new_email="new@b.com")
+            [reservation] = store.reservations
+            resolved = store.resolve_reservation(reservation)
+            self.assertEqual(resolved["customer"]["name"], "Alex F.")
+            self.assertEqual(resolved["customer"]["email"], "new@b.com")
+            self.assertEqual(len(store.cancel_reservation(None, "Alex F.")),
+                             1)
+        self.assertNotEqual(*[c["id"] for c in self._read('customers.json')])
+
+    def test_deleted_customer_resolves_to_id(self):
+        """Test that a booking outliving its customer keeps the id"""
+        store = Store(self.directory)
+        store.create_customer("Alex Fregoso", "a@b.com", "000")
+        customer_id = store.find_customer("Alex Fregoso")["id"]
+        store.create_reservation("Kyatt Hotel", "Alex Fregoso", 2)
+        store.delete_customer("Alex Fregoso")
+        resolved = store.resolve_reservation(store.reservations[0])
+        self.assertEqual(resolved["customer"],
+                         {"id": customer_id, "name": None, "email": None,
+                          "phone_number": None})
+
+    def test_dated_bookings_share_rooms_across_nights(self):
+        """Test that rooms free up after check-out"""
+        store = Store(self.directory)
+        store.create_customer("Alex Fregoso", "a@b.com", "000")
+        self.assertTrue(store.create_reservation(
+            "Kyatt Hotel", "Alex Fregoso", 40, "2030-05-01", "2030-05-04"))
+        self.assertTrue(store.create_reservation(
+            "Kyatt Hotel", "Alex Fregoso", 50, "2030-05-04", "2030-05-06"))
+        self.assertFalse(store.create_reservation(
+            "Kyatt Hotel", "Alex Fregoso", 20, "2030-04-30", "2030-05-02"))
+        self.assertEqual(store.min_free_rooms("Kyatt Hotel", "2030-04-28",
+                                              "2030-05-02"), 10)
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 50)
+        self.assertFalse(store.create_reservation("Kyatt Hotel",
+                                                  "Alex Fregoso", 1))
+        report = store.create_reservations(
+            [("Kyatt Hotel", "Alex Fregoso", 1, "2030-05-02", "2030-05-01")])
+        self.assertEqual(report["rejected"][0]["reason"], "invalid dates")
+
+    def test_dated_bookings_persist_and_cancel(self):
+        """Test that nights are rebuilt on load and freed on cancel"""
+        with Store(self.directory) as store:
+            store.create_customer("Alex Fregoso", "a@b.com", "000")
+            report = store.create_reservations([
+                ("Hotel Harris", "Alex Fregoso", 60, "2030-01-01",
+                 "2030-01-03"),
+                ("Hotel Harris", "Alex Fregoso", 30, "2030-01-02",
+                 "2030-01-05"),
+                ("Hotel Harris", "Alex Fregoso", 20, "2030-01-02",
+                 "2030-01-03")])
+            self.assertEqual(len(report["accepted"]), 2)
+        with Store(self.directory) as store:
+            self.assertTrue(store.can_book("Hotel Harris", 40,
+                                           "2029-12-30", "2030-01-02"))
+            self.assertFalse(store.can_book("Hotel Harris", 11,
+                                            "2030-01-01", "2030-01-03"))
+            self.assertEqual(store.min_free_rooms(
+                "Hotel Harris", "2030-01-02", "2030-01-03"), 10)
+            cancelled = store.cancel_reservation("Hotel Harris",
+                                                 "Alex Fregoso")
+            self.assertEqual(cancelled[0]["check_out"], "2030-01-03")
+            self.assertEqual(store.min_free_rooms(
+                "Hotel Harris", "2030-01-01", "2030-01-10"), 100)
+        self.assertEqual(store.find_hotel("Hotel Harris")["rooms"], 100)
+
+    def test_rename_moves_dated_bookings(self):
+        """Test that a renamed hotel keeps its bookings and nights"""
+        with Store(self.directory) as store:
+            store.create_customer("Alex Fregoso", "a@b.com", "000")
+            store.create_reservation("Kyatt Hotel", "Alex Fregoso", 45,
+                                     "2030-01-01", "2030-01-03")
+            store.create_reservation("Kyatt Hotel", "Alex Fregoso", 5)
+        with Store(self.directory) as store:
+            store.modify_hotel("Kyatt Hotel", new_name="Kyatt Suites")
+            self.assertEqual(store.min_free_rooms(
+                "Kyatt Suites", "2030-01-02", "2030-01-03"), 0)
+            self.assertFalse(store.create_reservation(
+                "Kyatt Suites", "Alex Fregoso", 1, "2030-01-01",
+                "2030-01-02"))
+        store = Store(self.directory)
+        self.assertEqual({r["hotel_name"] for r in store.reservations},
+                         {"Kyatt Suites"})
+        self.assertEqual(store.min_free_rooms(
+            "Kyatt Suites", "2030-01-01", "2030-01-03"), 0)
+        self.assertEqual(len(store.cancel_reservation("Kyatt Suites",
+                                                      "Alex Fregoso")), 2)
+        self.assertEqual(store.find_hotel("Kyatt Suites")["rooms"], 50)
+
+    def test_bookings_read_only_their_hotel(self):
+        """Test that booking does not load every reservation"""
+        with Store(self.directory) as store:
+            store.create_customer("Alex Fregoso", "a@b.com", "000")
+            store.create_reservation("Kyatt Hotel", "Alex Fregoso", 45,
+                                     "2030-01-01", "2030-01-03")
+        store = Store(self.directory)
+        self.assertTrue(store.create_reservation("Hotel Harris",
+                                                 "Alex Fregoso", 1))
+        self.assertFalse(store.create_reservation(
+            "Kyatt Hotel", "Alex Fregoso", 6, "2030-01-02", "2030-01-04"))
+        self.assertTrue(store.create_reservation(
+            "Kyatt Hotel", "Alex Fregoso", 5, "2030-01-02", "2030-01-04"))
+        self.assertEqual(store.min_free_rooms("Kyatt Hotel", "2030-01-01",
+                                              "2030-01-05"), 0)
+        self.assertNotIn("reservations", store._collections)
+
+    def test_all_or_nothing_releases_held_nights(self):
+        """Test that an aborted batch leaves no nights booked"""
+        store = Store(self.directory)
+        store.create_customer("Alex Fregoso", "a@b.com", "000")
+        report = store.create_reservations(
+            [("Kyatt Hotel", "Alex Fregoso", 30, "2030-01-01", "2030-01-03"),
+             ("Kyatt Hotel", "Alex Fregoso", 30, "2030-01-02", "2030-01-03")],
+            policy=ALL_OR_NOTHING)
+        self.assertEqual(report["accepted"], [])
+        self.assertEqual(store.min_free_rooms("Kyatt Hotel", "2030-01-01",
+                                              "2030-01-03"), 50)
+
+    def test_search_follows_changes(self):
+        """Test that the capacity index tracks bookings and edits"""
+        store = Store(self.directory)
+        store.create_customer("Alex Fregoso", "a@b.com", "000")
+        page = store.search_hotels(60)
+        self.assertEqual([h["name"] for h in page["hotels"]],
+                         ["Hotel Harris"])
+        store.create_reservation("Hotel Harris", "Alex Fregoso", 45)
+        self.assertEqual(store.search_hotels(60)["hotels"], [])
+        store.modify_hotel("Kyatt Hotel", new_name="Kyatt Grand",
+                           new_address="1 Main St")
+        page = store.search_hotels(1, limit=1)
+        self.assertEqual(page["hotels"][0]["name"], "Hotel Harris")
+        page = store.search_hotels(1, limit=1, after=page["next"])
+        self.assertEqual([h["name"] for h in page["hotels"]],
+                         ["Kyatt Grand"])
+        self.assertIsNone(page["next"])
+        self.assertEqual(len(store.search_hotels(
+            1, address_prefix="1 main")["hotels"]), 1)
+        store.delete_hotel("Kyatt Grand")
+        self.assertEqual(store.search_hotels(
+            1, address_prefix="1 main")["hotels"], [])
+
+    def test_search_counts_dated_bookings(self):
+        """Test that search only offers rooms free on every night"""
+        with Store(self.directory) as store:
+            store.create_customer("Alex Fregoso", "a@b.com", "000")
+            store.create_reservation("Hotel Harris", "Alex Fregoso", 80,
+                                     "2030-01-01", "2030-01-03")
+        store = Store(self.directory)
+        self.assertEqual(store.search_hotels(60)["hotels"], [])
+        self.assertEqual(
+            [h["name"] for h in store.search_hotels(
+                30, check_in="2030-01-02", check_out="2030-01-04")["hotels"]],
+            ["Kyatt Hotel"])
+        self.assertEqual(
+            [h["name"] for h in store.search_hotels(
+                60, check_in="2030-01-03", check_out="2030-01-05")["hotels"]],
+            ["Hotel Harris"])
+        self.assertEqual(store.search_hotels(
+            1, check_in="2030-01-03", check_out="2030-01-01")["hotels"], [])
+
+    def test_iter_available_hotels(self):
+        """Test that the static API walks every page"""
+        with Store(self.directory):
+            for i in range(5):
+                Hotel.create_hotel(f"Inn {i}", "9 Main St", 60 + i)
+            names = [h["name"] for h in Hotel.iter_available_hotels(
+                55, address_prefix="9 ", page_size=2)]
+        self.assertEqual(names, [f"Inn {i}" for i in range(4, -1, -1)])
+
+    def test_session_without_store(self):
+        """Test that a session without an active store writes through"""
+        with session(self.directory) as store:
+            store.delete_hotel("Hotel Harris")
+        names = [h["name"] for h in self._read('hotels.json')]
+        self.assertEqual(names, ["Kyatt Hotel"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+'''
+This script contains all the unit test
+pertaining to the Waitlist class (waitlist.py) and the promotion of
+waiting requests by the Store
+'''
+import os
+import tempfile
+import unittest
+from src.backends import SqliteBackend
+from src.reservation import Reservation
+from src.store import Store
+from src.waitlist import Waitlist
+
+
+def _request(customer_id, num_rooms=1, hotel_name="Kyatt Hotel"):
+    """Builds a reservation request for the tests"""
+    return {"hotel_name": hotel_name, "customer_id": customer_id,
+            "num_rooms": num_rooms}
+
+
+class TestWaitlist(unittest.TestCase):
+    """Unit tests for validating the Waitlist heaps"""
+    def test_order(self):
+        """Test that higher tiers go first, then earlier arrivals"""
+        waitlist = Waitlist()
+        for customer_id, priority in (("a", 0), ("b", 1), ("c", 0),
+                                      ("d", 1)):
+            waitlist.add(_request(customer_id), priority)
+        waitlist.add(_request("e", hotel_name="Hotel Harris"))
+        self.assertEqual(waitlist.position("Kyatt Hotel", "c"), 4)
+        self.assertIsNone(waitlist.position("Hotel Harris", "a"))
+        self.assertEqual([waitlist.pop("Kyatt Hotel")["customer_id"]
+                          for _ in range(2)], ["b", "d"])
+        self.assertEqual(waitlist.peek("Kyatt Hotel")["customer_id"], "a")
+        self.assertEqual(len(waitlist), 3)
+
+    def test_persisted_entries(self):
+        """Test that saved entries rebuild the same queues"""
+        waitlist = Waitlist()
+        for customer_id in "abc":
+            waitlist.add(_request(customer_id))
+        self.assertEqual(waitlist.remove(customer_id="b")[0]["customer_id"],
+                         "b")
+        restored = Waitlist(waitlist.entries())
+        restored.add(_request("d"))
+        self.assertEqual([restored.pop("Kyatt Hotel")["customer_id"]
+                          for _ in range(3)], ["a", "c", "d"])
+        restored.add(_request("e"), priority=1)
+        self.assertEqual([e["customer_id"] for e in
+                          restored.tier("Kyatt Hotel")], ["e"])
+        restored.discard(restored.peek("Kyatt Hotel"))
+        restored.rename("Kyatt Hotel", "Hotel Sesa")
+        self.assertIsNone(restored.peek("Kyatt Hotel"))
+
+
+class TestStoreWaitlist(unittest.TestCase):
+    """Unit tests for validating the waitlist kept by the Store"""
+    def setUp(self):
+        """Creates a temporary directory with a full hotel"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        with Store(self.directory) as store:
+            store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 2)
+            for name in ("Arian Reyes", "Dana Cole", "Eli Park"):
+                store.create_customer(name, "a@b.com", "000")
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 2)
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_promoted_on_cancel(self):
+        """Test that a cancellation books the requests waiting"""
+        with Store(self.directory) as store:
+            self.assertFalse(store.create_reservation(
+                "Kyatt Hotel", "Dana Cole", 2, waitlist=True))
+            self.assertFalse(store.create_reservation(
+                "Kyatt Hotel", "Eli Park", 1, waitlist=True, priority=1))
+            self.assertFalse(store.create_reservation(
+                "Kyatt Hotel", "Arian Reyes", 1))
+        store = Store(self.directory)
+        self.assertEqual(store.waitlist_position("Kyatt Hotel", "Eli Park"),
+                         1)
+        self.assertEqual(store.waitlist_position("Kyatt Hotel", "Dana Cole"),
+                         2)
+        self.assertIsNone(store.waitlist_position("Kyatt Hotel",
+                                                  "Arian Reyes"))
+        with Store(self.directory) as store:
+            store.cancel_reservation("Kyatt Hotel", "Arian Reyes")
+        store = Store(self.directory)
+        # Eli took one room; Dana's two do not fit yet and keep waiting
+        self.assertEqual([r["num_rooms"] for r in store.reservations], [1])
+        self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 1)
+        self.assertEqual(store.waitlist_position("Kyatt Hotel", "Dana Cole"),
+                         1)
+
+    def test_promoted_on_more_rooms(self):
+        """Test that adding rooms through the static API promotes"""
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            Reservation.create_reservation("Kyatt Hotel", "Dana Cole", 2,
+                                           "2030-01-01", "2030-01-03",
+                                           waitlist=True)
+            Reservation.create_reservation("Kyatt Hotel", "Eli Park", 1,
+                                           waitlist=True)
+            self.assertEqual(Reservation.waitlist_position(
+                "Kyatt Hotel", "Eli Park"), 2)
+            self.assertEqual(len(Reservation.leave_waitlist(
+                "Kyatt Hotel", "Eli Park")), 1)
+            # Rooms left after Arian's open-ended booking: one is short
+            with Store('.') as store:
+                store.modify_hotel("Kyatt Hotel", new_rooms=1)
+                self.assertEqual(store.waitlist_position("Kyatt Hotel",
+                                                         "Dana Cole"), 1)
+            self.assertEqual(len(Store('.').reservations), 1)
+            with Store('.') as store:
+                store.modify_hotel("Kyatt Hotel", new_rooms=2)
+                self.assertIsNone(store.waitlist_position("Kyatt Hotel",
+                                                          "Dana Cole"))
+            self.assertEqual(
+                [r.get("check_in") for r in Store('.').reservations],
+                [None, "2030-01-01"])
+        finally:
+            os.chdir(cwd)
+
+    def test_promotes_requests_that_fit(self):
+        """Test that a request too large to fit does not block its tier"""
+        with Store(self.directory) as store:
+            store.create_reservation("Kyatt Hotel", "Dana Cole", 2,
+                                     waitlist=True)
+            store.create_reservation("Kyatt Hotel", "Arian Reyes", 1,
+                                     waitlist=True, priority=-1)
+            store.create_reservation("Kyatt Hotel", "Eli Park", 1,
+                                     waitlist=True)
+            self.assertEqual(store.waitlist_position("Kyatt Hotel",
+                                                     "Eli Park"), 2)
+            store.modify_hotel("Kyatt Hotel", new_rooms=1)
+            # Eli fits where Dana does not; Arian's lower tier waits
+            self.assertIsNone(store.waitlist_position("Kyatt Hotel",
+                                                      "Eli Park"))
+            store.modify_hotel("Kyatt Hotel", new_rooms=1)
+            self.assertEqual(store.waitlist_position("Kyatt Hotel",
+                                                     "Dana Cole"), 1)
+            self.assertEqual(store.waitlist_position("Kyatt Hotel",
+                                                     "Arian Reyes"), 2)
+            store.modify_hotel("Kyatt Hotel", new_rooms=2)
+            self.assertEqual(store.waitlist_position("Kyatt Hotel",
+                                                     "Arian Reyes"), 1)
+            self.assertEqual(store.find_hotel("Kyatt Hotel")["rooms"], 0)
+
+    def test_sqlite_waitlist(self):
+        """Test that the SQLite backend keeps the waitlist"""
+        backend = SqliteBackend(os.path.join(self.directory, 'store.db'))
+        try:
+            with Store(backend=backend) as store:
+                store.create_hotel("Kyatt Hotel", "786 Mountain View Rd", 0)
+                store.create_customer("Arian Reyes", "a@b.com", "000")
+                store.create_reservation("Kyatt Hotel", "Arian Reyes", 1,
+                                         waitlist=True)
+            store = Store(backend=backend)
+            self.assertEqual(store.waitlist_position("Kyatt Hotel",
+                                                     "Arian Reyes"), 1)
+            store.modify_hotel("Kyatt Hotel", new_rooms=1)
+            store.flush()
+            self.assertEqual(len(Store(backend=backend).reservations), 1)
+            self.assertEqual(backend.load_waitlist(), [])
+        finally:
+            backend.close()
+
+
+if __name__ == '__main__':
+    unittest.main()